@@ -0,0 +1,120 @@
+"""Cold-start benchmark for the MCP servers.
+
+Each run imports a server module in a fresh interpreter under
+``python -X importtime`` and then builds its ASGI app, which is the work a
+new Modal container does before it can serve. The script reports the median
+import and build times, the heaviest direct imports, and fails when a run
+goes over the budget or a lazily loaded dependency is imported eagerly.
+
+Usage:
+    python bench_cold_start.py [--runs 5] [--budget-ms 2500] [--server vuln]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# module, ASGI entrypoint, dependencies that must not be loaded by the import
+SERVERS = {
+    "vuln": ("modal_mcp_auth_vuln", "vulnmcp_transilienceapi_com",
+             ["fastapi", "requests", "aiohttp", "pandas"]),
+    "threatintel": ("modal_mcp_auth_threatintel", "threatintelmcp_transilienceapi_com",
+                    ["fastapi", "PyPDF2", "pandas"]),
+}
+
+# Median import + app build time allowed per server, in milliseconds
+COLD_START_BUDGET_MS = float(os.environ.get("COLD_START_BUDGET_MS", "2500"))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module} as server
+imported = time.perf_counter()
+eager = [name for name in {lazy!r} if name in sys.modules]
+server.{entrypoint}.local()
+built = time.perf_counter()
+print(json.dumps({{"import_ms": (imported - start) * 1000, "build_ms": (built - imported) * 1000, "eager": eager}}))
+"""
+
+
+def _direct_imports(importtime_log: str, module: str) -> list[tuple[str, int]]:
+    """Cumulative microseconds of each import made directly by module."""
+    lines = [line for line in importtime_log.splitlines() if line.startswith("import time:")]
+    rows = []
+    for line in lines:
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            rows.append((name, int(cumulative)))
+
+    # importtime prints children before their parent; the module's direct
+    # imports are the rows indented one level deeper than it
+    for index, (name, _) in enumerate(rows):
+        if name.strip() == module:
+            depth = len(name) - len(name.lstrip())
+            break
+    else:
+        return []
+
+    direct = []
+    for name, cumulative in reversed(rows[:index]):
+        indent = len(name) - len(name.lstrip())
+        if indent <= depth:
+            break
+        if indent == depth + 2:
+            direct.append((name.strip(), cumulative))
+    return direct
+
+
+def run_once(server: str) -> tuple[dict, list[tuple[str, int]]]:
+    module, entrypoint, lazy = SERVERS[server]
+    probe = PROBE.format(module=module, entrypoint=entrypoint, lazy=lazy)
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                               cwd=HERE, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{module} failed to start:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return result, _direct_imports(completed.stderr, module)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=COLD_START_BUDGET_MS)
+    parser.add_argument("--server", choices=sorted(SERVERS), action="append")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest direct imports to list")
+    args = parser.parse_args()
+
+    failures = []
+    for server in args.server or sorted(SERVERS):
+        # One untimed run so bytecode caches are warm for every sample
+        run_once(server)
+        samples, eager, direct = [], set(), []
+        for _ in range(args.runs):
+            result, direct = run_once(server)
+            samples.append(result)
+            eager.update(result["eager"])
+
+        import_ms = statistics.median(s["import_ms"] for s in samples)
+        build_ms = statistics.median(s["build_ms"] for s in samples)
+        total_ms = import_ms + build_ms
+        print(f"{server}: import {import_ms:.0f} ms, app build {build_ms:.0f} ms, "
+              f"total {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms, median of {args.runs})")
+        for name, cumulative in sorted(direct, key=lambda row: -row[1])[:args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+        if total_ms > args.budget_ms:
+            failures.append(f"{server} took {total_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        if eager:
+            failures.append(f"{server} imported {', '.join(sorted(eager))} at module load")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
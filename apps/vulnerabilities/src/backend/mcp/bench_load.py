@@ -0,0 +1,292 @@
+"""Load and latency benchmark for the MCP servers, fully offline.
+
+Starts bench_upstream.py as the stand-in for CISA and the Transilience APIs,
+serves each server's real ASGI app (auth middleware included) with uvicorn
+in its own process, and drives its tools over MCP streamable-http with
+`--concurrency` client sessions. For each tool it reports the first (cold)
+call, p50/p95/p99 latency, throughput, errors and the server process's
+peak RSS while that tool ran.
+
+Usage:
+    python bench_load.py [--server vuln] [--tool get_threats] [--concurrency 16] [--requests 200]
+                         [--latency-ms 50] [--error-rate 0.01] [--job-seconds 2] [--json results.json]
+
+Per-key rate limits are switched off for the run unless AUTH_* variables are
+already set, so the numbers measure the servers rather than the admission
+policy.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_upstream import cve_at, ioc_hash, upstream_env
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCH_KEY = "bench-key"
+
+SERVERS = {
+    "vuln": ("modal_mcp_auth_vuln", "vulnmcp_transilienceapi_com", "/vuln/mcp"),
+    "threatintel": ("modal_mcp_auth_threatintel", "threatintelmcp_transilienceapi_com", "/threatintel/mcp"),
+}
+
+SERVE = """
+import uvicorn
+import {module} as server
+uvicorn.run(server.{entrypoint}.local(), host="127.0.0.1", port={port}, log_level="warning")
+"""
+
+# server -> tool -> arguments for the i-th call; `keys` bounds how many distinct
+# IDs are requested so repeated calls exercise the servers' caches
+SCENARIOS = {
+    "vuln": {
+        "get_cisa_known_exploited_vulnerabilities_filtered": lambda rng, keys: {"days_ago": rng.choice([7, 30, 90])},
+        "get_cisa_kev_entry": lambda rng, keys: {"cve_id": cve_at(rng.randrange(keys))},
+        "search_cisa_known_exploited_vulnerabilities": lambda rng, keys: {"vendor": rng.choice(["Microsoft", "Cisco", "Ivanti"]),
+                                                                          "limit": 50},
+        "query_cve_info": lambda rng, keys: {"cve_id": cve_at(rng.randrange(keys))},
+        "query_cve_info_batch": lambda rng, keys: {"cve_ids": [cve_at(rng.randrange(keys)) for _ in range(25)]},
+        "prioritize_vulnerabilities": lambda rng, keys: {"cves": [cve_at(rng.randrange(keys)) for _ in range(20)]},
+        "correlate_cves": lambda rng, keys: {"days_ago": 30, "limit": 50},
+    },
+    "threatintel": {
+        "get_threats": lambda rng, keys: {"query": rng.choice(["ransomware", "phishing", "botnet"]), "limit": 50},
+        "get_breaches": lambda rng, keys: {"query": "", "limit": 50, "summary": True},
+        "get_products": lambda rng, keys: {"query": "", "limit": 50, "fields": ["id", "title", "affected_products"]},
+        "get_threat_report_files": lambda rng, keys: {"report_id": f"threats-{rng.randrange(keys)}"},
+        "get_threat_report_advisory": lambda rng, keys: {"report_id": f"threats-{rng.randrange(keys)}",
+                                                         "start_page": 1, "end_page": 3},
+        "query_threatintel_news": lambda rng, keys: {"severity": "high", "limit": 50},
+        "search_threat_intel": lambda rng, keys: {"query": rng.choice(["ransomware healthcare", "APT29", "zero-day"])},
+        # Half the hashes are listed in some report's IOCs (40 per report), once those reports are fetched
+        "lookup_indicators": lambda rng, keys: {"indicators": [ioc_hash(f"threats-{rng.randrange(keys)}", rng.randrange(80))
+                                                               for _ in range(1000)]},
+    },
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _rss_bytes(pid: int) -> int | None:
+    """Resident set size of a process, from /proc (None where unavailable)."""
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+async def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process on port {port} exited with {process.returncode}")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise TimeoutError(f"nothing listening on port {port} after {timeout}s")
+
+
+def _stop(process: subprocess.Popen):
+    """Stop a server, then anything it forked, such as the PDF worker pool.
+
+    Forked workers inherit uvicorn's SIGTERM handler and would outlive it,
+    so the whole process group is killed once the server has exited.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        pass
+    except ProcessLookupError:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.wait()
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _failed(result) -> bool:
+    """An MCP error, or a tool payload reporting failure."""
+    if result.is_error:
+        return True
+    text = result.content[0].text if result.content and hasattr(result.content[0], "text") else ""
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and (payload.get("success") is False or "error" in payload
+                                          or payload.get("status") == "error")
+
+
+async def run_tool(url: str, server_pid: int, tool: str, make_args, args) -> dict:
+    """Drive one tool at the configured concurrency and collect its numbers."""
+    from fastmcp import Client
+    from fastmcp.client.transports import StreamableHttpTransport
+
+    rng = random.Random(args.seed)
+    headers = {"Authorization": f"Bearer {BENCH_KEY}"}
+    latencies, errors = [], 0
+    remaining = args.requests
+    peak_rss = _rss_bytes(server_pid) or 0
+
+    async def sample_rss(stop: asyncio.Event):
+        nonlocal peak_rss
+        while not stop.is_set():
+            peak_rss = max(peak_rss, _rss_bytes(server_pid) or 0)
+            try:
+                await asyncio.wait_for(stop.wait(), 0.05)
+            except asyncio.TimeoutError:
+                pass
+
+    async def session(cold: bool = False):
+        nonlocal remaining, errors
+        async with Client(StreamableHttpTransport(url, headers=headers), timeout=args.timeout) as client:
+            while cold or remaining > 0:
+                if not cold:
+                    remaining -= 1
+                started = time.perf_counter()
+                try:
+                    result = await client.call_tool(tool, make_args(rng, args.keys), raise_on_error=False)
+                    failed = _failed(result)
+                except Exception as e:
+                    failed = True
+                    if args.verbose:
+                        print(f"    {tool}: {type(e).__name__}: {e}")
+                elapsed = (time.perf_counter() - started) * 1000
+                if cold:
+                    return elapsed, failed
+                latencies.append(elapsed)
+                errors += failed
+
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_rss(stop))
+    cold_ms, cold_failed = await session(cold=True)
+    started = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(args.concurrency)))
+    wall = time.perf_counter() - started
+    stop.set()
+    await sampler
+
+    return {
+        "tool": tool,
+        "requests": len(latencies),
+        "errors": errors,
+        "cold_ms": round(cold_ms, 1),
+        "cold_failed": cold_failed,
+        "p50_ms": round(_percentile(latencies, 50), 1),
+        "p95_ms": round(_percentile(latencies, 95), 1),
+        "p99_ms": round(_percentile(latencies, 99), 1),
+        "mean_ms": round(statistics.fmean(latencies), 1),
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else None,
+        "peak_rss_mb": round(peak_rss / 2 ** 20, 1) if peak_rss else None,
+    }
+
+
+async def bench_server(server: str, upstream_url: str, workdir: str, args) -> list[dict]:
+    module, entrypoint, path = SERVERS[server]
+    port = _free_port()
+    env = {
+        **os.environ,
+        **upstream_env(upstream_url),
+        "MCP_VALID_KEYS": json.dumps([BENCH_KEY]),
+        # Every store the server keeps on disk lives in this run's workdir, so
+        # "cold" calls never find a previous run's cached results
+        "CACHE_VOLUME": "",
+        "CACHE_DIR": os.path.join(workdir, f"{server}-cache"),
+        "NEWS_DB_PATH": os.path.join(workdir, f"{server}-news.sqlite3"),
+        "SEARCH_DB_PATH": os.path.join(workdir, f"{server}-search.sqlite3"),
+        "PRIORITIZATION_POLL_MIN_SECONDS": os.environ.get("PRIORITIZATION_POLL_MIN_SECONDS", "0.2"),
+    }
+    for name in ("AUTH_RATE_PER_SECOND", "AUTH_MAX_IN_FLIGHT"):
+        env.setdefault(name, "0")
+
+    process = subprocess.Popen([sys.executable, "-c", SERVE.format(module=module, entrypoint=entrypoint, port=port)],
+                               cwd=HERE, env=env, stdout=None if args.verbose else subprocess.DEVNULL,
+                               start_new_session=True)
+    try:
+        await _wait_for_port(port, process)
+        print(f"{server}: serving on port {port}, idle RSS {(_rss_bytes(process.pid) or 0) / 2 ** 20:.1f} MB")
+        results = []
+        for tool, make_args in SCENARIOS[server].items():
+            if args.tool and tool not in args.tool:
+                continue
+            result = await run_tool(f"http://127.0.0.1:{port}{path}", process.pid, tool, make_args, args)
+            results.append({"server": server, **result})
+            print(f"  {tool:<50} cold {result['cold_ms']:>8.1f}  p50 {result['p50_ms']:>8.1f}  "
+                  f"p95 {result['p95_ms']:>8.1f}  p99 {result['p99_ms']:>8.1f} ms  "
+                  f"{result['throughput_rps']:>7.1f} req/s  errors {result['errors']:>4}  "
+                  f"peak RSS {result['peak_rss_mb']} MB")
+        return results
+    finally:
+        _stop(process)
+
+
+async def main_async(args) -> list[dict]:
+    upstream_port = _free_port()
+    upstream = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "bench_upstream.py"), "--port", str(upstream_port),
+         "--latency-ms", str(args.latency_ms), "--pdf-latency-ms", str(args.pdf_latency_ms),
+         "--error-rate", str(args.error_rate), "--job-seconds", str(args.job_seconds)],
+        cwd=HERE, stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL,
+        start_new_session=True)
+    try:
+        await _wait_for_port(upstream_port, upstream)
+        results = []
+        with tempfile.TemporaryDirectory(prefix="mcp-bench-") as workdir:
+            for server in args.server or list(SERVERS):
+                results.extend(await bench_server(server, f"http://127.0.0.1:{upstream_port}", workdir, args))
+        return results
+    finally:
+        _stop(upstream)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load and latency benchmark for the MCP servers")
+    parser.add_argument("--server", choices=list(SERVERS), action="append")
+    parser.add_argument("--tool", action="append", help="Only benchmark these tools (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent MCP client sessions")
+    parser.add_argument("--requests", type=int, default=200, help="Calls per tool, after one cold call")
+    parser.add_argument("--keys", type=int, default=50, help="Distinct CVE / report IDs requested")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean injected upstream latency")
+    parser.add_argument("--pdf-latency-ms", type=float, default=200.0, help="Extra latency for advisory PDFs")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream responses failed with 503")
+    parser.add_argument("--job-seconds", type=float, default=2.0, help="Duration of fake prioritization jobs")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Per-call client timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show server output and call exceptions")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump({"args": vars(args), "results": results}, out, indent=2)
+
+
+if __name__ == "__main__":
+    main()
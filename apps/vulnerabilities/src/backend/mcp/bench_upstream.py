@@ -0,0 +1,328 @@
+"""Local stand-in for every upstream the MCP servers call.
+
+Serves synthetic but realistically shaped data for:
+
+- the CISA KEV feed (with ETag / 304 revalidation)
+- the vulnerability API: /cves/{id}, /process/, /process/{id}, /process/{id}/download
+- the threat intel API: /threats, /breaches, /products,
+  /threats/{id}/iocs and /threats/{id}/advisory (a text PDF)
+- the threat intel news feed (POST /get_threat_intel)
+
+Every response can be delayed and a fraction of them failed with 503, so
+the servers' retry, caching and backpressure paths can be exercised offline.
+Point the servers at it with KEV_URL, VULN_API_BASE_URL,
+THREATINTEL_API_BASE_URL and THREATINTEL_NEWS_URL (see upstream_env).
+
+Usage:
+    python bench_upstream.py [--port 8900] [--latency-ms 50] [--error-rate 0.01] [--job-seconds 5]
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import itertools
+import json
+import random
+import time
+import zipfile
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from aiohttp import web
+
+VENDORS = ["Microsoft", "Cisco", "Fortinet", "Ivanti", "Citrix", "Apple", "Google", "VMware", "Oracle", "Adobe"]
+PRODUCTS = ["Windows", "Exchange Server", "IOS XE", "FortiOS", "Connect Secure", "NetScaler ADC",
+            "iOS", "Chrome", "vCenter Server", "WebLogic Server"]
+ACTORS = ["APT28", "APT29", "Lazarus Group", "Volt Typhoon", "Scattered Spider", "LockBit", "Cl0p", "FIN7"]
+INDUSTRIES = ["healthcare", "finance", "energy", "government", "manufacturing", "education"]
+REGIONS = ["United States", "Germany", "Japan", "United Kingdom", "India", "Brazil"]
+TERMS = ["ransomware", "phishing", "zero-day", "supply chain", "credential theft", "botnet", "wiper", "exploit"]
+
+
+@dataclass
+class UpstreamConfig:
+    """Shape of the fake data and the faults injected into responses."""
+    kev_entries: int = 1500
+    listing_size: int = 500
+    news_items: int = 2000
+    advisory_pages: int = 8
+    # Mean added latency per response; each response waits 0.5x-1.5x of it
+    latency_ms: float = 50.0
+    # Extra latency for advisory PDFs, which are large upstream
+    pdf_latency_ms: float = 200.0
+    # Fraction of responses answered with 503
+    error_rate: float = 0.0
+    # How long a prioritization job runs before it reports completed
+    job_seconds: float = 5.0
+    seed: int = 7
+    hits: dict = field(default_factory=dict)
+
+
+def cve_at(index: int) -> str:
+    """The index-th CVE ID in the fake KEV catalog, also used by the load generator."""
+    return f"CVE-{2020 + index % 6}-{10000 + index}"
+
+
+def ioc_hash(report_id: str, index: int) -> str:
+    """The index-th file hash listed in a report's IOC section, also used by the load generator."""
+    return hashlib.sha256(f"{report_id}:{index}".encode()).hexdigest()
+
+
+def _pdf(pages: list[str]) -> bytes:
+    """A minimal PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               f"<< /Type /Pages /Kids [{' '.join(f'{4 + 2 * i} 0 R' for i in range(len(pages)))}] /Count {len(pages)} >>",
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for index, text in enumerate(pages):
+        text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+        stream = f"BT /F1 10 Tf 20 700 Td ({text}) Tj ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * index} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    out = "%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n"
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+    return out.encode("latin-1")
+
+
+class FakeUpstream:
+    """Builds the synthetic datasets once and serves them from an aiohttp app."""
+
+    def __init__(self, config: UpstreamConfig):
+        self.config = config
+        rng = random.Random(config.seed)
+        today = date.today()
+
+        self.kev = {
+            "title": "CISA Catalog of Known Exploited Vulnerabilities",
+            "catalogVersion": today.strftime("%Y.%m.%d"),
+            "dateReleased": f"{today.isoformat()}T00:00:00.000Z",
+            "count": config.kev_entries,
+            "vulnerabilities": [
+                {
+                    "cveID": cve_at(i),
+                    "vendorProject": VENDORS[i % len(VENDORS)],
+                    "product": PRODUCTS[i % len(PRODUCTS)],
+                    "vulnerabilityName": f"{VENDORS[i % len(VENDORS)]} {PRODUCTS[i % len(PRODUCTS)]} vulnerability {i}",
+                    "dateAdded": (today - timedelta(days=i * 730 // max(1, config.kev_entries))).isoformat(),
+                    "shortDescription": " ".join(rng.choices(TERMS, k=12)),
+                    "requiredAction": "Apply mitigations per vendor instructions or discontinue use of the product.",
+                    "dueDate": (today + timedelta(days=21 - i % 30)).isoformat(),
+                    "knownRansomwareCampaignUse": "Known" if i % 4 == 0 else "Unknown",
+                    "notes": f"https://nvd.nist.gov/vuln/detail/{cve_at(i)}",
+                    "cwes": [f"CWE-{20 + i % 80}"],
+                }
+                for i in range(config.kev_entries)
+            ],
+        }
+        self.kev_body = json.dumps(self.kev).encode()
+        self.kev_etag = '"' + hashlib.sha256(self.kev_body).hexdigest()[:16] + '"'
+
+        self.news = [
+            {
+                "source": "bench",
+                "threat_article_url": f"https://news.example/{i}",
+                "threat_article_title": f"{ACTORS[i % len(ACTORS)]} {TERMS[i % len(TERMS)]} campaign {i}",
+                "date_published": (today - timedelta(days=i % 365)).isoformat(),
+                "threat_severity": ["low", "medium", "high", "critical"][i % 4],
+                "threat_information_available": " ".join(rng.choices(TERMS, k=40)),
+                "primary_threat_actor": ACTORS[i % len(ACTORS)],
+                "threat_actor_group": [ACTORS[(i + 1) % len(ACTORS)]],
+                "primary_industry_af1cted": INDUSTRIES[i % len(INDUSTRIES)],
+                "industries_affected": INDUSTRIES[i % 3:i % 3 + 2],
+                "regions_or_countries_targeted": [REGIONS[i % len(REGIONS)]],
+                "cve_ids": ", ".join(cve_at((i * 7 + k) % max(1, config.kev_entries)) for k in range(2)),
+                "product_exploited": PRODUCTS[i % len(PRODUCTS)],
+            }
+            for i in range(config.news_items)
+        ]
+        self.news_body = json.dumps(self.news).encode()
+
+        self._pdfs = {}
+        self._jobs = {}
+        self._job_ids = itertools.count(1)
+
+    # Fault injection
+
+    def _hit(self, name: str):
+        self.config.hits[name] = self.config.hits.get(name, 0) + 1
+
+    async def _delay(self, extra_ms: float = 0.0):
+        latency = (self.config.latency_ms + extra_ms) * random.uniform(0.5, 1.5)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    def _failed(self) -> bool:
+        return self.config.error_rate > 0 and random.random() < self.config.error_rate
+
+    @web.middleware
+    async def faults(self, request, handler):
+        self._hit(request.match_info.route.name or request.path)
+        await self._delay(self.config.pdf_latency_ms if request.path.endswith("/advisory") else 0.0)
+        if self._failed():
+            return web.json_response({"error": "injected failure"}, status=503)
+        return await handler(request)
+
+    # CISA KEV
+
+    async def kev_feed(self, request):
+        if request.headers.get("If-None-Match") == self.kev_etag:
+            return web.Response(status=304)
+        return web.Response(body=self.kev_body, content_type="application/json", headers={"ETag": self.kev_etag})
+
+    # Vulnerability API
+
+    async def cve(self, request):
+        cve_id = request.match_info["cve_id"].upper()
+        digest = zlib.crc32(cve_id.encode())
+        if cve_id.endswith("0000"):
+            return web.json_response({"detail": "CVE not found"}, status=404)
+        return web.json_response({
+            "cve_id": cve_id,
+            "description": f"Synthetic advisory for {cve_id}: " + " ".join(TERMS),
+            "cvss": {"score": round(4 + digest % 60 / 10, 1), "vector": "AV:N/AC:L/PR:N/UI:N"},
+            "epss": round(digest % 1000 / 1000, 3),
+            "references": [f"https://nvd.nist.gov/vuln/detail/{cve_id}"],
+        })
+
+    async def submit_job(self, request):
+        payload = await request.json()
+        process_id = f"bench-{next(self._job_ids)}"
+        self._jobs[process_id] = (time.monotonic(), payload.get("cves") or [])
+        return web.json_response({"process_id": process_id, "status": "queued"})
+
+    async def job_status(self, request):
+        job = self._jobs.get(request.match_info["process_id"])
+        if job is None:
+            return web.json_response({"detail": "Not found"}, status=404)
+        elapsed = time.monotonic() - job[0]
+        done = elapsed >= self.config.job_seconds
+        return web.json_response({
+            "status": "completed" if done else "running",
+            "current_step": "done" if done else f"step {int(elapsed) + 1}",
+            "elapsed": round(elapsed, 1),
+        })
+
+    async def job_download(self, request):
+        job = self._jobs.get(request.match_info["process_id"])
+        if job is None:
+            return web.json_response({"detail": "Not found"}, status=404)
+        records = [{"cve": cve, "priority": rank + 1, "score": round(10 - rank * 0.01, 2)}
+                   for rank, cve in enumerate(job[1])]
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("prioritized.json", json.dumps(records))
+        return web.Response(body=buffer.getvalue(), content_type="application/zip")
+
+    # Threat intel API
+
+    def listing(self, kind: str):
+        async def handler(request):
+            query = request.query.get("query", "")
+            limit = min(int(request.query.get("limit", "50")), self.config.listing_size)
+            return web.json_response([
+                {
+                    "id": f"{kind}-{i}",
+                    "title": f"{query or TERMS[i % len(TERMS)]} {kind} report {i}",
+                    "date_published": (date.today() - timedelta(days=i)).isoformat(),
+                    "severity": ["low", "medium", "high", "critical"][i % 4],
+                    "threat_actor": ACTORS[i % len(ACTORS)],
+                    "summary": " ".join(TERMS[(i + k) % len(TERMS)] for k in range(30)),
+                    "affected_products": [PRODUCTS[i % len(PRODUCTS)]],
+                    "cve_ids": [cve_at(i)],
+                }
+                for i in range(limit)
+            ])
+        return handler
+
+    async def iocs(self, request):
+        report = request.match_info["report_id"]
+        seed = int(hashlib.sha256(report.encode()).hexdigest()[:8], 16)
+        rows = "".join(
+            f"<tr><td>10.{seed % 250}.{i}.{(seed + i) % 250}</td>"
+            f"<td>c2-{seed % 997}-{i}.example.net</td>"
+            f"<td>{ioc_hash(report, i)}</td></tr>"
+            for i in range(40)
+        )
+        return web.Response(text=f"<html><body><table>{rows}</table></body></html>", content_type="text/html")
+
+    async def advisory(self, request):
+        report = request.match_info["report_id"]
+        if report.endswith("missing"):
+            return web.json_response({"detail": "No advisory"}, status=404)
+        if report not in self._pdfs:
+            self._pdfs[report] = _pdf([
+                f"Advisory {report} page {page}: " + " ".join(TERMS[(page + k) % len(TERMS)] for k in range(60))
+                for page in range(1, self.config.advisory_pages + 1)
+            ])
+        return web.Response(body=self._pdfs[report], content_type="application/pdf")
+
+    async def news_feed(self, request):
+        return web.Response(body=self.news_body, content_type="application/json")
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.faults])
+        app.router.add_get("/kev.json", self.kev_feed, name="kev")
+        app.router.add_get("/cves/{cve_id}", self.cve, name="cves")
+        app.router.add_post("/process/", self.submit_job, name="process_submit")
+        app.router.add_get("/process/{process_id}", self.job_status, name="process_status")
+        app.router.add_get("/process/{process_id}/download", self.job_download, name="process_download")
+        for kind in ("threats", "breaches", "products"):
+            app.router.add_get(f"/{kind}", self.listing(kind), name=kind)
+        app.router.add_get("/threats/{report_id}/iocs", self.iocs, name="iocs")
+        app.router.add_get("/threats/{report_id}/advisory", self.advisory, name="advisory")
+        app.router.add_post("/get_threat_intel", self.news_feed, name="news")
+        return app
+
+
+def upstream_env(base_url: str) -> dict:
+    """Environment that points both servers at a FakeUpstream served at base_url."""
+    return {
+        "KEV_URL": f"{base_url}/kev.json",
+        "VULN_API_BASE_URL": base_url,
+        "THREATINTEL_API_BASE_URL": base_url,
+        "THREATINTEL_NEWS_URL": f"{base_url}/get_threat_intel",
+        "vuln_api_key": "bench",
+        "threatintel_api_key": "bench",
+    }
+
+
+async def start(config: UpstreamConfig, host: str = "127.0.0.1", port: int = 8900) -> web.AppRunner:
+    """Serve a FakeUpstream in the running event loop until the runner is cleaned up."""
+    runner = web.AppRunner(FakeUpstream(config).app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+def main():
+    defaults = UpstreamConfig()
+    parser = argparse.ArgumentParser(description="Local stand-in for the MCP servers' upstream APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--pdf-latency-ms", type=float, default=defaults.pdf_latency_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--job-seconds", type=float, default=defaults.job_seconds)
+    parser.add_argument("--kev-entries", type=int, default=defaults.kev_entries)
+    parser.add_argument("--news-items", type=int, default=defaults.news_items)
+    args = parser.parse_args()
+
+    config = UpstreamConfig(kev_entries=args.kev_entries, news_items=args.news_items,
+                            latency_ms=args.latency_ms, pdf_latency_ms=args.pdf_latency_ms,
+                            error_rate=args.error_rate, job_seconds=args.job_seconds)
+    for name, value in upstream_env(f"http://{args.host}:{args.port}").items():
+        print(f"export {name}={value}")
+    web.run_app(FakeUpstream(config).app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,49 @@
 import os
-import contextlib
-import secrets
 import json
+import sys
+import functools
 import modal
-from modal import Image, App, asgi_app
-from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
+from modal import asgi_app
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
 from fastmcp import FastMCP
-import requests
+import random
 import time
 import io
-import zipfile
-from fastapi.responses import StreamingResponse
 import asyncio
-from fastapi import FastAPI, Request, HTTPException, Depends
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import io
 import re
-app = modal.App(name="mcp-threatintel-auth")
-
-# Build the Modal image with all required dependencies
-image = modal.Image.debian_slim().run_commands(
-    "apt-get update",
-    "pip install httpx requests uvicorn fastapi pandas geocoder atlassian-python-api boto3 Pillow websockets google-genai openai anthropic",
-    "pip install fastmcp --upgrade",
-    "pip install PyPDF2",
-)
+import html
+import ipaddress
+from urllib.parse import urlsplit, urlunsplit
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+# The shared MCP server infrastructure lives in shared/backend/mcp_common;
+# from a checkout it is imported from there, in the container from the image
+_SHARED_BACKEND = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                "..", "..", "..", "..", "..", "shared", "backend"))
+if os.path.isdir(_SHARED_BACKEND) and _SHARED_BACKEND not in sys.path:
+    sys.path.insert(0, _SHARED_BACKEND)
+
+from mcp_common import (AuthMiddleware, DiskStore, PREFETCH_INTERVAL_SECONDS, PREFETCH_MODE, SingleFlight,
+                        TieredCache, cache_metrics, compact_response, get_logger, log_prefetch_outcomes, metrics,
+                        observe_upstream, run_blocking, run_prefetch_steps, with_prefetch_loop)
+
+# Modal Volume holding the shared disk cache tier (empty keeps it on container-local disk)
+CACHE_VOLUME = os.environ.get("CACHE_VOLUME", "")
+# Directory of the disk cache tier, where the volume is mounted when set (empty disables the tier)
+CACHE_DIR = os.environ.get("CACHE_DIR", "/cache" if CACHE_VOLUME else "/tmp/mcp-threatintel-cache")
+
+# Build the Modal image with only what this server imports; httpx and
+# PyPDF2 are loaded on first use so cold starts pay only for fastmcp. The
+# cache settings are baked in so the container sees the volume it was deployed with
+image = modal.Image.debian_slim().pip_install(
+    "fastmcp",
+    "orjson",
+    "httpx[http2]",
+    "PyPDF2",
+).env({"CACHE_VOLUME": CACHE_VOLUME, "CACHE_DIR": CACHE_DIR}).add_local_python_source("mcp_common")
 
 # Modal secrets
 tr_aws_secrets = [modal.Secret.from_name("tr_aws_secret", environment_name="main")]
@@ -35,159 +53,1536 @@ app_secrets = [modal.Secret.from_name("app_keys", environment_name="main")]
 
 all_secrets = tr_aws_secrets + llm_secrets + aws_secrets + app_secrets
 
+cache_volume = modal.Volume.from_name(CACHE_VOLUME, create_if_missing=True) if CACHE_VOLUME else None
+
 threatintel_mcp = FastMCP(name="mcp-threatintel")
 
+log = get_logger("mcp-threatintel")
+
+
+# Upstream path segments kept as-is in endpoint labels; any other segment is an ID
+ENDPOINT_LITERAL_SEGMENTS = {"iocs", "advisory"}
+
+
+# Upstream endpoints, overridable to point the server at a local stand-in
+THREATINTEL_API_BASE_URL = os.environ.get("THREATINTEL_API_BASE_URL", "https://transilience-threat-intel-api.transilienceapi.com")
+THREATINTEL_NEWS_URL = os.environ.get("THREATINTEL_NEWS_URL", "https://threatintel-internal.transilienceapi.com/get_threat_intel")
+
+# Upstream HTTP client: pool sizes, timeouts, retries and circuit breaker
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", "100"))
+UPSTREAM_MAX_CONNECTIONS_PER_HOST = int(os.environ.get("UPSTREAM_MAX_CONNECTIONS_PER_HOST", "20"))
+UPSTREAM_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("UPSTREAM_CONNECT_TIMEOUT_SECONDS", "5"))
+UPSTREAM_READ_TIMEOUT_SECONDS = float(os.environ.get("UPSTREAM_READ_TIMEOUT_SECONDS", "60"))
+UPSTREAM_RETRIES = int(os.environ.get("UPSTREAM_RETRIES", "2"))
+UPSTREAM_RETRY_BACKOFF_SECONDS = float(os.environ.get("UPSTREAM_RETRY_BACKOFF_SECONDS", "0.5"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "30"))
+
+
+class UpstreamUnavailable(Exception):
+    """The upstream host's circuit is open, or it gave no usable answer after retries."""
+
+
+class CircuitBreaker:
+    """Per-host circuit breaker.
+
+    After `threshold` consecutive failures the circuit opens and calls fail fast.
+    Once `reset_seconds` have passed a single trial call is let through; its
+    success closes the circuit, its failure re-opens it. A trial that ends
+    with neither (it was cancelled) frees the slot through end_trial().
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def end_trial(self):
+        """Free the half-open trial slot; a no-op once the trial's outcome was recorded."""
+        self._trial_in_flight = False
+
+
+class UpstreamClient:
+    """Shared async HTTP client for the Transilience APIs.
+
+    One keep-alive connection pool (HTTP/2 when the h2 package is installed)
+    for every tool call, a cap on concurrent requests per host, explicit
+    timeouts, retries with jittered exponential backoff for idempotent
+    requests, and a circuit breaker per host.
+    """
+
+    RETRY_STATUSES = {429, 502, 503, 504}
+
+    def __init__(self):
+        self._client = None
+        self._client_loop = None
+        self._host_limits = {}
+        self.breakers = {}
+
+    def _get_client(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            try:
+                import h2  # noqa: F401
+                http2 = True
+            except ImportError:
+                http2 = False
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(max_connections=UPSTREAM_MAX_CONNECTIONS,
+                                    max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(UPSTREAM_READ_TIMEOUT_SECONDS, connect=UPSTREAM_CONNECT_TIMEOUT_SECONDS),
+            )
+            self._client_loop = loop
+            self._host_limits = {}
+        return self._client
+
+    async def request(self, method: str, url: str, idempotent: bool = None, **kwargs):
+        """Send a request and return the httpx.Response.
+
+        Raises UpstreamUnavailable when the host's circuit is open or every
+        attempt failed at the transport level.
+        """
+        import httpx
+
+        client = self._get_client()
+        host = httpx.URL(url).host
+        breaker = self.breakers.setdefault(host, CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS))
+        host_limit = self._host_limits.setdefault(host, asyncio.Semaphore(UPSTREAM_MAX_CONNECTIONS_PER_HOST))
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD")
+        attempts = 1 + (UPSTREAM_RETRIES if idempotent else 0)
+
+        for attempt in range(attempts):
+            trial = breaker.state == "half_open"
+            if not breaker.allow():
+                raise UpstreamUnavailable(f"{host} is failing, circuit open for up to {CIRCUIT_RESET_SECONDS:.0f}s")
+
+            last_attempt = attempt == attempts - 1
+            started = time.perf_counter()
+            try:
+                async with host_limit:
+                    response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                observe_upstream(method, url, type(e).__name__, time.perf_counter() - started,
+                                 ENDPOINT_LITERAL_SEGMENTS)
+                breaker.record_failure()
+                if last_attempt:
+                    raise UpstreamUnavailable(f"{method} {url} failed after {attempts} attempt(s): "
+                                              f"{str(e) or type(e).__name__}")
+            except Exception as e:
+                # Decoding errors, redirect loops and the like: not retried, but still a failure
+                observe_upstream(method, url, type(e).__name__, time.perf_counter() - started,
+                                 ENDPOINT_LITERAL_SEGMENTS)
+                breaker.record_failure()
+                raise
+            else:
+                observe_upstream(method, url, response.status_code, time.perf_counter() - started,
+                                 ENDPOINT_LITERAL_SEGMENTS)
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if last_attempt or response.status_code not in self.RETRY_STATUSES:
+                    return response
+            finally:
+                if trial:
+                    breaker.end_trial()
+
+            await asyncio.sleep(UPSTREAM_RETRY_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+    async def get(self, url: str, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+
+upstream = UpstreamClient()
+
 @threatintel_mcp.tool(description="apt news")
-def apt_news(apt_id: str) -> str:
+async def apt_news(apt_id: str) -> str:
     """APT news"""
-    print(f"[debug-server] apt_news({apt_id})")
+    log.debug(f"apt_news({apt_id})")
     return f"The latest news on the {apt_id} APT is..."
 
 @threatintel_mcp.tool(description="Get threat advisories from Transilience Threat Intel API")
-def get_threats(query: str = "", limit: int = 50) -> str:
-    """Get threat advisories. Returns threat reports with IOCs and advisories."""
-    print(f"[debug-server] get_threats(query={query}, limit={limit})")
+@compact_response
+async def get_threats(query: str = "", limit: int = 50, cursor: str = "",
+                      fields: list[str] = None, summary: bool = False) -> dict:
+    """Get threat advisories. Returns threat reports with IOCs and advisories.
 
-    api_key = os.environ["threatintel_api_key"]
+    Results are paged: pass the returned next_cursor back as cursor for the
+    next `limit` records. `fields` keeps only the named keys of each record;
+    summary=True keeps only IDs, titles, dates and severity.
+    """
+    log.debug(f"get_threats(query={query}, limit={limit}, cursor={cursor}, fields={fields}, summary={summary})")
+    return await _search_listing("threats", query, limit, cursor, fields, summary)
 
-    url = "https://transilience-threat-intel-api.transilienceapi.com/threats"
-    headers = {"transilience_threatintel_api_key": api_key}
-    params = {"query": query, "limit": limit}
 
-    response = requests.get(url, headers=headers, params=params)
+# Finished get_threat_report_files results are reused for this long
+REPORT_CACHE_TTL_SECONDS = int(os.environ.get("REPORT_CACHE_TTL_SECONDS", "3600"))
+REPORT_CACHE_MAX_ENTRIES = int(os.environ.get("REPORT_CACHE_MAX_ENTRIES", "500"))
+# Processes used for PDF text extraction
+PDF_EXTRACT_WORKERS = int(os.environ.get("PDF_EXTRACT_WORKERS", "2"))
+# Raw advisory PDFs kept for page-range reads (these are the large entries)
+ADVISORY_PDF_CACHE_MAX_ENTRIES = int(os.environ.get("ADVISORY_PDF_CACHE_MAX_ENTRIES", "50"))
+# Default text budget for one get_threat_report_advisory call
+ADVISORY_MAX_CHARS = int(os.environ.get("ADVISORY_MAX_CHARS", "20000"))
+
+# Size budget of the disk cache tier, and how often replicas pick up the
+# entries others committed to the cache volume
+CACHE_DISK_MAX_BYTES = int(os.environ.get("CACHE_DISK_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+CACHE_VOLUME_RELOAD_SECONDS = int(os.environ.get("CACHE_VOLUME_RELOAD_SECONDS", "60"))
+
+
+cache_disk = DiskStore(CACHE_DIR, CACHE_DISK_MAX_BYTES,
+                       reload=cache_volume.reload if cache_volume is not None else None,
+                       reload_seconds=CACHE_VOLUME_RELOAD_SECONDS) if CACHE_DIR else None
+
+# report_id -> {"iocs", "advisory"} result of get_threat_report_files
+report_cache = TieredCache("report", REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_TTL_SECONDS, disk=cache_disk)
+# sha256 of advisory PDF -> extracted text, so a re-fetched identical PDF is not parsed again
+advisory_text_cache = TieredCache("advisory_text", REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_TTL_SECONDS, disk=cache_disk)
+# report_id -> (sha256, PDF bytes) of its advisory
+advisory_pdf_cache = TieredCache("advisory_pdf", ADVISORY_PDF_CACHE_MAX_ENTRIES, REPORT_CACHE_TTL_SECONDS,
+                                 disk=cache_disk)
+# sha256 -> page count and outline headings
+advisory_meta_cache = TieredCache("advisory_meta", REPORT_CACHE_MAX_ENTRIES, REPORT_CACHE_TTL_SECONDS, disk=cache_disk)
+# (sha256, page index) -> extracted page text
+advisory_page_cache = TieredCache("advisory_page", REPORT_CACHE_MAX_ENTRIES * 20, REPORT_CACHE_TTL_SECONDS,
+                                  disk=cache_disk)
+
+# Upstream listings (threats/breaches/products) are paged from a short-lived
+# cached window, which is served for a while past expiry as it is refreshed
+LISTING_CACHE_TTL_SECONDS = int(os.environ.get("LISTING_CACHE_TTL_SECONDS", "120"))
+LISTING_CACHE_STALE_SECONDS = int(os.environ.get("LISTING_CACHE_STALE_SECONDS", "900"))
+LISTING_FETCH_BLOCK = int(os.environ.get("LISTING_FETCH_BLOCK", "100"))
+LISTING_MAX_RESULTS = int(os.environ.get("LISTING_MAX_RESULTS", "1000"))
+
+# Keys kept by summary=True, whichever of them a record has
+SUMMARY_FIELDS = ("id", "report_id", "_id", "title", "name", "threat_article_title",
+                  "date", "date_published", "published", "published_date", "created_at",
+                  "severity", "threat_severity")
+
+# (endpoint, query) -> (records, upstream limit they were fetched with)
+listing_cache = TieredCache("listing", REPORT_CACHE_MAX_ENTRIES, LISTING_CACHE_TTL_SECONDS,
+                            LISTING_CACHE_STALE_SECONDS, cache_disk)
 
-    if response.status_code == 200:
-        return json.dumps(response.json(), indent=2)
+# Concurrent misses for the same upstream resource or parse share one call
+listing_flight = SingleFlight("listing")
+report_flight = SingleFlight("report")
+advisory_pdf_flight = SingleFlight("advisory_pdf")
+advisory_parse_flight = SingleFlight("advisory_parse")
+
+
+def _listing_records(payload) -> list:
+    """The list of records in an upstream listing response."""
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        for value in payload.values():
+            if isinstance(value, list):
+                return value
+    return [payload]
+
+
+def _project(record, fields):
+    if not isinstance(record, dict):
+        return record
+    return {key: record[key] for key in fields if key in record}
+
+
+async def _fetch_listing(kind: str, query: str, fetched_limit: int):
+    """Fetch one listing window into listing_cache; returns its records, or an error payload dict.
+
+    Concurrent fetches of the same window share one upstream request.
+    """
+    return await listing_flight.do((kind, query, fetched_limit),
+                                   functools.partial(_request_listing, kind, query, fetched_limit))
+
+
+async def _request_listing(kind: str, query: str, fetched_limit: int):
+    headers = {"transilience_threatintel_api_key": os.environ["threatintel_api_key"]}
+    params = {"query": query, "limit": fetched_limit}
+    try:
+        response = await upstream.get(f"{THREATINTEL_API_BASE_URL}/{kind}", headers=headers, params=params)
+    except UpstreamUnavailable as e:
+        return {"error": "Upstream unavailable", "message": str(e)}
+    if response.status_code != 200:
+        return {"error": f"Status {response.status_code}", "message": response.text}
+
+    records = _listing_records(response.json())
+    listing_cache.put((kind, query), (records, fetched_limit))
+    _index_in_background(kind, records)
+    return records
+
+
+async def _search_listing(kind: str, query: str, limit: int, cursor: str, fields: list[str], summary: bool) -> dict:
+    """One page of an upstream listing, fetched in blocks and projected before serialization."""
+    try:
+        offset = int(cursor) if cursor else 0
+    except ValueError:
+        return {"error": f"Invalid cursor: {cursor}"}
+    offset = max(0, offset)
+    limit = max(1, min(limit, LISTING_MAX_RESULTS))
+    needed = min(offset + limit, LISTING_MAX_RESULTS)
+
+    # Reuse the cached window if it covers this page, or if upstream already
+    # returned everything; an expired window is served while it is refreshed
+    cache_key = (kind, query)
+    hit = await listing_cache.lookup(cache_key)
+    if hit is not None and (len(hit[0][0]) >= needed or len(hit[0][0]) < hit[0][1]):
+        (records, fetched_limit), fresh = hit
+        if not fresh:
+            listing_cache.revalidate(cache_key, functools.partial(_fetch_listing, kind, query, fetched_limit))
     else:
-        return json.dumps({"error": f"Status {response.status_code}", "message": response.text})
+        fetched_limit = min(-(-needed // LISTING_FETCH_BLOCK) * LISTING_FETCH_BLOCK, LISTING_MAX_RESULTS)
+        records = await _fetch_listing(kind, query, fetched_limit)
+        if isinstance(records, dict):
+            return records
+
+    page = records[offset:offset + limit]
+    if summary:
+        fields = SUMMARY_FIELDS
+    if fields:
+        page = [_project(record, fields) for record in page]
+
+    end = offset + len(page)
+    more = end < len(records) or (len(records) >= fetched_limit and end < LISTING_MAX_RESULTS)
+    return {
+        "results": page,
+        "count": len(page),
+        "offset": offset,
+        "next_cursor": str(end) if more and page else None,
+    }
+
+_pdf_executor = None
+
+
+def _get_pdf_executor():
+    """Process pool for PDF extraction, created on first use."""
+    global _pdf_executor
+    if _pdf_executor is None:
+        from concurrent.futures import ProcessPoolExecutor
+        _pdf_executor = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+    return _pdf_executor
+
+
+def _clean_pdf_text(text: str) -> str:
+    # Remove img tags and their content using regex
+    return re.sub(r'<img.*?</img>', '', text, flags=re.DOTALL)
+
+
+def _extract_pdf_text(pdf_content: bytes) -> str:
+    """Convert advisory PDF bytes to text. Runs in the PDF process pool."""
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+    return _clean_pdf_text("".join(page.extract_text() or "" for page in pdf_reader.pages))
+
+
+def _extract_pdf_pages(pdf_content: bytes, page_indexes: list[int]) -> list[str]:
+    """Text of the given 0-based pages only. Runs in the PDF process pool."""
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+    return [_clean_pdf_text(pdf_reader.pages[i].extract_text() or "") for i in page_indexes]
+
+
+def _pdf_metadata(pdf_content: bytes) -> dict:
+    """Page count and outline headings, without extracting any page text. Runs in the PDF process pool."""
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+    headings = []
+
+    def walk(outline, level):
+        for item in outline:
+            if isinstance(item, list):
+                walk(item, level + 1)
+                continue
+            try:
+                page = pdf_reader.get_destination_page_number(item) + 1
+            except Exception:
+                page = None
+            headings.append({"title": item.title, "page": page, "level": level})
+
+    try:
+        walk(pdf_reader.outline, 0)
+    except Exception as e:
+        log.warning(f"could not read advisory outline: {e}")
+
+    return {"page_count": len(pdf_reader.pages), "headings": headings}
+
+
+async def _run_in_pdf_pool(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_pdf_executor(), fn, *args)
+
+
+async def _get_advisory_pdf(report_id: str, headers: dict):
+    """Return (sha256, PDF bytes) of a report's advisory, or (None, error message).
+
+    Concurrent misses for the same report share one download.
+    """
+    cached = await advisory_pdf_cache.get(report_id)
+    if cached is not None:
+        return cached
+    return await advisory_pdf_flight.do(report_id, functools.partial(_download_advisory_pdf, report_id, headers))
+
+
+async def _download_advisory_pdf(report_id: str, headers: dict):
+    import hashlib
+
+    advisory_url = f"{THREATINTEL_API_BASE_URL}/threats/{report_id}/advisory"
+    try:
+        advisory_response = await upstream.get(advisory_url, headers=headers)
+    except UpstreamUnavailable as e:
+        return None, f"Failed to get Advisory: {e}"
+    if advisory_response.status_code != 200:
+        return None, f"Failed to get Advisory: Status {advisory_response.status_code}"
+
+    entry = (hashlib.sha256(advisory_response.content).hexdigest(), advisory_response.content)
+    advisory_pdf_cache.put(report_id, entry)
+    return entry
+
+
+async def _advisory_text(digest: str, pdf_content: bytes) -> str:
+    """Extracted advisory text, content-addressed by the PDF's sha256; one extraction per PDF at a time."""
+    text = await advisory_text_cache.get(digest)
+    if text is None:
+        async def extract():
+            text = await _run_in_pdf_pool(_extract_pdf_text, pdf_content)
+            advisory_text_cache.put(digest, text)
+            return text
+
+        text = await advisory_parse_flight.do(("text", digest), extract)
+    return text
+
+
+async def _advisory_metadata(digest: str, pdf_content: bytes) -> dict:
+    meta = await advisory_meta_cache.get(digest)
+    if meta is None:
+        async def extract():
+            meta = await _run_in_pdf_pool(_pdf_metadata, pdf_content)
+            advisory_meta_cache.put(digest, meta)
+            return meta
+
+        meta = await advisory_parse_flight.do(("meta", digest), extract)
+    return meta
+
+
+async def _advisory_pages(digest: str, pdf_content: bytes, page_indexes: list[int]) -> list[str]:
+    """Text of the given 0-based pages, extracting only the ones not cached yet."""
+    cached = await advisory_page_cache.get_many([(digest, i) for i in page_indexes])
+    texts = {i: cached.get((digest, i)) for i in page_indexes}
+    missing = [i for i, text in texts.items() if text is None]
+    if missing:
+        for i, text in zip(missing, await _run_in_pdf_pool(_extract_pdf_pages, pdf_content, missing)):
+            advisory_page_cache.put((digest, i), text)
+            texts[i] = text
+    return [texts[i] for i in page_indexes]
 
 
 @threatintel_mcp.tool(description="Get IOCs and advisory text for a specific threat report")
-def get_threat_report_files(report_id: str) -> str:
+@compact_response
+async def get_threat_report_files(report_id: str) -> dict:
     """
     Gets IOCs and advisory text for a specific threat report ID.
-    Returns JSON containing the IOCs HTML content and advisory text content.
+    Returns JSON containing the IOCs HTML content, the same IOCs parsed into
+    deduplicated {"type", "value"} indicators, and advisory text content.
+    To check known indicators against every fetched report use lookup_indicators.
+    For long advisories prefer get_threat_report_advisory_info and
+    get_threat_report_advisory, which read only the pages asked for.
     """
-    print(f"[debug-server] get_threat_report_files({report_id})")
+    log.debug(f"get_threat_report_files({report_id})")
+    result, _ = await _threat_report_files(report_id)
+    return result
+
+
+async def _threat_report_files(report_id: str) -> tuple[dict, bool]:
+    """(result, complete) for get_threat_report_files; only complete results are cached.
 
+    Concurrent misses for the same report, from the tool or the prefetcher,
+    share one fetch.
+    """
+    cached = await report_cache.get(report_id)
+    if cached is not None:
+        return cached, True
+    return await report_flight.do(report_id, functools.partial(_fetch_threat_report_files, report_id))
+
+
+async def _fetch_threat_report_files(report_id: str) -> tuple[dict, bool]:
     api_key = os.environ["threatintel_api_key"]
     headers = {"transilience_threatintel_api_key": api_key}
 
-    result = {"iocs": None, "advisory": None}
+    result = {"iocs": None, "indicators": [], "advisory": None}
 
-    # Get IOC HTML
-    ioc_url = f"https://transilience-threat-intel-api.transilienceapi.com/threats/{report_id}/iocs"
-    ioc_response = requests.get(ioc_url, headers=headers)
+    async def get_iocs():
+        ioc_url = f"{THREATINTEL_API_BASE_URL}/threats/{report_id}/iocs"
+        try:
+            ioc_response = await upstream.get(ioc_url, headers=headers)
+        except UpstreamUnavailable as e:
+            return False, f"Failed to get IOCs: {e}"
+        if ioc_response.status_code == 200:
+            return True, ioc_response.text
+        return False, f"Failed to get IOCs: Status {ioc_response.status_code}"
 
-    if ioc_response.status_code == 200:
-        result["iocs"] = ioc_response.text
+    # Get IOC HTML and the advisory PDF concurrently
+    (iocs_ok, result["iocs"]), (digest, advisory) = await asyncio.gather(
+        get_iocs(),
+        _get_advisory_pdf(report_id, headers),
+    )
+
+    # Parse the IOC section into typed indicators for lookup_indicators
+    if iocs_ok:
+        result["indicators"] = await run_blocking(extract_indicators, result["iocs"])
+        ioc_index.add(report_id, result["indicators"])
+
+    # Convert the advisory PDF to text off the event loop
+    if digest is not None:
+        result["advisory"] = await _advisory_text(digest, advisory)
     else:
-        result["iocs"] = f"Failed to get IOCs: Status {ioc_response.status_code}"
+        result["advisory"] = advisory
 
-    # Get Advisory PDF and convert to text
-    advisory_url = f"https://transilience-threat-intel-api.transilienceapi.com/threats/{report_id}/advisory"
-    advisory_response = requests.get(advisory_url, headers=headers)
+    log.debug(f"get_threat_report_files({report_id}): "
+              f"iocs={len(result['iocs'])} chars, {len(result['indicators'])} indicators, advisory={len(result['advisory'])} chars")
 
-    if advisory_response.status_code == 200:
-        import PyPDF2
+    # Only cache complete reports so failed fetches are retried
+    complete = iocs_ok and digest is not None
+    if complete:
+        report_cache.put(report_id, result)
+    if digest is not None:
+        _index_in_background("advisory", [(report_id, {"id": report_id, "advisory": result["advisory"]})])
+    return result, complete
 
-        # Convert PDF bytes to text
-        pdf_bytes = io.BytesIO(advisory_response.content)
-        pdf_reader = PyPDF2.PdfReader(pdf_bytes)
 
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+@threatintel_mcp.tool(description="Get page count and section headings of a threat report advisory")
+@compact_response
+async def get_threat_report_advisory_info(report_id: str) -> dict:
+    """
+    Gets the page count and outline headings of a report's advisory PDF
+    without extracting its text. Use it to pick pages for get_threat_report_advisory.
+    """
+    log.debug(f"get_threat_report_advisory_info({report_id})")
+
+    headers = {"transilience_threatintel_api_key": os.environ["threatintel_api_key"]}
+    digest, advisory = await _get_advisory_pdf(report_id, headers)
+    if digest is None:
+        return {"error": advisory}
 
-        # Remove text between head tags
-        # Remove img tags and their content using regex
-        text = re.sub(r'<img.*?</img>', '', text, flags=re.DOTALL)
-        result["advisory"] = text
-        print("text --------:\n\n")
-        print(len(text))
-    else:
-        result["advisory"] = f"Failed to get Advisory: Status {advisory_response.status_code}"
+    meta = await _advisory_metadata(digest, advisory)
+    return {"report_id": report_id, "pdf_bytes": len(advisory), **meta}
 
-    print("result --------:\n\n")
-    print(result.keys())
-    print(result["advisory"])
-    print(result["iocs"])
-    return json.dumps(result)
 
+@threatintel_mcp.tool(description="Get advisory text for a page range of a threat report")
+@compact_response
+async def get_threat_report_advisory(report_id: str, start_page: int = 1, end_page: int = None,
+                                     cursor: str = "", max_chars: int = ADVISORY_MAX_CHARS) -> dict:
+    """
+    Gets advisory text for pages start_page..end_page (1-based, inclusive),
+    extracting only those pages. At most max_chars characters are returned;
+    pass the returned next_cursor back as cursor to continue reading.
+    """
+    log.debug(f"get_threat_report_advisory({report_id}, start_page={start_page}, "
+              f"end_page={end_page}, cursor={cursor}, max_chars={max_chars})")
 
-@threatintel_mcp.tool(description="Get breach advisories from Transilience Threat Intel API")
-def get_breaches(query: str = "", limit: int = 50) -> str:
-    """Get breach advisories. Returns breach reports with IOCs and advisories."""
-    print(f"[debug-server] get_breaches(query={query}, limit={limit})")
+    # Cursor is "page:offset" within the page (1-based page)
+    offset = 0
+    if cursor:
+        try:
+            page_part, offset_part = cursor.split(":")
+            start_page, offset = int(page_part), int(offset_part)
+        except ValueError:
+            return {"error": f"Invalid cursor: {cursor}"}
 
-    api_key = os.environ["threatintel_api_key"]
+    headers = {"transilience_threatintel_api_key": os.environ["threatintel_api_key"]}
+    digest, advisory = await _get_advisory_pdf(report_id, headers)
+    if digest is None:
+        return {"error": advisory}
 
-    url = "https://transilience-threat-intel-api.transilienceapi.com/breaches"
-    headers = {"transilience_threatintel_api_key": api_key}
-    params = {"query": query, "limit": limit}
+    page_count = (await _advisory_metadata(digest, advisory))["page_count"]
+    first = max(1, start_page)
+    last = min(page_count, end_page or page_count)
+    max_chars = max(1, max_chars)
 
-    response = requests.get(url, headers=headers, params=params)
+    # Extract a few pages at a time until the character budget is spent
+    parts = []
+    used = 0
+    page = first
+    next_cursor = None
+    while page <= last and next_cursor is None:
+        batch = list(range(page, min(last, page + 3) + 1))
+        for number, text in zip(batch, await _advisory_pages(digest, advisory, [n - 1 for n in batch])):
+            start = offset if number == first else 0
+            chunk = text[start:start + max_chars - used]
+            parts.append(chunk)
+            used += len(chunk)
+            if start + len(chunk) < len(text):
+                next_cursor = f"{number}:{start + len(chunk)}"
+                break
+            page = number + 1
+            if used >= max_chars and page <= last:
+                next_cursor = f"{page}:0"
+                break
 
-    if response.status_code == 200:
-        return json.dumps(response.json(), indent=2)
-    else:
-        return json.dumps({"error": f"Status {response.status_code}", "message": response.text})
+    return {
+        "report_id": report_id,
+        "page_count": page_count,
+        "start_page": first,
+        "end_page": last,
+        "text": "".join(parts),
+        "next_cursor": next_cursor,
+    }
+
+
+@threatintel_mcp.tool(description="Get breach advisories from Transilience Threat Intel API")
+@compact_response
+async def get_breaches(query: str = "", limit: int = 50, cursor: str = "",
+                       fields: list[str] = None, summary: bool = False) -> dict:
+    """Get breach advisories. Returns breach reports with IOCs and advisories.
+
+    Results are paged: pass the returned next_cursor back as cursor for the
+    next `limit` records. `fields` keeps only the named keys of each record;
+    summary=True keeps only IDs, titles, dates and severity.
+    """
+    log.debug(f"get_breaches(query={query}, limit={limit}, cursor={cursor}, fields={fields}, summary={summary})")
+    return await _search_listing("breaches", query, limit, cursor, fields, summary)
 
 
 @threatintel_mcp.tool(description="Get product advisories from Transilience Threat Intel API")
-def get_products(query: str = "", limit: int = 50) -> str:
-    """Get product advisories. Returns product vulnerability reports with IOCs and advisories."""
-    print(f"[debug-server] get_products(query={query}, limit={limit})")
+@compact_response
+async def get_products(query: str = "", limit: int = 50, cursor: str = "",
+                       fields: list[str] = None, summary: bool = False) -> dict:
+    """Get product advisories. Returns product vulnerability reports with IOCs and advisories.
 
-    api_key = os.environ["threatintel_api_key"]
+    Results are paged: pass the returned next_cursor back as cursor for the
+    next `limit` records. `fields` keeps only the named keys of each record;
+    summary=True keeps only IDs, titles, dates and severity.
+    """
+    log.debug(f"get_products(query={query}, limit={limit}, cursor={cursor}, fields={fields}, summary={summary})")
+    return await _search_listing("products", query, limit, cursor, fields, summary)
 
-    url = "https://transilience-threat-intel-api.transilienceapi.com/products"
-    headers = {"transilience_threatintel_api_key": api_key}
-    params = {"query": query, "limit": limit}
 
-    response = requests.get(url, headers=headers, params=params)
-    print(response.json())
-    if response.status_code == 200:
-        return json.dumps(response.json(), indent=2)
-    else:
-        return json.dumps({"error": f"Status {response.status_code}", "message": response.text})
+# Full-text index over everything the tools fetch
+SEARCH_DB_PATH = os.environ.get("SEARCH_DB_PATH", "/tmp/threatintel_search.sqlite3")
+SEARCH_BODY_MAX_CHARS = int(os.environ.get("SEARCH_BODY_MAX_CHARS", "200000"))
+
+# Record keys feeding each indexed column; every other string value goes to body
+SEARCH_FIELDS = {
+    "title": ("title", "name", "threat_article_title", "threat_name"),
+    "summary": ("summary", "description", "threat_information_available", "immediate_impact"),
+    "actors": ("threat_actor", "threat_actors", "actors", "primary_threat_actor", "threat_actor_group"),
+    "ttps": ("ttps", "threat_actor_ttps", "exploited_tools_techniques", "techniques"),
+    "products": ("products", "product", "affected_products", "product_exploited", "software_exploited",
+                 "software_version_exploited"),
+}
+SEARCH_ID_FIELDS = ("id", "report_id", "_id", "threat_article_url", "source_article_link")
+SEARCH_DATE_FIELDS = ("date", "date_published", "published", "published_date", "created_at")
+
+
+def _search_text(value) -> str:
+    """Flatten a record value (str, list, dict, number) to indexable text."""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return " ".join(_search_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_search_text(v) for v in value)
+    return str(value)
+
+
+def _first(record: dict, keys) -> str:
+    for key in keys:
+        if record.get(key):
+            return str(record[key])
+    return ""
+
+
+class SearchIndex:
+    """SQLite FTS5 index over threats, breaches, products, news and advisory text.
+
+    Documents are added as the tools fetch them (keyed by source and ID, and
+    skipped when unchanged), so search_threat_intel answers ranked queries
+    locally instead of fanning out to the upstream search endpoints.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+                    title, summary, actors, ttps, products, body,
+                    tokenize = 'porter unicode61'
+                );
+                CREATE TABLE IF NOT EXISTS search_docs (
+                    source TEXT NOT NULL,
+                    doc_id TEXT NOT NULL,
+                    fts_rowid INTEGER NOT NULL,
+                    row_hash TEXT NOT NULL,
+                    title TEXT,
+                    date TEXT,
+                    PRIMARY KEY (source, doc_id)
+                );
+                CREATE INDEX IF NOT EXISTS search_docs_rowid ON search_docs (fts_rowid);
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _document(self, record) -> dict:
+        if not isinstance(record, dict):
+            return {"title": "", "summary": "", "actors": "", "ttps": "", "products": "",
+                    "body": _search_text(record)[:SEARCH_BODY_MAX_CHARS]}
+        doc = {column: " ".join(_search_text(record.get(key)) for key in keys if record.get(key))
+               for column, keys in SEARCH_FIELDS.items()}
+        claimed = {key for keys in SEARCH_FIELDS.values() for key in keys}
+        doc["body"] = " ".join(_search_text(v) for k, v in record.items()
+                               if k not in claimed and isinstance(v, (str, list, dict)))[:SEARCH_BODY_MAX_CHARS]
+        return doc
+
+    def add_many(self, source: str, records) -> int:
+        """Index (doc_id, record) pairs or bare records for one source; returns how many changed."""
+        import hashlib
+
+        changed = 0
+        with self._lock:
+            db = self._db()
+            with db:
+                for item in records:
+                    doc_id, record = item if isinstance(item, tuple) else (None, item)
+                    if isinstance(record, dict):
+                        doc_id = doc_id or _first(record, SEARCH_ID_FIELDS)
+                    doc = self._document(record)
+                    row_hash = hashlib.sha1(json.dumps(doc, sort_keys=True).encode()).hexdigest()
+                    doc_id = doc_id or row_hash
+
+                    existing = db.execute("SELECT fts_rowid, row_hash FROM search_docs WHERE source = ? AND doc_id = ?",
+                                          (source, doc_id)).fetchone()
+                    if existing and existing[1] == row_hash:
+                        continue
+                    if existing:
+                        db.execute("DELETE FROM search_fts WHERE rowid = ?", (existing[0],))
+
+                    cursor = db.execute("INSERT INTO search_fts (title, summary, actors, ttps, products, body) "
+                                        "VALUES (:title, :summary, :actors, :ttps, :products, :body)", doc)
+                    title = doc["title"] or (record.get("title", "") if isinstance(record, dict) else "")
+                    date = _first(record, SEARCH_DATE_FIELDS) if isinstance(record, dict) else ""
+                    db.execute("INSERT OR REPLACE INTO search_docs (source, doc_id, fts_rowid, row_hash, title, date) "
+                               "VALUES (?, ?, ?, ?, ?, ?)",
+                               (source, doc_id, cursor.lastrowid, row_hash, title[:500], date))
+                    changed += 1
+        return changed
+
+    def remove_many(self, source: str, doc_ids) -> int:
+        """Drop documents of one source by ID; returns how many were indexed."""
+        removed = 0
+        with self._lock:
+            db = self._db()
+            with db:
+                for doc_id in doc_ids:
+                    existing = db.execute("SELECT fts_rowid FROM search_docs WHERE source = ? AND doc_id = ?",
+                                          (source, doc_id)).fetchone()
+                    if not existing:
+                        continue
+                    db.execute("DELETE FROM search_fts WHERE rowid = ?", (existing[0],))
+                    db.execute("DELETE FROM search_docs WHERE source = ? AND doc_id = ?", (source, doc_id))
+                    removed += 1
+        return removed
+
+    def count(self, source: str = None) -> int:
+        with self._lock:
+            db = self._db()
+            if source:
+                return db.execute("SELECT COUNT(*) FROM search_docs WHERE source = ?", (source,)).fetchone()[0]
+            return db.execute("SELECT COUNT(*) FROM search_docs").fetchone()[0]
+
+    def search(self, query: str, sources: list[str] = None, limit: int = 20) -> list[dict]:
+        """Ranked hits (bm25, titles weighted highest) with a highlighted snippet."""
+        terms = re.findall(r'\w+', query)
+        if not terms:
+            return []
+
+        source_filter = ""
+        params = []
+        if sources:
+            source_filter = f"AND d.source IN ({', '.join('?' * len(sources))})"
+            params = list(sources)
+
+        sql = f"""
+            SELECT d.source, d.doc_id, d.title, d.date,
+                   bm25(search_fts, 10.0, 4.0, 6.0, 3.0, 3.0, 1.0) AS score,
+                   snippet(search_fts, -1, '[', ']', '...', 16) AS snippet
+            FROM search_fts JOIN search_docs d ON d.fts_rowid = search_fts.rowid
+            WHERE search_fts MATCH ? {source_filter}
+            ORDER BY score LIMIT ?
+        """
+        with self._lock:
+            db = self._db()
+            # Every term first; if nothing matches them all, any term
+            for joiner in (" AND ", " OR "):
+                match = joiner.join(f'"{term}"' for term in terms)
+                rows = db.execute(sql, [match] + params + [limit]).fetchall()
+                if rows or len(terms) == 1:
+                    break
+
+        return [{"source": source, "id": doc_id, "title": title, "date": date,
+                 "score": round(-score, 3), "snippet": snippet}
+                for source, doc_id, title, date, score, snippet in rows]
+
+
+search_index = SearchIndex(SEARCH_DB_PATH)
+_background_tasks = set()
+
+
+def _index_in_background(source: str, records):
+    """Feed fetched records to the search index without delaying the tool response."""
+    task = asyncio.get_running_loop().create_task(run_blocking(search_index.add_many, source, records))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+# Indicators of compromise parsed from report IOC sections
+# Seconds a change to the index may wait before it is snapshotted to the disk tier
+IOC_INDEX_PERSIST_SECONDS = int(os.environ.get("IOC_INDEX_PERSIST_SECONDS", "30"))
+# Seconds between re-reads of the snapshot for reports published by other replicas
+IOC_INDEX_RELOAD_SECONDS = int(os.environ.get("IOC_INDEX_RELOAD_SECONDS", "300"))
+# How long the snapshot outlives its last write in the disk tier
+IOC_INDEX_RETENTION_SECONDS = int(os.environ.get("IOC_INDEX_RETENTION_SECONDS", str(30 * 86400)))
+IOC_LOOKUP_MAX_INDICATORS = int(os.environ.get("IOC_LOOKUP_MAX_INDICATORS", "10000"))
+
+IOC_HASH_TYPES = {32: "md5", 40: "sha1", 64: "sha256"}
+# Extensions of file names in IOC sections that would otherwise pass for domains
+IOC_FILE_EXTENSIONS = {
+    "7z", "apk", "bat", "bin", "cab", "cfg", "cmd", "csv", "dat", "dll", "dmg", "doc", "docm", "docx", "elf",
+    "exe", "gif", "gz", "hta", "htm", "html", "img", "ini", "iso", "jar", "jpg", "js", "jse", "json", "jsp",
+    "lnk", "log", "msi", "pdf", "php", "png", "ppt", "pptx", "ps1", "py", "rar", "rtf", "scr", "sh", "sys",
+    "tar", "tmp", "txt", "vbe", "vbs", "wsf", "xls", "xlsm", "xlsx", "xml", "zip",
+}
+
+IOC_DEFANGED_PATTERN = re.compile(r'[\[({]|hxxp|fxp', re.IGNORECASE)
+IOC_DEFANG_PATTERNS = [
+    (re.compile(r'\[\.\]|\(\.\)|\{\.\}|\[dot\]|\(dot\)', re.IGNORECASE), "."),
+    (re.compile(r'\[:\]|\[://\]'), lambda m: m.group(0)[1:-1]),
+    (re.compile(r'\[@\]|\[at\]|\(at\)', re.IGNORECASE), "@"),
+    (re.compile(r'\bhxxp', re.IGNORECASE), "http"),
+    (re.compile(r'\bfxp', re.IGNORECASE), "ftp"),
+]
+IOC_URL_PATTERN = re.compile(r'\b(?:https?|ftp)://[^\s<>"\'`]+', re.IGNORECASE)
+IOC_EMAIL_PATTERN = re.compile(r'\b[a-z0-9._%+-]+@(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}\b',
+                               re.IGNORECASE)
+# Not followed by "@", so an email's local part ("first.last@") is not taken for a domain
+IOC_DOMAIN_PATTERN = re.compile(r'(?<![\w.-])(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}(?![\w@-])',
+                                re.IGNORECASE)
+IOC_IPV4_PATTERN = re.compile(r'(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?!\.?\d)')
+IOC_IPV6_PATTERN = re.compile(r'(?<![\w:.])(?:[0-9a-f]{0,4}:){2,7}(?:[0-9a-f]{1,4}|(?:\d{1,3}\.){3}\d{1,3})?(?![\w:])',
+                              re.IGNORECASE)
+IOC_HASH_PATTERN = re.compile(r'(?<!\w)(?:[0-9a-f]{64}|[0-9a-f]{40}|[0-9a-f]{32})(?!\w)', re.IGNORECASE)
+
+
+def _refang(text: str) -> str:
+    """Undo the usual defanging (hxxp, [.], [at]) so indicators match their live form."""
+    if not IOC_DEFANGED_PATTERN.search(text):
+        return text
+    for pattern, replacement in IOC_DEFANG_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _normalize_ip(value: str):
+    try:
+        ip = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    if ip.is_unspecified:
+        return None
+    return f"ipv{ip.version}", str(ip)
+
+
+def _normalize_url(value: str):
+    value = value.rstrip(".,;:!?)]}'\"")
+    try:
+        parts = urlsplit(value)
+        host = parts.hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    return "url", urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+def _normalize_domain(value: str):
+    value = value.lower().rstrip(".")
+    if value.rsplit(".", 1)[-1] in IOC_FILE_EXTENSIONS:
+        return None
+    return "domain", value
+
+
+def classify_indicator(value: str):
+    """(type, normalized value) for one indicator, which may be defanged, or None if it is not one."""
+    value = value.strip()
+    # Hashes are never defanged, and are the bulk of most sweeps
+    if IOC_HASH_PATTERN.fullmatch(value):
+        return IOC_HASH_TYPES[len(value)], value.lower()
+    value = _refang(value).strip()
+    if not value:
+        return None
+    if IOC_URL_PATTERN.fullmatch(value):
+        return _normalize_url(value)
+    # A fully qualified name may end in the root label's dot ("evil.example.com.")
+    value = value.rstrip(".")
+    if IOC_EMAIL_PATTERN.fullmatch(value):
+        return "email", value.lower()
+    if IOC_DOMAIN_PATTERN.fullmatch(value):
+        return _normalize_domain(value)
+    return _normalize_ip(value.strip("[]"))
+
+
+def extract_indicators(content: str) -> list[dict]:
+    """Deduplicated {"type", "value"} records for every indicator in an IOC section (HTML or text).
+
+    Values are refanged and normalized the way classify_indicator() does,
+    so a lookup matches whichever form the report used. Hosts inside URLs
+    and email addresses are also reported as domains.
+    """
+    text = _refang(html.unescape(re.sub(r'<[^>]+>', ' ', content or "")))
+    found = set()
+    for match in IOC_HASH_PATTERN.findall(text):
+        found.add((IOC_HASH_TYPES[len(match)], match.lower()))
+    for pattern, normalize in ((IOC_URL_PATTERN, _normalize_url),
+                               (IOC_DOMAIN_PATTERN, _normalize_domain),
+                               (IOC_IPV4_PATTERN, _normalize_ip),
+                               (IOC_IPV6_PATTERN, _normalize_ip)):
+        for match in pattern.findall(text):
+            indicator = normalize(match)
+            if indicator is not None:
+                found.add(indicator)
+    for match in IOC_EMAIL_PATTERN.findall(text):
+        found.add(("email", match.lower()))
+    return [{"type": kind, "value": value} for kind, value in sorted(found)]
+
+
+class IocIndex:
+    """Indicator -> report ID index over the IOC sections of the reports fetched.
+
+    add() replaces a report's normalized indicators in an in-memory hash
+    index, so lookup_many() answers a batch of thousands of indicators with
+    one dict probe each and no report downloads.
+
+    The per-report records are snapshotted to the disk cache tier behind
+    the callers. A new or restarted replica starts from the snapshot, every
+    save merges in the reports other replicas or the prefetcher published,
+    and the snapshot is re-read every reload_seconds.
+    """
+
+    def __init__(self, persist_seconds: float, reload_seconds: float):
+        self.persist_seconds = persist_seconds
+        self.reload_seconds = reload_seconds
+        self._reports = {}  # report_id -> tuple of (type, value)
+        self._index = {}    # value -> (type, set of report IDs)
+        self._lock = threading.Lock()
+        self._next_reload = 0.0
+        self._save_task = None
+
+    def _add_locked(self, report_id: str, indicators: tuple):
+        for _, value in self._reports.pop(report_id, ()):
+            entry = self._index.get(value)
+            if entry is not None:
+                entry[1].discard(report_id)
+                if not entry[1]:
+                    del self._index[value]
+        self._reports[report_id] = indicators
+        for kind, value in indicators:
+            entry = self._index.get(value)
+            if entry is None:
+                self._index[value] = (kind, {report_id})
+            else:
+                entry[1].add(report_id)
+
+    def add(self, report_id: str, indicators: list[dict]):
+        """Record a report's indicators (extract_indicators() records), replacing what it had."""
+        indicators = tuple((record["type"], record["value"]) for record in indicators)
+        with self._lock:
+            if self._reports.get(report_id) == indicators:
+                return
+            self._add_locked(report_id, indicators)
+        self._schedule_save()
+
+    def _merge(self, reports: dict) -> int:
+        """Adopt the reports in a snapshot that this replica does not have; returns how many."""
+        with self._lock:
+            added = [report_id for report_id in reports if report_id not in self._reports]
+            for report_id in added:
+                self._add_locked(report_id, reports[report_id])
+        return len(added)
+
+    def _load_blocking(self):
+        if cache_disk is None:
+            return
+        entry = cache_disk.read("ioc_index", "reports")
+        if entry is not None:
+            added = self._merge(entry[2])
+            if added:
+                log.info(f"IOC index restored {added} report(s) from the cache")
+
+    async def ensure_loaded(self):
+        """Merge the disk snapshot in on first use and then every reload_seconds."""
+        if time.monotonic() < self._next_reload:
+            return
+        self._next_reload = time.monotonic() + self.reload_seconds
+        await run_blocking(self._load_blocking)
+
+    def _save_blocking(self):
+        self._load_blocking()
+        with self._lock:
+            reports = dict(self._reports)
+        expires_at = time.time() + IOC_INDEX_RETENTION_SECONDS
+        cache_disk.write("ioc_index", "reports", expires_at, expires_at, reports)
+
+    async def save(self):
+        """Snapshot the index to the disk tier now, merging in what other replicas published."""
+        if cache_disk is not None:
+            await run_blocking(self._save_blocking)
+
+    def _schedule_save(self):
+        if cache_disk is None or (self._save_task is not None and not self._save_task.done()):
+            return
+
+        async def save_later():
+            await asyncio.sleep(self.persist_seconds)
+            try:
+                await self.save()
+            except Exception as e:
+                log.warning(f"IOC index snapshot failed: {e}")
+
+        self._save_task = asyncio.get_running_loop().create_task(save_later())
+        _background_tasks.add(self._save_task)
+        self._save_task.add_done_callback(_background_tasks.discard)
+
+    async def flush(self):
+        """Save at once if a snapshot is waiting out persist_seconds; used on shutdown."""
+        if self._save_task is not None and not self._save_task.done():
+            self._save_task.cancel()
+            await self.save()
+
+    def lookup_many(self, values) -> dict:
+        """{value: (type, sorted report IDs)} for the normalized values that some report mentions."""
+        matches = {}
+        with self._lock:
+            for value in values:
+                entry = self._index.get(value)
+                if entry is not None:
+                    matches[value] = (entry[0], sorted(entry[1]))
+        return matches
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "reports": len(self._reports),
+                "indicators": len(self._index),
+            }
+
+
+ioc_index = IocIndex(IOC_INDEX_PERSIST_SECONDS, IOC_INDEX_RELOAD_SECONDS)
+metrics.describe("mcp_ioc_index_reports", "gauge", "Reports whose IOCs are in the indicator index")
+metrics.describe("mcp_ioc_index_indicators", "gauge", "Distinct indicators in the indicator index")
+
+
+# Local copy of the threat-intel news feed
+NEWS_DB_PATH = os.environ.get("NEWS_DB_PATH", "/tmp/threatintel_news.sqlite3")
+NEWS_SYNC_INTERVAL_SECONDS = int(os.environ.get("NEWS_SYNC_INTERVAL_SECONDS", "900"))
+
+# Columns kept from the news feed
+NEWS_COLUMNS = ['source', 'source_article_link', 'source_link',
+                'threat_information_available', 'threat_severity', 'threat_article_url',
+                'threat_article_title', 'date_published', 'author', 'company_targeted',
+                'threat_time_range', 'threat_name', 'primary_industry_af1cted',
+                'primary_threat_actor', 'threat_actor_group', 'threat_actor_ttps',
+                'exploited_tools_techniques', 'vulnerabilities_targeted',
+                'immediate_impact', 'industries_affected',
+                'regions_or_countries_targeted','software_exploited', 'product_exploited',
+                'software_version_exploited', 'cve_id', 'cve_ids', 'affected_products']
+
+# Indexed lookup terms: term kind -> news columns it is read from
+NEWS_TERM_COLUMNS = {
+    "actor": ['primary_threat_actor', 'threat_actor_group'],
+    "industry": ['primary_industry_af1cted', 'industries_affected'],
+    "region": ['regions_or_countries_targeted'],
+}
+NEWS_CVE_COLUMNS = ['cve_id', 'cve_ids', 'vulnerabilities_targeted']
+
+CVE_PATTERN = re.compile(r'CVE-\d{4}-\d{4,}', re.IGNORECASE)
+
+
+def _news_values(value) -> list[str]:
+    """Split a news field (list, JSON list string or comma separated string) into normalized values."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        text = value.strip()
+        if text.startswith('['):
+            try:
+                value = json.loads(text)
+            except ValueError:
+                value = re.split(r'[,;]', text.strip('[]'))
+        else:
+            value = re.split(r'[,;]', text)
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+    values = (str(v).strip().strip('\'"').strip().lower() for v in value if v is not None)
+    return [v for v in values if v and v not in ('none', 'null', 'n/a', 'unknown')]
+
+
+class NewsStore:
+    """Local SQLite copy of the threat-intel news feed.
+
+    Only NEWS_COLUMNS are kept. sync() pulls the feed, upserts just the items
+    that are new or changed and deletes the ones that left it; query() answers date, severity, actor, industry, region and CVE
+    filters from indexes without touching the network. Reads are served from
+    the local copy while a due sync runs in the background.
+    """
+
+    def __init__(self, path: str, sync_interval: int):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._conn = None
+        self._lock = threading.Lock()
+        self._sync_lock = None
+        self._sync_task = None
+        self._synced_at = None
+        self._generation = 0
+        self.last_sync = {}
+
+    def _db(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS news (
+                    id TEXT PRIMARY KEY,
+                    date_published TEXT,
+                    severity TEXT,
+                    row_hash TEXT NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS news_date ON news (date_published);
+                CREATE INDEX IF NOT EXISTS news_severity ON news (severity, date_published);
+                CREATE TABLE IF NOT EXISTS news_terms (
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    news_id TEXT NOT NULL,
+                    PRIMARY KEY (kind, value, news_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS news_terms_item ON news_terms (news_id);
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _upsert(self, items: list) -> tuple[dict, list, list]:
+        """Insert new items, rewrite changed ones and delete those no longer in the feed.
+
+        Unchanged items cost one key lookup. An empty feed is taken as an
+        upstream fault rather than every item being withdrawn, so it deletes
+        nothing. Returns the sync stats, the (id, record) pairs that changed
+        and the IDs that were deleted.
+        """
+        import hashlib
+
+        added = updated = 0
+        changed = []
+        seen = set()
+        removed = []
+        with self._lock:
+            db = self._db()
+            with db:
+                for item in items:
+                    if not isinstance(item, dict):
+                        continue
+                    record = {col: item[col] for col in NEWS_COLUMNS if col in item}
+                    data = json.dumps(record, sort_keys=True, default=str)
+                    row_hash = hashlib.sha1(data.encode()).hexdigest()
+                    key = (record.get('threat_article_url') or record.get('source_article_link')
+                           or record.get('source_link') or row_hash)
+                    date_published = str(record.get('date_published') or "")
+                    seen.add(key)
+
+                    existing = db.execute("SELECT row_hash FROM news WHERE id = ?", (key,)).fetchone()
+                    if existing and existing[0] == row_hash:
+                        continue
+
+                    db.execute("INSERT OR REPLACE INTO news (id, date_published, severity, row_hash, data) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               (key, date_published, str(record.get('threat_severity') or "").strip().lower(),
+                                row_hash, data))
+                    db.execute("DELETE FROM news_terms WHERE news_id = ?", (key,))
+
+                    terms = {(kind, v) for kind, cols in NEWS_TERM_COLUMNS.items()
+                             for col in cols for v in _news_values(record.get(col))}
+                    terms.update(("cve", cve.upper()) for col in NEWS_CVE_COLUMNS
+                                 for cve in CVE_PATTERN.findall(str(record.get(col) or "")))
+                    db.executemany("INSERT OR IGNORE INTO news_terms (kind, value, news_id) VALUES (?, ?, ?)",
+                                   [(kind, v, key) for kind, v in terms])
+
+                    changed.append((key, record))
+                    if existing:
+                        updated += 1
+                    else:
+                        added += 1
+
+                if seen:
+                    removed = [row[0] for row in db.execute("SELECT id FROM news") if row[0] not in seen]
+                    db.executemany("DELETE FROM news WHERE id = ?", [(key,) for key in removed])
+                    db.executemany("DELETE FROM news_terms WHERE news_id = ?", [(key,) for key in removed])
+            total = db.execute("SELECT COUNT(*) FROM news").fetchone()[0]
+
+        return {"added": added, "updated": updated, "removed": len(removed), "total": total}, changed, removed
+
+    async def sync(self, refetch: bool = False) -> dict:
+        """Pull the feed and apply the delta to the local store.
+
+        The feed is read from news_feed_cache when another replica or the
+        prefetcher published it recently, unless refetch is set.
+        """
+        if self._sync_lock is None:
+            self._sync_lock = asyncio.Lock()
+        generation = self._generation
+        async with self._sync_lock:
+            # A sync that finished while we waited is good enough
+            if self._generation != generation:
+                return self.last_sync
+
+            items = None if refetch else await news_feed_cache.get(THREATINTEL_NEWS_URL)
+            if items is None:
+                # Make request to get threat intel (a read, so safe to retry)
+                response = await upstream.post(
+                    THREATINTEL_NEWS_URL,
+                    json={"type": "threatintel"},
+                    headers={"Content-Type": "application/json"},
+                    idempotent=True,
+                )
+                response.raise_for_status()
+                items = await run_blocking(response.json)
+                news_feed_cache.put(THREATINTEL_NEWS_URL, items)
+
+            self.last_sync, changed, removed = await run_blocking(self._upsert,
+                                                                  items if isinstance(items, list) else [])
+            await run_blocking(search_index.add_many, "news", changed)
+            await run_blocking(search_index.remove_many, "news", removed)
+            self.last_sync["synced_at"] = time.time()
+            self._synced_at = time.monotonic()
+            self._generation += 1
+            log.info(f"news-store synced {len(items)} items: {self.last_sync}")
+            return self.last_sync
+
+    def documents(self) -> list[tuple[str, dict]]:
+        """Every stored item as the (id, record) pair sync() hands to the search index."""
+        with self._lock:
+            rows = self._db().execute("SELECT id, data FROM news").fetchall()
+        return [(key, json.loads(data)) for key, data in rows]
+
+    def _is_empty(self) -> bool:
+        with self._lock:
+            return self._db().execute("SELECT 1 FROM news LIMIT 1").fetchone() is None
+
+    async def ensure_fresh(self):
+        """Sync inline when the store is empty, otherwise refresh in the background when due."""
+        if self._synced_at is not None and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        if await run_blocking(self._is_empty):
+            await self.sync()
+        elif self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.get_running_loop().create_task(self._background_sync())
+
+    async def _background_sync(self):
+        try:
+            await self.sync()
+        except Exception as e:
+            log.warning(f"news-store background sync failed, serving local copy: {e}")
+
+    def query(self, start_date: str = "", end_date: str = "", severity: str = "", threat_actor: str = "",
+              industry: str = "", region: str = "", cve_id: str = "", limit: int = None,
+              offset: int = 0) -> tuple[list[dict], int]:
+        """Filtered news items, newest first. Returns (items, total matches)."""
+        clauses = []
+        params = []
+        if start_date:
+            clauses.append("date_published >= ?")
+            params.append(start_date)
+        if end_date:
+            # Inclusive of the whole end day whatever the time format after the date
+            next_day = (datetime.fromisoformat(end_date[:10]) + timedelta(days=1)).strftime('%Y-%m-%d')
+            clauses.append("date_published < ?")
+            params.append(next_day)
+        if severity:
+            clauses.append("severity = ?")
+            params.append(severity.strip().lower())
+        for kind, value in (("actor", threat_actor), ("industry", industry), ("region", region),
+                            ("cve", cve_id.strip().upper())):
+            if value:
+                clauses.append("id IN (SELECT news_id FROM news_terms WHERE kind = ? AND value = ?)")
+                params.extend([kind, value.strip().lower() if kind != "cve" else value])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            db = self._db()
+            total = db.execute(f"SELECT COUNT(*) FROM news {where}", params).fetchone()[0]
+            rows = db.execute(f"SELECT data FROM news {where} ORDER BY date_published DESC LIMIT ? OFFSET ?",
+                              params + [-1 if limit is None else limit, offset]).fetchall()
+        return [json.loads(row[0]) for row in rows], total
+
+
+# Raw news feed, shared through the disk tier so replicas and the prefetcher fetch it once
+news_feed_cache = TieredCache("news_feed", 1, NEWS_SYNC_INTERVAL_SECONDS, disk=cache_disk)
+news_store = NewsStore(NEWS_DB_PATH, NEWS_SYNC_INTERVAL_SECONDS)
+
+
+@metrics.collect
+def _threatintel_metrics():
+    yield from cache_metrics({
+        "report": report_cache,
+        "advisory_text": advisory_text_cache,
+        "advisory_pdf": advisory_pdf_cache,
+        "advisory_meta": advisory_meta_cache,
+        "advisory_page": advisory_page_cache,
+        "listing": listing_cache,
+        "news_feed": news_feed_cache,
+    }, cache_disk)
+    stats = ioc_index.stats()
+    yield "mcp_ioc_index_reports", (), stats["reports"]
+    yield "mcp_ioc_index_indicators", (), stats["indicators"]
 
 
 @threatintel_mcp.tool(description="get all threat intel news")
-def get_all_threatintel_news() -> str:
+@compact_response
+async def get_all_threatintel_news() -> list[dict] | dict:
     """Get all threat intel news"""
-    print(f"[debug-server] get_all_threatintel_news()")
-    import requests
-    # Make request to get threat intel
-    response = requests.post(
-        "https://threatintel-internal.transilienceapi.com/get_threat_intel",
-        json={"type": "threatintel"},
-        headers={"Content-Type": "application/json"}
-    )
-    t_json = response.json()
-    # Convert to DataFrame to filter and select specific columns
-    import pandas as pd
-    df = pd.DataFrame(t_json)
-
-    # Define columns to keep (based on the provided column list)
-    cols_to_keep = ['source', 'source_article_link', 'source_link',
-                    'threat_information_available', 'threat_severity', 'threat_article_url',
-                    'threat_article_title', 'date_published', 'author', 'company_targeted',
-                    'threat_time_range', 'threat_name', 'primary_industry_af1cted',
-                    'primary_threat_actor', 'threat_actor_group', 'threat_actor_ttps',
-                    'exploited_tools_techniques', 'vulnerabilities_targeted',
-                    'immediate_impact', 'industries_affected',
-                    'regions_or_countries_targeted','software_exploited', 'product_exploited',
-                    'software_version_exploited', 'cve_id', 'cve_ids', 'affected_products']
-
-    # Filter to only include columns that exist in the DataFrame
-    available_cols = [col for col in cols_to_keep if col in df.columns]
-    df_filtered = df[available_cols]
-
-    # Convert back to JSON format
-    t_json_filtered = df_filtered.to_dict('records')
-    print(t_json_filtered)
-    return t_json_filtered
+    log.debug("get_all_threatintel_news()")
+
+    try:
+        await news_store.ensure_fresh()
+    except Exception as e:
+        return {"error": "Upstream unavailable", "message": str(e)}
+
+    items, total = await run_blocking(news_store.query)
+    log.debug(f"get_all_threatintel_news(): {total} items")
+    return items
+
+
+@threatintel_mcp.tool(description="Search locally stored threat intel news by date, severity, actor, industry, region or CVE")
+@compact_response
+async def query_threatintel_news(start_date: str = "", end_date: str = "", severity: str = "",
+                                 threat_actor: str = "", industry: str = "", region: str = "",
+                                 cve_id: str = "", limit: int = 100, offset: int = 0) -> dict:
+    """
+    Query the local copy of the threat intel news feed. All filters are optional
+    and combined with AND; text filters are exact, case-insensitive matches.
+
+    Args:
+        start_date: Earliest date_published, YYYY-MM-DD
+        end_date: Latest date_published, YYYY-MM-DD (inclusive)
+        severity: threat_severity value, e.g. "high"
+        threat_actor: primary_threat_actor or threat_actor_group
+        industry: primary_industry_af1cted or industries_affected entry
+        region: regions_or_countries_targeted entry
+        cve_id: CVE mentioned in cve_id, cve_ids or vulnerabilities_targeted
+        limit: Maximum number of items to return (default: 100)
+        offset: Number of matching items to skip (default: 0)
+    """
+    log.debug(f"query_threatintel_news(start_date={start_date}, end_date={end_date}, "
+              f"severity={severity}, threat_actor={threat_actor}, industry={industry}, region={region}, "
+              f"cve_id={cve_id}, limit={limit}, offset={offset})")
+
+    try:
+        await news_store.ensure_fresh()
+        items, total = await run_blocking(news_store.query, start_date, end_date, severity,
+                                          threat_actor, industry, region, cve_id,
+                                          max(0, limit), max(0, offset))
+    except ValueError as e:
+        return {"success": False, "error": f"Invalid filter: {e}"}
+    except Exception as e:
+        return {"success": False, "error": f"News store unavailable: {e}"}
+
+    return {
+        "success": True,
+        "total": total,
+        "count": len(items),
+        "offset": offset,
+        "last_sync": news_store.last_sync,
+        "results": items,
+    }
+
+@threatintel_mcp.tool(description="Full-text search across threats, breaches, products, news and advisory text")
+@compact_response
+async def search_threat_intel(query: str, sources: list[str] = None, limit: int = 20) -> dict:
+    """
+    Ranked local full-text search over everything the threat intel tools have
+    fetched: titles, summaries, actor names, TTPs, products and advisory text.
+
+    Args:
+        query: Search terms, e.g. "ransomware healthcare citrix"
+        sources: Restrict to some of "threats", "breaches", "products", "news", "advisory"
+        limit: Maximum number of hits (default: 20)
+    """
+    log.debug(f"search_threat_intel(query={query}, sources={sources}, limit={limit})")
+
+    try:
+        await news_store.ensure_fresh()
+        # News stored before the index existed (e.g. a persisted store) is backfilled once
+        if await run_blocking(search_index.count, "news") == 0:
+            # Keyed by the store's IDs, so later syncs update and delete the same documents
+            await run_blocking(search_index.add_many, "news", await run_blocking(news_store.documents))
+    except Exception as e:
+        log.warning(f"search_threat_intel: news refresh failed, searching local index: {e}")
+
+    hits = await run_blocking(search_index.search, query, sources, max(1, limit))
+    return {
+        "success": True,
+        "query": query,
+        "count": len(hits),
+        "results": hits,
+    }
+
+
+@threatintel_mcp.tool(description="Check IPs, domains, URLs, emails and file hashes in bulk against the IOCs of fetched threat reports")
+@compact_response
+async def lookup_indicators(indicators: list[str], include_misses: bool = False) -> dict:
+    """
+    Match indicators of compromise against the IOC sections of every threat
+    report this server has fetched (by get_threat_report_files or the
+    prefetcher) without downloading any report. Indicators may be defanged
+    (hxxp://, evil[.]com) and are normalized before matching; hashes may be
+    MD5, SHA1 or SHA256. Up to IOC_LOOKUP_MAX_INDICATORS (default 10000)
+    indicators per call.
+
+    Args:
+        indicators: IPv4/IPv6 addresses, domains, URLs, email addresses or file hashes
+        include_misses: Also list the recognized indicators that no report mentions
+    """
+    log.debug(f"lookup_indicators({len(indicators)} indicators, include_misses={include_misses})")
+
+    if len(indicators) > IOC_LOOKUP_MAX_INDICATORS:
+        return {"success": False,
+                "error": f"At most {IOC_LOOKUP_MAX_INDICATORS} indicators per call, got {len(indicators)}"}
+
+    await ioc_index.ensure_loaded()
+
+    def lookup():
+        classified = [(raw, classify_indicator(raw)) for raw in dict.fromkeys(indicators)]
+        matches = ioc_index.lookup_many(found[1] for _, found in classified if found is not None)
+        return classified, matches
+
+    classified, matches = await run_blocking(lookup)
+    results, misses, unrecognized = [], [], []
+    for raw, found in classified:
+        if found is None:
+            unrecognized.append(raw)
+        elif found[1] in matches:
+            results.append({"indicator": raw, "type": found[0], "value": found[1], "report_ids": matches[found[1]][1]})
+        elif include_misses:
+            misses.append({"indicator": raw, "type": found[0], "value": found[1]})
+
+    response = {
+        "success": True,
+        "checked": len(classified),
+        "matched": len(results),
+        "results": results,
+        "unrecognized": unrecognized,
+        "index": ioc_index.stats(),
+    }
+    if include_misses:
+        response["misses"] = misses
+    return response
+
+
+# Listings whose first block is kept warm, and how many of the reports at the
+# top of the threats listing get their IOCs, advisory text and outline prefetched
+PREFETCH_LISTINGS = [kind for kind in os.environ.get("PREFETCH_LISTINGS", "threats,breaches").split(",") if kind]
+PREFETCH_REPORTS = int(os.environ.get("PREFETCH_REPORTS", "10"))
+REPORT_ID_FIELDS = ("id", "report_id", "_id")
+
+
+async def _prefetch_listing(kind: str) -> list:
+    records = await _fetch_listing(kind, "", LISTING_FETCH_BLOCK)
+    if isinstance(records, dict):
+        raise RuntimeError(f"{records['error']}: {records.get('message', '')}")
+    return records
+
+
+async def _prefetch_report(report_id: str):
+    _, complete = await _threat_report_files(report_id)
+    if not complete:
+        raise RuntimeError(f"report {report_id} could not be fetched completely")
+    headers = {"transilience_threatintel_api_key": os.environ["threatintel_api_key"]}
+    digest, advisory = await _get_advisory_pdf(report_id, headers)
+    if digest is not None:
+        await _advisory_metadata(digest, advisory)
+
+
+async def prefetch() -> dict:
+    """Publish the first listing blocks, the news feed and the newest reports to the caches.
+
+    Listings and news go first; the reports at the top of the threats
+    listing are then fetched with their advisory text and outline already
+    extracted, so opening a new report is a cache hit.
+    """
+    started = time.perf_counter()
+    listings = {}
+
+    async def listing(kind):
+        listings[kind] = await _prefetch_listing(kind)
+
+    outcomes = await run_prefetch_steps(
+        [(f"listing:{kind}", "listing", functools.partial(listing, kind)) for kind in PREFETCH_LISTINGS]
+        + [("news", "news", functools.partial(news_store.sync, refetch=True))])
+
+    records = [record for record in listings.get("threats", []) if isinstance(record, dict)]
+    report_ids = list(dict.fromkeys(filter(None, (_first(record, REPORT_ID_FIELDS) for record in records))))
+    outcomes.update(await run_prefetch_steps(
+        [(f"report:{report_id}", "report", functools.partial(_prefetch_report, report_id))
+         for report_id in report_ids[:PREFETCH_REPORTS]]))
+
+    if cache_disk is not None:
+        await ioc_index.save()
+        await cache_disk.flush()
+    log_prefetch_outcomes(outcomes, started)
+    return outcomes
+
 
 app = modal.App(
     name="mcp-threatintel-auth",
@@ -195,10 +1590,30 @@ app = modal.App(
     secrets=all_secrets,
 )
 
-@app.function(image=image, min_containers=1)
+if PREFETCH_MODE == "cron" and PREFETCH_INTERVAL_SECONDS > 0:
+    @app.function(image=image, schedule=modal.Period(seconds=PREFETCH_INTERVAL_SECONDS),
+                  volumes={CACHE_DIR: cache_volume})
+    async def prefetch_threatintel():
+        """Scheduled prefetch; the servers pick the results up from the cache volume."""
+        await prefetch()
+        await cache_volume.commit.aio()
+
+
+# Concurrent MCP requests one container aims to serve before Modal scales
+# out, and the most it will ever accept; tools are async, so a warm container
+# serves many sessions at once
+MODAL_TARGET_INPUTS = int(os.environ.get("MODAL_TARGET_INPUTS", "64"))
+MODAL_MAX_INPUTS = int(os.environ.get("MODAL_MAX_INPUTS", "128"))
+
+# Snapshot the container after imports so new containers restore the loaded
+# modules instead of importing them again; the cache volume, when configured,
+# carries the disk cache tier across replicas and restarts
+@app.function(image=image, min_containers=1, enable_memory_snapshot=True,
+              volumes={CACHE_DIR: cache_volume} if cache_volume is not None else {})
+@modal.concurrent(max_inputs=MODAL_MAX_INPUTS, target_inputs=MODAL_TARGET_INPUTS)
 @asgi_app(label="mcp-threatintel-auth", custom_domains=["threatintelmcp.transilienceapi.com"])
-def threatintelmcp_transilienceapi_com() -> FastAPI:
-    """Entrypoint for Modal to serve the FastAPI + MCP ASGI app."""
+def threatintelmcp_transilienceapi_com() -> Starlette:
+    """Entrypoint for Modal to serve the authenticated MCP ASGI app."""
     # Load valid API keys from environment
     VALID_KEYS = json.loads(os.environ.get("MCP_VALID_KEYS", '["changeme"]'))
 
@@ -210,42 +1625,22 @@ def threatintelmcp_transilienceapi_com() -> FastAPI:
         transport="streamable-http"
     )
 
-    # Pass MCP app's lifespan to FastAPI
-    fast_api_app = FastAPI(
-        title="mcp-streamable",
-        lifespan=mcp_app.lifespan
-    )
+    # Pass MCP app's lifespan to the outer app, with the prefetch loop when it
+    # runs in-process and a pending IOC index snapshot saved on shutdown;
+    # Starlette is already loaded by fastmcp, so wrapping it costs nothing at
+    # cold start
+    web_app = Starlette(lifespan=with_prefetch_loop(mcp_app.lifespan, prefetch, ioc_index.flush))
 
-    # Add authentication middleware
-    @fast_api_app.middleware("http")
-    async def auth_middleware(request: Request, call_next):
-        # Check Authorization header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"error": "Missing Authorization header"}
-            )
+    # Authenticate and rate-limit every request before it reaches the MCP app
+    web_app.add_middleware(AuthMiddleware, valid_keys=VALID_KEYS)
 
-        # Validate Bearer token
-        try:
-            scheme, token = auth_header.split()
-            if scheme.lower() != "bearer":
-                raise ValueError("Invalid authentication scheme")
-            # Use timing-attack resistant comparison
-            if not any(secrets.compare_digest(token, valid_key) for valid_key in VALID_KEYS):
-                raise ValueError("Invalid token")
-        except (ValueError, AttributeError):
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"error": "Invalid Authorization header"}
-            )
+    # Prometheus scrape endpoint, behind the same bearer auth as the MCP app
+    async def metrics_endpoint(request):
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-        # Token is valid, proceed
-        response = await call_next(request)
-        return response
+    web_app.add_route("/metrics", metrics_endpoint)
 
     # Mount the MCP app
-    fast_api_app.mount("/threatintel", mcp_app)
+    web_app.mount("/threatintel", mcp_app)
 
-    return fast_api_app
+    return web_app
@@ -1,31 +1,44 @@
 import os
-import contextlib
-import secrets
 import json
+import hashlib
+import sys
+import functools
 import modal
-from modal import Image, App, asgi_app
-from fastapi import FastAPI, Request, status
-from fastapi.responses import JSONResponse
-from fastmcp import FastMCP
-import requests
+from modal import asgi_app
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from fastmcp import FastMCP, Context
 import time
 import io
 import zipfile
-from fastapi.responses import StreamingResponse
 import asyncio
-from fastapi import FastAPI, Request, HTTPException, Depends
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import io
+import contextlib
 import re
-app = modal.App(name="mcp-threatintel-auth")
-
-# Build the Modal image with all required dependencies
-image = modal.Image.debian_slim().run_commands(
-    "apt-get update",
-    "pip install httpx requests uvicorn fastapi pandas geocoder atlassian-python-api boto3 Pillow websockets google-genai openai anthropic",
-    "pip install fastmcp --upgrade",
-    "pip install PyPDF2",
-)
+
+# The shared MCP server infrastructure lives in shared/backend/mcp_common;
+# from a checkout it is imported from there, in the container from the image
+_SHARED_BACKEND = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                "..", "..", "..", "..", "..", "shared", "backend"))
+if os.path.isdir(_SHARED_BACKEND) and _SHARED_BACKEND not in sys.path:
+    sys.path.insert(0, _SHARED_BACKEND)
+
+from mcp_common import (AuthMiddleware, DiskStore, PREFETCH_INTERVAL_SECONDS, PREFETCH_MODE, SingleFlight,
+                        TieredCache, cache_metrics, compact_response, get_logger, log_prefetch_outcomes, metrics,
+                        observe_upstream, run_blocking, run_prefetch_steps, with_prefetch_loop)
+
+# Modal Volume holding the shared disk cache tier (empty keeps it on container-local disk)
+CACHE_VOLUME = os.environ.get("CACHE_VOLUME", "")
+# Directory of the disk cache tier, where the volume is mounted when set (empty disables the tier)
+CACHE_DIR = os.environ.get("CACHE_DIR", "/cache" if CACHE_VOLUME else "/tmp/mcp-vuln-cache")
+
+# Build the Modal image with only what this server imports; aiohttp is
+# loaded on first use so cold starts pay only for fastmcp. The cache
+# settings are baked in so the container sees the volume it was deployed with
+image = modal.Image.debian_slim().pip_install(
+    "fastmcp",
+    "orjson",
+    "aiohttp",
+).env({"CACHE_VOLUME": CACHE_VOLUME, "CACHE_DIR": CACHE_DIR}).add_local_python_source("mcp_common")
 
 # Modal secrets
 tr_aws_secrets = [modal.Secret.from_name("tr_aws_secret", environment_name="main")]
@@ -35,6 +48,8 @@ app_secrets = [modal.Secret.from_name("app_keys", environment_name="main")]
 
 all_secrets = tr_aws_secrets + llm_secrets + aws_secrets + app_secrets
 
+cache_volume = modal.Volume.from_name(CACHE_VOLUME, create_if_missing=True) if CACHE_VOLUME else None
+
 app = modal.App(
     name="mcp-vuln-auth",
     image=image,
@@ -44,59 +59,298 @@ app = modal.App(
 vuln_mcp = FastMCP(name="mcp-vuln")
 
 from datetime import datetime, timedelta
-import pandas as pd
+from bisect import bisect_left
+import random
+import tempfile
+import threading
 
-@vuln_mcp.tool(description="CISA vulns filtered by days")
-def get_cisa_known_exploited_vulnerabilities_filtered(days_ago: int = 10) -> dict:
-    """Get CISA Known Exploited Vulnerabilities catalog filtered by dateAdded
+log = get_logger("mcp-vuln")
 
-    Args:
-        days_ago: Number of days to look back from today (default: 10)
+
+# Upstream path segments kept as-is in endpoint labels; any other segment is an ID
+ENDPOINT_LITERAL_SEGMENTS = {"download"}
+
+
+# Upstream endpoints, overridable to point the server at a local stand-in
+KEV_URL = os.environ.get("KEV_URL", "https://www.cisa.gov/sites/default/files/feeds/known_exploited_vulnerabilities.json")
+# How long a fetched catalog is served without asking CISA again
+KEV_REFRESH_SECONDS = int(os.environ.get("KEV_REFRESH_SECONDS", "900"))
+# How long to keep serving a stale catalog before retrying a failed refresh
+KEV_RETRY_SECONDS = int(os.environ.get("KEV_RETRY_SECONDS", "60"))
+# Oldest catalog in the disk cache tier a new replica will start from
+KEV_MAX_STALE_SECONDS = int(os.environ.get("KEV_MAX_STALE_SECONDS", str(7 * 86400)))
+
+
+def _kev_key(value) -> str:
+    """Normalize a KEV field value for case-insensitive index lookups."""
+    return str(value or "").strip().lower()
+
+
+class KevIndex:
+    """Query-ready view of one KEV catalogVersion.
+
+    Records are kept sorted by dateAdded so a date window is a bisect plus a
+    slice, and the secondary indexes on cveID, vendorProject, product and
+    knownRansomwareCampaignUse hold record positions newest-first, so every
+    query costs O(log n + k) instead of a scan and sort of the whole catalog.
     """
-    print(f"[debug-server] get_cisa_known_exploited_vulnerabilities_filtered(days_ago={days_ago})")
 
-    url = "https://www.cisa.gov/sites/default/files/feeds/known_exploited_vulnerabilities.json"
+    def __init__(self, data: dict):
+        self.catalog_version = data.get('catalogVersion')
+        self.date_released = data.get('dateReleased')
+
+        def added(record):
+            try:
+                return datetime.fromisoformat(str(record.get('dateAdded', ''))[:10])
+            except ValueError:
+                return datetime.min
+
+        # Oldest first, with a parallel list of dates for bisect
+        pairs = sorted(((added(r), r) for r in data['vulnerabilities']), key=lambda p: p[0])
+        self._dates = [date for date, _ in pairs]
+        self.records = [record for _, record in pairs]
+
+        self.by_cve = {}
+        self.by_vendor = {}
+        self.by_product = {}
+        self.by_ransomware_use = {}
+        for i in range(len(self.records) - 1, -1, -1):
+            record = self.records[i]
+            self.by_cve[_kev_key(record.get('cveID'))] = i
+            self.by_vendor.setdefault(_kev_key(record.get('vendorProject')), []).append(i)
+            self.by_product.setdefault(_kev_key(record.get('product')), []).append(i)
+            self.by_ransomware_use.setdefault(_kev_key(record.get('knownRansomwareCampaignUse')), []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def added_since(self, cutoff: datetime) -> list[dict]:
+        """Entries with dateAdded >= cutoff, most recent first."""
+        start = bisect_left(self._dates, cutoff)
+        return self.records[start:][::-1]
+
+    def get(self, cve_id: str):
+        """Exact lookup by CVE ID, or None."""
+        i = self.by_cve.get(_kev_key(cve_id))
+        return None if i is None else self.records[i]
+
+    def search(self, vendor: str = "", product: str = "", ransomware_use: str = "",
+               cutoff: datetime = None, limit: int = 100) -> tuple[list[dict], int]:
+        """Filter by vendor/product/ransomware use and optional dateAdded cutoff.
+
+        Returns (entries, total_matches) with entries most recent first and
+        capped at limit.
+        """
+        filters = [
+            (self.by_vendor, 'vendorProject', vendor),
+            (self.by_product, 'product', product),
+            (self.by_ransomware_use, 'knownRansomwareCampaignUse', ransomware_use),
+        ]
+        filters = [(index, field, _kev_key(value)) for index, field, value in filters if value]
+
+        if not filters:
+            matches = self.added_since(cutoff) if cutoff else self.records[::-1]
+            return matches[:limit], len(matches)
+
+        # Walk the smallest posting list and check the remaining filters per record
+        filters.sort(key=lambda f: len(f[0].get(f[2], ())))
+        index, _, value = filters[0]
+        rest = filters[1:]
+
+        matches = []
+        total = 0
+        for i in index.get(value, ()):
+            if cutoff and self._dates[i] < cutoff:
+                break
+            record = self.records[i]
+            if all(_kev_key(record.get(field)) == v for _, field, v in rest):
+                total += 1
+                if len(matches) < limit:
+                    matches.append(record)
+        return matches, total
+
+
+class KevCatalogStore:
+    """Process-wide cache of the CISA Known Exploited Vulnerabilities catalog.
+
+    The parsed catalog is served from memory while it is fresh. Once it ages out,
+    the next caller revalidates it with a conditional GET (ETag / If-Modified-Since);
+    a 304, or a 200 carrying the same catalogVersion, only renews the freshness
+    window. If CISA cannot be reached the last good copy keeps being served and
+    is reported as stale. The download goes through the pooled aiohttp session
+    and parsing and indexing run on the tool executor.
+
+    Every successful check is also written to the disk cache tier. A replica
+    whose copy has aged out first adopts a fresher one from there (published
+    by another replica or the prefetcher), and a new or restarted replica
+    starts from it, so at most a conditional GET is needed instead of
+    downloading and indexing the whole feed again.
+    """
 
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
+    def __init__(self, url: str, refresh_seconds: int, retry_seconds: int):
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.retry_seconds = retry_seconds
+        self._lock = None
+        self._catalog = None
+        self._etag = None
+        self._last_modified = None
+        self._next_check = 0.0
+        self._stale = False
+
+    async def get(self) -> tuple[KevIndex, bool]:
+        """Return (catalog, stale), refreshing from CISA only when the copy has aged out."""
+        if self._catalog is not None and time.monotonic() < self._next_check:
+            return self._catalog, self._stale
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another caller may have refreshed while we waited for the lock
+            if self._catalog is not None and time.monotonic() < self._next_check:
+                return self._catalog, self._stale
+
+            await self._restore()
+            if self._catalog is not None and time.monotonic() < self._next_check:
+                return self._catalog, self._stale
+
+            return await self._refresh()
+
+    async def refresh(self) -> tuple[KevIndex, bool]:
+        """Check CISA now whatever the age of the copy, and publish the result; used by the prefetcher."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._catalog is None:
+                await self._restore()
+            return await self._refresh()
+
+    async def _refresh(self) -> tuple[KevIndex, bool]:
+        import aiohttp
 
-        data = response.json()
+        try:
+            await self._revalidate()
+            self._stale = False
+            self._next_check = time.monotonic() + self.refresh_seconds
+            self._persist()
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+            if self._catalog is None:
+                raise
+            log.warning(f"KEV refresh failed, serving catalogVersion "
+                        f"{self._catalog.catalog_version} as stale: {str(e) or type(e).__name__}")
+            self._stale = True
+            self._next_check = time.monotonic() + self.retry_seconds
+
+        return self._catalog, self._stale
+
+    async def _restore(self):
+        """Adopt the catalog in the disk cache tier if we have none, or if it is fresher than ours."""
+        if cache_disk is None:
+            return
+        entry = await run_blocking(cache_disk.read, "kev", self.url)
+        if entry is None:
+            return
+        expires_at, _, (catalog, etag, last_modified) = entry
+        if self._catalog is not None and expires_at <= time.time():
+            return
+        if self._catalog is None or catalog.catalog_version != self._catalog.catalog_version:
+            log.info(f"KEV restored catalogVersion {catalog.catalog_version} from the cache")
+        self._catalog, self._etag, self._last_modified = catalog, etag, last_modified
+        self._stale = False
+        self._next_check = time.monotonic() + max(0.0, expires_at - time.time())
+
+    def _persist(self):
+        if cache_disk is None:
+            return
+        expires_at = time.time() + self.refresh_seconds
+        cache_disk.write_behind("kev", self.url, expires_at, expires_at + KEV_MAX_STALE_SECONDS,
+                                (self._catalog, self._etag, self._last_modified))
+
+    async def _revalidate(self):
+        headers = {}
+        if self._catalog is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        session = await _get_vuln_api_session()
+        async with session.get(self.url, headers=headers) as response:
+            if response.status == 304:
+                return
+            response.raise_for_status()
+            body = await response.read()
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+        data = await run_blocking(json.loads, body)
+        self._etag = etag
+        self._last_modified = last_modified
+
+        # Same catalog re-served without validators, keep the parsed copy
+        if self._catalog is not None and data.get('catalogVersion') == self._catalog.catalog_version:
+            return
+
+        self._catalog = await run_blocking(KevIndex, data)
+        log.info(f"KEV loaded catalogVersion {self._catalog.catalog_version} ({len(self._catalog)} entries)")
+
+
+kev_store = KevCatalogStore(KEV_URL, KEV_REFRESH_SECONDS, KEV_RETRY_SECONDS)
+
+
+def _kev_cutoff(days_ago: int) -> datetime:
+    """Now minus days_ago days.
+
+    Raises:
+        ValueError: days_ago is negative, or so large the date would fall before year 1
+    """
+    if days_ago < 0:
+        raise ValueError(f"days_ago must not be negative, got {days_ago}")
+    try:
+        return datetime.now() - timedelta(days=days_ago)
+    except OverflowError:
+        raise ValueError(f"days_ago {days_ago} reaches past the earliest representable date") from None
 
-        # Convert vulnerabilities to DataFrame
-        df = pd.DataFrame(data['vulnerabilities'])
 
-        # Convert dateAdded to datetime
-        df['dateAdded'] = pd.to_datetime(df['dateAdded'])
+@vuln_mcp.tool(description="CISA vulns filtered by days")
+@compact_response
+async def get_cisa_known_exploited_vulnerabilities_filtered(days_ago: int = 10) -> dict:
+    """Get CISA Known Exploited Vulnerabilities catalog filtered by dateAdded
 
-        # Calculate cutoff date
-        cutoff_date = datetime.now() - timedelta(days=days_ago)
+    Args:
+        days_ago: Number of days to look back from today (default: 10)
+    """
+    log.debug(f"get_cisa_known_exploited_vulnerabilities_filtered(days_ago={days_ago})")
+    import aiohttp
 
-        # Filter for vulnerabilities added within the specified timeframe
-        df_filtered = df[df['dateAdded'] >= cutoff_date]
+    try:
+        cutoff_date = _kev_cutoff(days_ago)
+    except ValueError as e:
+        return {"success": False, "error": f"Invalid days_ago: {e}"}
 
-        # Sort by dateAdded descending (most recent first)
-        df_filtered = df_filtered.sort_values('dateAdded', ascending=False)
+    try:
+        catalog, stale = await kev_store.get()
 
-        # Convert back to dict format
-        filtered_vulnerabilities = df_filtered.to_dict('records')
+        # Vulnerabilities added within the timeframe, most recent first
+        filtered_vulnerabilities = catalog.added_since(cutoff_date)
 
         return {
             "success": True,
             "data": {
-                "catalogVersion": data.get('catalogVersion'),
-                "dateReleased": data.get('dateReleased'),
+                "catalogVersion": catalog.catalog_version,
+                "dateReleased": catalog.date_released,
+                "stale": stale,
                 "count": len(filtered_vulnerabilities),
-                "total_count": len(df),
+                "total_count": len(catalog),
                 "days_filtered": days_ago,
                 "cutoff_date": cutoff_date.strftime('%Y-%m-%d'),
                 "vulnerabilities": filtered_vulnerabilities
             }
         }
-    except requests.RequestException as e:
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         return {
             "success": False,
-            "error": f"Failed to fetch CISA KEV catalog: {str(e)}"
+            "error": f"Failed to fetch CISA KEV catalog: {str(e) or type(e).__name__}"
         }
     except Exception as e:
         return {
@@ -104,319 +358,1355 @@ def get_cisa_known_exploited_vulnerabilities_filtered(days_ago: int = 10) -> dic
             "error": f"Error processing data: {str(e)}"
         }
 
-@vuln_mcp.tool(description="Get vulnerability advisories from Transilience Vulnerability API")
-async def query_cve_info(cve_id: str) -> dict:
-    """
-    Query CVE information from the Transilience threat intel API.
+@vuln_mcp.tool(description="Look up a single CVE in the CISA KEV catalog")
+@compact_response
+async def get_cisa_kev_entry(cve_id: str) -> dict:
+    """Get the CISA KEV entry for one CVE
 
     Args:
         cve_id: The CVE identifier (e.g., "CVE-2023-53616")
+    """
+    log.debug(f"get_cisa_kev_entry(cve_id={cve_id})")
+    import aiohttp
 
-    Returns:
-        dict: CVE information from the API
+    try:
+        catalog, stale = await kev_store.get()
+        entry = catalog.get(cve_id)
+
+        return {
+            "success": True,
+            "cve_id": cve_id,
+            "catalogVersion": catalog.catalog_version,
+            "stale": stale,
+            "in_kev": entry is not None,
+            "data": entry
+        }
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return {
+            "success": False,
+            "cve_id": cve_id,
+            "error": f"Failed to fetch CISA KEV catalog: {str(e) or type(e).__name__}"
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "cve_id": cve_id,
+            "error": f"Error processing data: {str(e)}"
+        }
+
+@vuln_mcp.tool(description="Search CISA KEV by vendor, product and ransomware use")
+@compact_response
+async def search_cisa_known_exploited_vulnerabilities(vendor: str = "", product: str = "",
+                                                      known_ransomware_use: str = "",
+                                                      days_ago: int = None, limit: int = 100) -> dict:
+    """Search the CISA Known Exploited Vulnerabilities catalog
+
+    Args:
+        vendor: Exact vendorProject to match, case-insensitive (e.g. "Microsoft")
+        product: Exact product to match, case-insensitive (e.g. "Windows")
+        known_ransomware_use: knownRansomwareCampaignUse value ("Known" or "Unknown")
+        days_ago: Only entries added within this many days (default: no limit)
+        limit: Maximum number of entries to return (default: 100)
     """
+    log.debug(f"search_cisa_known_exploited_vulnerabilities(vendor={vendor}, product={product}, "
+              f"known_ransomware_use={known_ransomware_use}, days_ago={days_ago}, limit={limit})")
     import aiohttp
 
-    url = f"https://vulns.transilienceapi.com/cves/{cve_id}"
-    api_key = os.environ["vuln_api_key"]
+    try:
+        cutoff_date = _kev_cutoff(days_ago) if days_ago is not None else None
+    except ValueError as e:
+        return {"success": False, "error": f"Invalid days_ago: {e}"}
 
     try:
-        async with aiohttp.ClientSession() as session:
-            # Prepare headers with API key
-            headers = {
-                "x-api-key": api_key
+        catalog, stale = await kev_store.get()
+
+        matches, total = catalog.search(vendor=vendor, product=product,
+                                        ransomware_use=known_ransomware_use,
+                                        cutoff=cutoff_date, limit=limit)
+
+        return {
+            "success": True,
+            "data": {
+                "catalogVersion": catalog.catalog_version,
+                "dateReleased": catalog.date_released,
+                "stale": stale,
+                "count": len(matches),
+                "total_matches": total,
+                "vulnerabilities": matches
             }
+        }
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        return {
+            "success": False,
+            "error": f"Failed to fetch CISA KEV catalog: {str(e) or type(e).__name__}"
+        }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": f"Error processing data: {str(e)}"
+        }
+
+VULN_API_BASE_URL = os.environ.get("VULN_API_BASE_URL", "https://vulns.transilienceapi.com")
+# Keep-alive connections shared by every vulnerability API call in this container
+VULN_API_POOL_SIZE = int(os.environ.get("VULN_API_POOL_SIZE", "64"))
+# Upper bounds for query_cve_info_batch
+CVE_BATCH_MAX_SIZE = int(os.environ.get("CVE_BATCH_MAX_SIZE", "1000"))
+CVE_BATCH_MAX_CONCURRENCY = int(os.environ.get("CVE_BATCH_MAX_CONCURRENCY", "32"))
+
+# Advisory cache: positive entries, 404s, the LRU bound, and how long past
+# expiry an advisory is still served while it is refreshed
+CVE_CACHE_TTL_SECONDS = int(os.environ.get("CVE_CACHE_TTL_SECONDS", "3600"))
+CVE_CACHE_NEGATIVE_TTL_SECONDS = int(os.environ.get("CVE_CACHE_NEGATIVE_TTL_SECONDS", "300"))
+CVE_CACHE_MAX_ENTRIES = int(os.environ.get("CVE_CACHE_MAX_ENTRIES", "5000"))
+CVE_CACHE_STALE_SECONDS = int(os.environ.get("CVE_CACHE_STALE_SECONDS", "86400"))
+
+# Size budget of the disk cache tier, and how often replicas pick up the
+# entries others committed to the cache volume
+CACHE_DISK_MAX_BYTES = int(os.environ.get("CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+CACHE_VOLUME_RELOAD_SECONDS = int(os.environ.get("CACHE_VOLUME_RELOAD_SECONDS", "60"))
+
+_vuln_api_session = None
+_vuln_api_session_loop = None
+
+
+cache_disk = DiskStore(CACHE_DIR, CACHE_DISK_MAX_BYTES,
+                       reload=cache_volume.reload if cache_volume is not None else None,
+                       reload_seconds=CACHE_VOLUME_RELOAD_SECONDS) if CACHE_DIR else None
+cve_cache = TieredCache("cve", CVE_CACHE_MAX_ENTRIES, CVE_CACHE_TTL_SECONDS,
+                        CVE_CACHE_STALE_SECONDS, cache_disk)
+cve_flight = SingleFlight("cve")
+
+
+def _upstream_trace_config():
+    """aiohttp hooks that time every pooled-session request into the upstream histogram."""
+    import aiohttp
+
+    async def on_start(session, trace, params):
+        trace.started = time.perf_counter()
+
+    async def on_end(session, trace, params):
+        observe_upstream(params.method, params.url, params.response.status, time.perf_counter() - trace.started,
+                         ENDPOINT_LITERAL_SEGMENTS)
+
+    async def on_exception(session, trace, params):
+        observe_upstream(params.method, params.url, type(params.exception).__name__,
+                         time.perf_counter() - trace.started, ENDPOINT_LITERAL_SEGMENTS)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_start)
+    trace_config.on_request_end.append(on_end)
+    trace_config.on_request_exception.append(on_exception)
+    return trace_config
+
+
+async def _get_vuln_api_session():
+    """Return the pooled aiohttp session for the vulnerability API, creating it on first use."""
+    import aiohttp
+    global _vuln_api_session, _vuln_api_session_loop
+
+    loop = asyncio.get_running_loop()
+    if _vuln_api_session is None or _vuln_api_session.closed or _vuln_api_session_loop is not loop:
+        _vuln_api_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=VULN_API_POOL_SIZE, limit_per_host=VULN_API_POOL_SIZE),
+            timeout=aiohttp.ClientTimeout(total=30),
+            trace_configs=[_upstream_trace_config()],
+        )
+        _vuln_api_session_loop = loop
+    return _vuln_api_session
+
+
+def _normalize_cve_id(cve_id: str) -> str:
+    """The canonical spelling of a CVE ID ("cve-2024-3400 " -> "CVE-2024-3400")."""
+    return cve_id.strip().upper()
 
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return {
-                        "success": True,
-                        "cve_id": cve_id,
-                        "data": data
-                    }
-                else:
-                    error_text = await response.text()
-                    return {
-                        "success": False,
-                        "cve_id": cve_id,
-                        "error": f"HTTP {response.status}: {error_text}"
-                    }
+
+async def _fetch_cve_info(session, cve_id: str, api_key: str) -> dict:
+    """Fetch one CVE advisory and wrap it in the query_cve_info result shape.
+
+    Advisories are served from cve_cache when present. An expired advisory
+    still inside its stale window is returned as-is and refreshed in the
+    background. Concurrent misses for the same CVE, from any tool, share one
+    API request.
+
+    cve_id must already be normalized with _normalize_cve_id(); the same
+    value is the cache key, the flight key, the request path and the result's
+    cve_id, so a lookup in one spelling never answers for another.
+    """
+    hit = await cve_cache.lookup(cve_id)
+    if hit is not None:
+        cached, fresh = hit
+        if not fresh:
+            cve_cache.revalidate(cve_id, functools.partial(_request_cve_info, session, cve_id, api_key))
+        return {**cached, "cve_id": cve_id, "cached": True}
+
+    result = await cve_flight.do(cve_id, functools.partial(_request_cve_info, session, cve_id, api_key))
+    return {**result, "cve_id": cve_id}
+
+
+async def _request_cve_info(session, cve_id: str, api_key: str) -> dict:
+    """Ask the API for one CVE advisory and cache the answer.
+
+    404s are cached for the shorter negative TTL, other failures are not cached.
+    """
+    url = f"{VULN_API_BASE_URL}/cves/{cve_id}"
+
+    try:
+        # Prepare headers with API key
+        headers = {
+            "x-api-key": api_key
+        }
+
+        async with session.get(url, headers=headers) as response:
+            if response.status == 200:
+                data = await response.json()
+                result = {
+                    "success": True,
+                    "cve_id": cve_id,
+                    "data": data
+                }
+                cve_cache.put(cve_id, result)
+                return result
+            else:
+                error_text = await response.text()
+                result = {
+                    "success": False,
+                    "cve_id": cve_id,
+                    "error": f"HTTP {response.status}: {error_text}"
+                }
+                if response.status == 404:
+                    cve_cache.put(cve_id, result, CVE_CACHE_NEGATIVE_TTL_SECONDS)
+                return result
 
     except Exception as e:
         return {
             "success": False,
             "cve_id": cve_id,
-            "error": str(e)
+            "error": str(e) or type(e).__name__
         }
 
-@vuln_mcp.tool(description="Prioritize vulnerabilities")
-def prioritize_vulnerabilities(cves: list[str] = None) -> dict:
-    """
-    Prioritize vulnerabilities with progress updates - Claude Desktop compatible
-    Default CVEs: CVE-2016-1234, CVE-2017-5678, CVE-2018-9012
+@vuln_mcp.tool(description="Get vulnerability advisories from Transilience Vulnerability API")
+@compact_response
+async def query_cve_info(cve_id: str) -> dict:
     """
-    import sys
-    import threading
-    import queue
-    from contextlib import redirect_stdout
-    import io
+    Query CVE information from the Transilience threat intel API.
 
-    # Configuration
+    Args:
+        cve_id: The CVE identifier (e.g., "CVE-2023-53616")
+
+    Returns:
+        dict: CVE information from the API
+    """
     api_key = os.environ["vuln_api_key"]
-    base_url = "https://vulns.transilienceapi.com"
-    max_wait_time = 300
-    poll_interval = 5
+    session = await _get_vuln_api_session()
+    return await _fetch_cve_info(session, _normalize_cve_id(cve_id), api_key)
 
-    headers = {
-        'Content-Type': 'application/json',
-        'x-api-key': api_key
-    }
+@vuln_mcp.tool(description="Get vulnerability advisories for many CVEs in one call")
+@compact_response
+async def query_cve_info_batch(cve_ids: list[str], concurrency: int = 10, stream: bool = False,
+                               ctx: Context = None) -> dict:
+    """
+    Query CVE information for a list of CVEs concurrently.
 
-    # Use provided CVEs or default test CVEs
-    test_cves = ["CVE-2016-1234", "CVE-2017-5678", "CVE-2018-9012"]
-    cves_to_process = cves if cves else test_cves
+    Duplicate IDs are looked up once. All requests share one pooled session and
+    at most `concurrency` of them are in flight at a time.
 
-    # Progress tracking
-    progress_updates = []
+    Args:
+        cve_ids: CVE identifiers (e.g., ["CVE-2023-53616", "CVE-2024-3400"])
+        concurrency: Maximum simultaneous upstream requests (default: 10)
+        stream: Send a progress notification as each CVE completes
 
-    def add_progress(stage, message, **kwargs):
-        """Add progress update that will be returned to client"""
-        update = {
-            "stage": stage,
-            "message": message,
-            "timestamp": time.time(),
-            **kwargs
+    Returns:
+        dict: Per-CVE results in input order, plus success/error counts
+    """
+    # Dedupe on the normalized ID, keeping first-seen order
+    unique_ids = list(dict.fromkeys(_normalize_cve_id(c) for c in cve_ids if c and c.strip()))
+    log.debug(f"query_cve_info_batch({len(cve_ids)} ids, {len(unique_ids)} unique, "
+              f"concurrency={concurrency}, stream={stream})")
+
+    if len(unique_ids) > CVE_BATCH_MAX_SIZE:
+        return {
+            "success": False,
+            "error": f"Too many CVEs: {len(unique_ids)} unique IDs, maximum is {CVE_BATCH_MAX_SIZE}"
         }
-        progress_updates.append(update)
-        print(f"[{stage.upper()}] {message}")  # Also log to server
 
-    add_progress("initializing", f"🚀 Starting prioritization for {len(cves_to_process)} CVEs: {cves_to_process}")
+    api_key = os.environ["vuln_api_key"]
+    session = await _get_vuln_api_session()
+    semaphore = asyncio.Semaphore(max(1, min(concurrency, CVE_BATCH_MAX_CONCURRENCY)))
+
+    async def fetch(cve_id):
+        async with semaphore:
+            return await _fetch_cve_info(session, cve_id, api_key)
+
+    results = {}
+    for done, task in enumerate(asyncio.as_completed([fetch(c) for c in unique_ids]), start=1):
+        result = await task
+        results[result["cve_id"]] = result
+        if stream and ctx is not None:
+            status_text = "ok" if result["success"] else result["error"]
+            await ctx.report_progress(progress=done, total=len(unique_ids),
+                                      message=f"{result['cve_id']}: {status_text}")
+
+    ordered = [results[c] for c in unique_ids]
+    succeeded = sum(1 for r in ordered if r["success"])
+
+    return {
+        "success": True,
+        "requested": len(cve_ids),
+        "unique": len(unique_ids),
+        "succeeded": succeeded,
+        "failed": len(ordered) - succeeded,
+        "results": ordered
+    }
 
-    # Step 1: Submit CVEs for processing
-    payload = {
-        "schema_type": "simple_prioritization",
-        "cves": cves_to_process
+@vuln_mcp.tool(description="CVE advisory cache statistics")
+@compact_response
+async def get_cve_cache_stats() -> dict:
+    """Hit/miss/eviction counters and TTL settings for the CVE advisory cache and the disk tier"""
+    return {
+        "success": True,
+        "data": {
+            **cve_cache.stats(),
+            "negative_ttl_seconds": CVE_CACHE_NEGATIVE_TTL_SECONDS,
+            "disk": cache_disk.stats() if cache_disk is not None else None,
+        }
     }
 
-    add_progress("submitting", f"📤 Submitting {len(cves_to_process)} CVEs to API...")
+# Prioritization jobs: how long to wait, and the bounds of the per-job poll backoff
+PRIORITIZATION_MAX_WAIT_SECONDS = int(os.environ.get("PRIORITIZATION_MAX_WAIT_SECONDS", "300"))
+PRIORITIZATION_POLL_MIN_SECONDS = float(os.environ.get("PRIORITIZATION_POLL_MIN_SECONDS", "2"))
+PRIORITIZATION_POLL_MAX_SECONDS = float(os.environ.get("PRIORITIZATION_POLL_MAX_SECONDS", "30"))
+# Finished jobs (and their results) are forgotten after this long
+PRIORITIZATION_JOB_RETENTION_SECONDS = int(os.environ.get("PRIORITIZATION_JOB_RETENTION_SECONDS", "3600"))
+# Large CVE lists are split into shards submitted as separate jobs
+PRIORITIZATION_SHARD_SIZE = int(os.environ.get("PRIORITIZATION_SHARD_SIZE", "500"))
+PRIORITIZATION_MAX_PARALLEL_SHARDS = int(os.environ.get("PRIORITIZATION_MAX_PARALLEL_SHARDS", "4"))
+# Result archives stay in memory up to this size, then spill to a temp file
+PRIORITIZATION_SPOOL_MAX_BYTES = int(os.environ.get("PRIORITIZATION_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+# Default page size for get_prioritization_result
+PRIORITIZATION_PAGE_SIZE = int(os.environ.get("PRIORITIZATION_PAGE_SIZE", "500"))
+# Per-CVE prioritization results are reused for this long
+PRIORITIZATION_CACHE_TTL_SECONDS = int(os.environ.get("PRIORITIZATION_CACHE_TTL_SECONDS", "3600"))
+PRIORITIZATION_CACHE_MAX_ENTRIES = int(os.environ.get("PRIORITIZATION_CACHE_MAX_ENTRIES", "50000"))
 
-    try:
-        response = requests.post(
-            f"{base_url}/process/",
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()
+JOB_SUCCESS_STATES = {'success', 'completed', 'finished', 'done'}
+JOB_FAILURE_STATES = {'failed', 'error'}
 
-        job_data = response.json()
-        process_id = job_data.get('process_id')
 
-        if not process_id:
-            add_progress("error", "❌ No process ID returned from API")
-            return {
-                "status": "error",
-                "message": "No process ID returned from API",
-                "progress": progress_updates
-            }
+class PrioritizationError(Exception):
+    """A prioritization job could not be submitted, tracked or downloaded."""
+
 
-        add_progress("submitted", f"✅ Job submitted successfully. Process ID: {process_id}", process_id=process_id)
+class PrioritizationJob:
+    """Tracked state of one upstream /process/ job.
+
+    `state` is our view of the job (running, completed, failed, timeout);
+    `status` is the raw status string last reported by the API.
+    """
 
-    except requests.RequestException as e:
-        add_progress("error", f"❌ Failed to submit job: {str(e)}")
+    def __init__(self, process_id: str, cves: list[str] = None):
+        self.process_id = process_id
+        self.cves = cves
+        self.state = "running"
+        self.status = "submitted"
+        self.current_step = None
+        self.api_elapsed = 0
+        self.error = None
+        self.polls = 0
+        self.submitted_at = time.time()
+        self.updated_at = self.submitted_at
+        self.archive = None
+        self._started = time.monotonic()
+        self._backoff = PRIORITIZATION_POLL_MIN_SECONDS
+        self._next_poll = self._started + self._backoff
+        self._updated = asyncio.Event()
+        self._result_lock = asyncio.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.state != "running"
+
+    async def wait_for_update(self, timeout: float = None):
+        """Block until the poller records a change on this job (or timeout passes)."""
+        event = self._updated
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def expire_if_overdue(self) -> bool:
+        """Time the job out once PRIORITIZATION_MAX_WAIT_SECONDS have passed; True if this call did."""
+        if self.finished or time.monotonic() - self._started < PRIORITIZATION_MAX_WAIT_SECONDS:
+            return False
+        self.state = "timeout"
+        self.error = f"Job did not complete within {PRIORITIZATION_MAX_WAIT_SECONDS} seconds"
+        self._notify()
+        return True
+
+    def _notify(self):
+        self.updated_at = time.time()
+        event, self._updated = self._updated, asyncio.Event()
+        event.set()
+
+    def to_dict(self) -> dict:
         return {
-            "status": "error",
-            "message": f"Failed to submit job: {str(e)}",
-            "progress": progress_updates
+            "process_id": self.process_id,
+            "state": self.state,
+            "job_status": self.status,
+            "current_step": self.current_step,
+            "api_elapsed": self.api_elapsed,
+            "polls": self.polls,
+            "cves_submitted": len(self.cves) if self.cves is not None else None,
+            "submitted_at": self.submitted_at,
+            "updated_at": self.updated_at,
+            "result_ready": self.state == "completed",
+            "error": self.error,
         }
 
-    # Step 2: Poll for completion
-    add_progress("polling_started", f"👀 Starting to monitor job progress (max {max_wait_time}s, poll every {poll_interval}s)")
 
-    start_time = time.time()
-    poll_count = 0
-    last_status = None
+class PrioritizationJobTracker:
+    """Submits prioritization jobs and tracks every in-flight one with a single poller.
 
-    while time.time() - start_time < max_wait_time:
-        poll_count += 1
-        elapsed_total = time.time() - start_time
-        remaining_time = max_wait_time - elapsed_total
+    Tool calls only read job state; one background task polls the API for all
+    running jobs, each on its own exponential backoff with jitter, so upstream
+    polling scales with the number of jobs rather than the number of waiting
+    clients. Results are downloaded once, on first request, and kept with the
+    job until it is pruned, or until release_archive() once a caller has
+    consumed them.
+
+    Waiters go through wait_for_update(), which restarts the poller if it has
+    died and enforces the job deadline itself, so a job can never stay
+    "running" once nothing is polling it.
+    """
 
-        add_progress("polling", f"🔍 Poll #{poll_count} | Elapsed: {elapsed_total:.1f}s | Remaining: {remaining_time:.1f}s")
+    def __init__(self):
+        self.jobs = {}
+        self._poller = None
+        self._wakeup = None
+
+    def get(self, process_id: str):
+        self._prune()
+        job = self.jobs.get(process_id)
+        if job is not None:
+            job.expire_if_overdue()
+        return job
+
+    def track(self, process_id: str, cves: list[str] = None) -> PrioritizationJob:
+        """Start tracking a job, e.g. one submitted through another container."""
+        self._prune()
+        job = self.jobs.get(process_id)
+        if job is None:
+            job = PrioritizationJob(process_id, cves)
+            self.jobs[process_id] = job
+            self._ensure_poller()
+        return job
+
+    async def submit(self, cves: list[str]) -> PrioritizationJob:
+        import aiohttp
+
+        payload = {
+            "schema_type": "simple_prioritization",
+            "cves": cves
+        }
+        headers = {'x-api-key': os.environ["vuln_api_key"]}
 
         try:
-            status_response = requests.get(
-                f"{base_url}/process/{process_id}",
-                headers={'x-api-key': api_key}
-            )
-
-            if status_response.status_code == 200:
-                status_data = status_response.json()
-                status = status_data.get('status', 'unknown')
-                elapsed_api = status_data.get('elapsed', 0)
-                current_step = status_data.get('current_step')
-
-                # Add status update
-                if status != last_status or poll_count % 3 == 0:  # Update every 3rd poll or status change
-                    add_progress("status_update",
-                               f"📊 API Status: {status} | Step: {current_step or 'N/A'} | API Elapsed: {elapsed_api}s",
-                               job_status=status,
-                               api_elapsed=elapsed_api,
-                               current_step=current_step)
-                    last_status = status
-
-                if status.lower() in ['success', 'completed', 'finished', 'done']:
-                    add_progress("processing_complete", "🎉 Processing completed successfully!")
-                    break
-                elif status.lower() in ['failed', 'error']:
-                    error_msg = status_data.get('error', 'Unknown error')
-                    add_progress("error", f"❌ Job failed with status: {status}, error: {error_msg}")
-                    return {
-                        "status": "error",
-                        "message": f"Job failed: {error_msg}",
-                        "progress": progress_updates
-                    }
-            else:
-                add_progress("warning", f"⚠️ Status check returned HTTP {status_response.status_code}")
+            session = await _get_vuln_api_session()
+            async with session.post(f"{VULN_API_BASE_URL}/process/", headers=headers, json=payload) as response:
+                response.raise_for_status()
+                job_data = await response.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise PrioritizationError(f"Failed to submit job: {str(e) or type(e).__name__}")
 
-        except requests.RequestException as e:
-            add_progress("warning", f"⚠️ Status check failed: {str(e)}, will retry...")
+        process_id = job_data.get('process_id')
+        if not process_id:
+            raise PrioritizationError("No process ID returned from API")
+
+        return self.track(process_id, cves)
+
+    async def fetch_archive(self, job: PrioritizationJob):
+        """Download a completed job's result archive, once per job, ahead of reading it."""
+        async with job._result_lock:
+            if job.archive is None:
+                job.archive = await _download_prioritization_archive(job.process_id)
+
+    @contextlib.asynccontextmanager
+    async def reading_archive(self, job: PrioritizationJob):
+        """The job's archive, downloaded if need be, held open for the duration of the block."""
+        async with job._result_lock:
+            archive = job.archive
+            if archive is None or not archive.acquire():
+                archive = job.archive = await _download_prioritization_archive(job.process_id)
+                archive.acquire()
+        try:
+            yield archive
+        finally:
+            archive.release()
+
+    async def release_archive(self, job: PrioritizationJob):
+        """Drop a job's archive once it has been consumed, closing it when its readers finish.
+
+        A later reading_archive() downloads it again.
+        """
+        async with job._result_lock:
+            archive, job.archive = job.archive, None
+        if archive is not None:
+            archive.close()
+
+    async def wait_for_update(self, job: PrioritizationJob, timeout: float = None):
+        """Block until the job changes (or timeout passes), making sure it is still being polled."""
+        if not job.finished:
+            self._ensure_poller()
+        await job.wait_for_update(timeout)
+        job.expire_if_overdue()
+
+    def _ensure_poller(self):
+        if self._poller is not None and self._poller.done() and not self._poller.cancelled():
+            error = self._poller.exception()
+            if error is not None:
+                log.error(f"prioritization poller died, restarting it: {error!r}")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._poller is None or self._poller.done():
+            self._wakeup = asyncio.Event()
+            self._poller = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def _poll_loop(self):
+        while True:
+            self._prune()
+            running = [job for job in self.jobs.values() if not job.finished]
+            if not running:
+                return
+
+            now = time.monotonic()
+            due = [job for job in running if job._next_poll <= now]
+            if due:
+                await asyncio.gather(*(self._poll(job) for job in due))
+                continue
+
+            # Sleep until the next job is due, or a new job is submitted
+            delay = min(job._next_poll for job in running) - now
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, job: PrioritizationJob):
+        import aiohttp
+
+        job.polls += 1
+        changed = False
+        try:
+            session = await _get_vuln_api_session()
+            async with session.get(f"{VULN_API_BASE_URL}/process/{job.process_id}",
+                                   headers={'x-api-key': os.environ["vuln_api_key"]}) as response:
+                if response.status == 200:
+                    status_data = await response.json()
+                    status = str(status_data.get('status') or 'unknown')
+                    current_step = status_data.get('current_step')
+                    changed = status != job.status or current_step != job.current_step
+                    job.status = status
+                    job.current_step = current_step
+                    job.api_elapsed = status_data.get('elapsed', 0)
+
+                    if status.lower() in JOB_SUCCESS_STATES:
+                        job.state = "completed"
+                    elif status.lower() in JOB_FAILURE_STATES:
+                        job.state = "failed"
+                        job.error = status_data.get('error', 'Unknown error')
+                elif response.status == 404:
+                    job.state = "failed"
+                    job.error = f"Unknown process ID: {job.process_id}"
+                else:
+                    log.warning(f"prioritization status check for {job.process_id} returned HTTP {response.status}")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            log.warning(f"prioritization status check for {job.process_id} failed: {e}, will retry...")
+        except Exception as e:
+            # An unexpected status body fails this job rather than the poller every job shares
+            job.state = "failed"
+            job.error = f"Unexpected status response: {type(e).__name__}: {e}"
+            log.warning(f"prioritization status check for {job.process_id} failed: {job.error}")
+
+        if job.expire_if_overdue():
+            return
+        if job.finished:
+            job._notify()
+            return
+
+        # Back off while nothing changes; progress resets to the fastest cadence
+        job._backoff = (PRIORITIZATION_POLL_MIN_SECONDS if changed
+                        else min(job._backoff * 2, PRIORITIZATION_POLL_MAX_SECONDS))
+        job._next_poll = time.monotonic() + job._backoff / 2 + random.uniform(0, job._backoff / 2)
+        if changed:
+            job._notify()
+
+    def _prune(self):
+        """Forget finished jobs older than the retention window and close their archives.
+
+        Runs on every get(), track() and stats() (each /metrics scrape) as
+        well as in the poll loop, so an idle container does not keep finished
+        jobs once no job is being polled.
+        """
+        cutoff = time.time() - PRIORITIZATION_JOB_RETENTION_SECONDS
+        for process_id in [p for p, job in self.jobs.items() if job.finished and job.updated_at < cutoff]:
+            job = self.jobs.pop(process_id)
+            archive, job.archive = job.archive, None
+            if archive is not None:
+                archive.close()
+
+    def stats(self) -> dict:
+        self._prune()
+        states = {}
+        for job in self.jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return {"tracked": len(self.jobs), "states": states}
+
+
+prioritization_jobs = PrioritizationJobTracker()
+prioritization_cache = TieredCache("prioritization", PRIORITIZATION_CACHE_MAX_ENTRIES,
+                                   PRIORITIZATION_CACHE_TTL_SECONDS, disk=cache_disk)
+
+metrics.describe("mcp_prioritization_jobs_running", "gauge", "Prioritization jobs still being polled")
+metrics.describe("mcp_prioritization_jobs", "gauge", "Tracked prioritization jobs by state")
+
+
+@metrics.collect
+def _vuln_metrics():
+    yield from cache_metrics({"cve": cve_cache, "prioritization": prioritization_cache,
+                              "news_feed": news_feed_cache}, cache_disk)
+    states = prioritization_jobs.stats()["states"]
+    yield "mcp_prioritization_jobs_running", (), states.get("running", 0)
+    for state, count in states.items():
+        yield "mcp_prioritization_jobs", (("state", state),), count
+
+
+def _prioritization_record_cve(record):
+    """Return the normalized CVE ID a prioritization record belongs to, if it names one."""
+    if isinstance(record, dict):
+        for key in ('cve_id', 'cve', 'cveID', 'CVE', 'id'):
+            value = record.get(key)
+            if isinstance(value, str) and value.upper().startswith('CVE-'):
+                return value.strip().upper()
+    return None
+
+
+def _fold_prioritization_archive(archive, wanted, max_records, records: dict, unattributed: list) -> int:
+    """Cache every record of an archive per CVE and collect the ones to return.
+
+    Wanted per-CVE records go into records, records with no CVE into
+    unattributed (up to max_records). Returns the number of records read.
+    """
+    total = 0
+    for record in archive.records():
+        total += 1
+        cve = _prioritization_record_cve(record)
+        if cve is None:
+            if max_records is None or len(unattributed) < max_records:
+                unattributed.append(record)
+            continue
+        prioritization_cache.put(cve, record)
+        if wanted is None or cve in wanted:
+            records[cve] = record
+    return total
+
+
+def _iter_json_array(stream, chunk_size: int = 64 * 1024):
+    """Yield the elements of a top-level JSON array, reading the text stream incrementally.
+
+    Only the current element and one chunk are held in memory. A document whose
+    top level is not an array is yielded as a single value.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        if chunk:
+            buffer = buffer[pos:] + chunk
+            pos = 0
+        else:
+            eof = True
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip_whitespace()
+    if pos >= len(buffer):
+        raise json.JSONDecodeError("Expecting value", buffer, pos)
+    if buffer[pos] != "[":
+        yield json.loads(buffer[pos:] + stream.read())
+        return
+
+    pos += 1
+    skip_whitespace()
+    if buffer[pos:pos + 1] == "]":
+        return
+
+    while True:
+        # Decode one element, reading more text until it is complete. A number
+        # cut at the chunk edge ("12" of "123", "-3" of "-3.5") still decodes,
+        # so an element only counts once a delimiter or EOF follows it.
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                if eof or (end < len(buffer) and buffer[end] in ",] \t\r\n"):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+        pos = end
+        yield value
+
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise json.JSONDecodeError("Unterminated array", buffer, pos)
+        if buffer[pos] == "]":
+            return
+        if buffer[pos] != ",":
+            raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+        pos += 1
+        skip_whitespace()
+
+
+class PrioritizationArchive:
+    """A downloaded result archive, spooled to a temp file and parsed lazily.
+
+    records() streams the JSON member record by record, so reading a page or
+    folding results into the per-CVE cache never materializes the whole result.
+
+    Readers hold the archive between acquire() and release(); close() while
+    any are reading only marks it closing, and the last release() closes the
+    zip and its spool file.
+    """
 
-        time.sleep(poll_interval)
+    def __init__(self, spool):
+        self._state_lock = threading.Lock()
+        self._readers = 0
+        self._closing = False
+        self._spool = spool
+        self.size = spool.tell()
+        spool.seek(0)
+        try:
+            self._zip = zipfile.ZipFile(spool, 'r')
+        except zipfile.BadZipFile as e:
+            spool.close()
+            raise PrioritizationError(f"Parse error: {str(e)}")
+
+        json_files = [f for f in self._zip.namelist() if f.endswith('.json')]
+        if not json_files:
+            self.close()
+            raise PrioritizationError("No JSON file found in zip")
+        self.member = json_files[0]
+        # Filled in by the first reader that walks every record
+        self.record_count = None
+
+    def records(self):
+        try:
+            with self._zip.open(self.member) as raw:
+                yield from _iter_json_array(io.TextIOWrapper(raw, encoding='utf-8'))
+        except (zipfile.BadZipFile, json.JSONDecodeError, UnicodeDecodeError, KeyError) as e:
+            raise PrioritizationError(f"Parse error: {str(e)}")
+
+    def acquire(self) -> bool:
+        """Register a reader; False once the archive is closing."""
+        with self._state_lock:
+            if self._closing:
+                return False
+            self._readers += 1
+            return True
+
+    def release(self):
+        with self._state_lock:
+            self._readers -= 1
+            last = self._closing and self._readers == 0
+        if last:
+            self._close_files()
+
+    def close(self):
+        """Close the archive now, or when its last reader releases it."""
+        with self._state_lock:
+            if self._closing:
+                return
+            self._closing = True
+            idle = self._readers == 0
+        if idle:
+            self._close_files()
+
+    def _close_files(self):
+        self._zip.close()
+        self._spool.close()
+
+    def page(self, offset: int, end: int) -> list:
+        """Records [offset, end); the first reader also counts the rest."""
+        page = []
+        count = 0
+        for record in self.records():
+            if count >= offset:
+                if count >= end and self.record_count is not None:
+                    break
+                if count < end:
+                    page.append(record)
+            count += 1
+        else:
+            self.record_count = count
+        return page
 
-    else:
-        # Timeout occurred
-        add_progress("timeout", f"⏰ Job did not complete within {max_wait_time} seconds")
-        return {
-            "status": "timeout",
-            "message": f"Job timed out after {max_wait_time} seconds",
-            "progress": progress_updates
-        }
 
-    # Step 3: Download results
-    add_progress("downloading", "⬇️ Starting download of prioritization results...")
+async def _download_prioritization_archive(process_id: str) -> PrioritizationArchive:
+    """Stream a finished job's zip archive into a spooled temp file."""
+    import aiohttp
 
+    spool = tempfile.SpooledTemporaryFile(max_size=PRIORITIZATION_SPOOL_MAX_BYTES)
     try:
-        download_response = requests.get(
-            f"{base_url}/process/{process_id}/download",
-            headers={'x-api-key': api_key},
+        session = await _get_vuln_api_session()
+        async with session.get(
+            f"{VULN_API_BASE_URL}/process/{process_id}/download",
+            headers={'x-api-key': os.environ["vuln_api_key"]},
             params={
                 'data_type': 'prioritization',
                 'prioritization_format': 'json'
-            }
-        )
-        download_response.raise_for_status()
+            },
+            timeout=aiohttp.ClientTimeout(total=PRIORITIZATION_MAX_WAIT_SECONDS),
+        ) as download_response:
+            download_response.raise_for_status()
+            async for chunk in download_response.content.iter_chunked(64 * 1024):
+                spool.write(chunk)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        spool.close()
+        raise PrioritizationError(f"Download failed: {str(e) or type(e).__name__}")
+
+    return PrioritizationArchive(spool)
+
+
+@vuln_mcp.tool(description="Submit CVEs for prioritization and return a process ID immediately")
+@compact_response(coalesce=False)
+async def submit_prioritization(cves: list[str]) -> dict:
+    """
+    Start a prioritization job without waiting for it.
 
-        add_progress("download_complete", f"✅ Downloaded {len(download_response.content)} bytes")
+    Poll get_prioritization_status with the returned process_id, then fetch
+    the data with get_prioritization_result.
 
-    except requests.RequestException as e:
-        add_progress("error", f"❌ Failed to download results: {str(e)}")
+    Args:
+        cves: CVE identifiers to prioritize
+    """
+    log.debug(f"submit_prioritization({len(cves)} CVEs)")
+
+    try:
+        job = await prioritization_jobs.submit(cves)
+    except PrioritizationError as e:
         return {
             "status": "error",
-            "message": f"Download failed: {str(e)}",
-            "progress": progress_updates
+            "message": str(e)
         }
 
-    # Step 4: Extract and parse results
-    add_progress("extracting", "📦 Extracting JSON from zip file...")
-
-    try:
-        zip_buffer = io.BytesIO(download_response.content)
+    return {
+        "status": "submitted",
+        "process_id": job.process_id,
+        "cves_submitted": len(cves)
+    }
 
-        with zipfile.ZipFile(zip_buffer, 'r') as zip_file:
-            file_list = zip_file.namelist()
-            add_progress("zip_extracted", f"📂 Found {len(file_list)} files in zip: {file_list}")
+@vuln_mcp.tool(description="Get the status of a prioritization job")
+@compact_response
+async def get_prioritization_status(process_id: str) -> dict:
+    """
+    Get the tracked state of a prioritization job.
 
-            json_files = [f for f in file_list if f.endswith('.json')]
+    Args:
+        process_id: The process ID returned by submit_prioritization
+    """
+    # Jobs submitted through another container are adopted and tracked here
+    job = prioritization_jobs.track(process_id)
+    return {
+        "status": "success",
+        "data": job.to_dict()
+    }
 
-            if not json_files:
-                add_progress("error", "❌ No JSON file found in the downloaded zip")
-                return {
-                    "status": "error",
-                    "message": "No JSON file found in zip",
-                    "progress": progress_updates
-                }
+@vuln_mcp.tool(description="Get the results of a completed prioritization job")
+@compact_response
+async def get_prioritization_result(process_id: str, offset: int = 0, limit: int = PRIORITIZATION_PAGE_SIZE) -> dict:
+    """
+    Get a page of prioritization results for a job once it has completed.
 
-            json_filename = json_files[0]
-            add_progress("parsing", f"🔍 Parsing JSON file: {json_filename}")
+    Args:
+        process_id: The process ID returned by submit_prioritization
+        offset: Index of the first record to return (default: 0)
+        limit: Maximum number of records to return (default: PRIORITIZATION_PAGE_SIZE)
+    """
+    job = prioritization_jobs.track(process_id)
 
-            with zip_file.open(json_filename) as json_file:
-                json_content = json_file.read().decode('utf-8')
-                prioritization_data = json.loads(json_content)
+    if job.state == "running":
+        return {
+            "status": "pending",
+            "message": "Job is still running, check get_prioritization_status",
+            "data": job.to_dict()
+        }
+    if job.state != "completed":
+        return {
+            "status": job.state,
+            "message": job.error,
+            "data": job.to_dict()
+        }
 
-        result_count = len(prioritization_data) if isinstance(prioritization_data, list) else 1
-        add_progress("success", f"🎊 Vulnerability prioritization completed successfully! Found {result_count} results")
+    offset = max(0, offset)
+    end = offset + max(0, limit)
 
+    try:
+        async with prioritization_jobs.reading_archive(job) as archive:
+            # Decompressing and parsing the archive is CPU work, keep it off the event loop
+            page = await run_blocking(archive.page, offset, end)
+    except PrioritizationError as e:
         return {
-            "status": "success",
-            "message": "Vulnerability prioritization completed successfully!",
+            "status": "error",
             "process_id": process_id,
-            "cves_processed": cves_to_process,
-            "result_count": result_count,
-            "progress": progress_updates,
-            "data": prioritization_data
+            "message": str(e)
         }
 
-    except (zipfile.BadZipFile, json.JSONDecodeError, KeyError) as e:
-        add_progress("error", f"❌ Failed to extract or parse results: {str(e)}")
+    return {
+        "status": "success",
+        "process_id": process_id,
+        "cves_submitted": len(job.cves) if job.cves is not None else None,
+        "result_count": archive.record_count,
+        "offset": offset,
+        "count": len(page),
+        "next_offset": end if end < archive.record_count else None,
+        "data": page
+    }
+
+@vuln_mcp.tool(description="Prioritize vulnerabilities")
+@compact_response
+async def prioritize_vulnerabilities(cves: list[str] = None, shard_size: int = None,
+                                     max_records: int = None, ctx: Context = None) -> dict:
+    """
+    Prioritize vulnerabilities, streaming progress as MCP progress notifications
+    Default CVEs: CVE-2016-1234, CVE-2017-5678, CVE-2018-9012
+
+    CVEs prioritized recently are answered from cache. The rest are split into
+    shards of `shard_size` (default PRIORITIZATION_SHARD_SIZE) that are submitted
+    and polled concurrently, and the results are merged back in input order.
+    Result archives are streamed record by record; `max_records` caps how many
+    records are returned (every record is still cached).
+    """
+    # Use provided CVEs or default test CVEs
+    test_cves = ["CVE-2016-1234", "CVE-2017-5678", "CVE-2018-9012"]
+    cves_to_process = list(dict.fromkeys(_normalize_cve_id(c) for c in (cves or test_cves) if c and c.strip()))
+
+    started = time.monotonic()
+    progress_step = 0
+
+    async def report(stage, message):
+        """Send a progress notification to the client (if it asked for them) and log it"""
+        nonlocal progress_step
+        progress_step += 1
+        log.debug(f"[{stage.upper()}] {message}")
+        if ctx is not None:
+            await ctx.report_progress(progress=progress_step, message=message)
+
+    def summary(status, message, **kwargs):
         return {
-            "status": "error",
-            "message": f"Parse error: {str(e)}",
-            "progress": progress_updates
+            "status": status,
+            "message": message,
+            "cves_submitted": len(cves_to_process),
+            "elapsed_seconds": round(time.monotonic() - started, 1),
+            **kwargs
         }
 
+    # Step 1: Reuse fresh per-CVE results and shard the rest
+    records = await prioritization_cache.get_many(cves_to_process)
+    pending = [cve for cve in cves_to_process if cve not in records]
+
+    size = max(1, shard_size or PRIORITIZATION_SHARD_SIZE)
+    shards = [pending[i:i + size] for i in range(0, len(pending), size)]
+    await report("submitting", f"{len(records)} of {len(cves_to_process)} CVEs served from cache, "
+                               f"submitting {len(pending)} in {len(shards)} shard(s)")
+
+    # Step 2: Submit and wait for every shard, at most PRIORITIZATION_MAX_PARALLEL_SHARDS at a time
+    semaphore = asyncio.Semaphore(max(1, PRIORITIZATION_MAX_PARALLEL_SHARDS))
+
+    async def run_shard(number, shard):
+        label = f"shard {number}/{len(shards)}"
+        async with semaphore:
+            job = await prioritization_jobs.submit(shard)
+            await report("submitted", f"{label}: {len(shard)} CVEs submitted, process ID {job.process_id}")
+
+            last_seen = None
+            while not job.finished:
+                await prioritization_jobs.wait_for_update(job, timeout=PRIORITIZATION_POLL_MAX_SECONDS)
+                if job.finished or (job.status, job.current_step) == last_seen:
+                    continue
+                last_seen = (job.status, job.current_step)
+                await report("status_update", f"{label}: API status {job.status}, "
+                                              f"step {job.current_step or 'N/A'}, {job.api_elapsed}s elapsed")
+
+            if job.state == "timeout":
+                raise PrioritizationError(f"Job {job.process_id} timed out after {PRIORITIZATION_MAX_WAIT_SECONDS} seconds")
+            if job.state == "failed":
+                raise PrioritizationError(f"Job {job.process_id} failed with status {job.status}: {job.error}")
+
+            # Step 3: Download this shard's result archive
+            await report("downloading", f"{label}: processing complete, downloading results")
+            await prioritization_jobs.fetch_archive(job)
+            return job
+
+    shard_results = await asyncio.gather(*(run_shard(n, shard) for n, shard in enumerate(shards, start=1)),
+                                         return_exceptions=True)
+
+    # Step 4: Stream each archive, caching every record per CVE but keeping only
+    # the ones we return: per-CVE records in input order, then anything we could
+    # not attribute to a CVE
+    wanted = set(cves_to_process[:max_records]) if max_records is not None else None
+    process_ids = []
+    errors = []
+    unattributed = []
+    record_total = len(records)
+    try:
+        for number, outcome in enumerate(shard_results, start=1):
+            if isinstance(outcome, BaseException) and not isinstance(outcome, PrioritizationError):
+                raise outcome
+
+            try:
+                if isinstance(outcome, PrioritizationError):
+                    raise outcome
+                async with prioritization_jobs.reading_archive(outcome) as archive:
+                    record_total += await run_blocking(_fold_prioritization_archive, archive, wanted,
+                                                       max_records, records, unattributed)
+                process_ids.append(outcome.process_id)
+            except PrioritizationError as e:
+                errors.append(f"shard {number}/{len(shards)}: {e}")
+                await report("error", errors[-1])
+    finally:
+        # Every record is now in the cache; free the archives' temp files
+        # instead of holding them until the jobs are pruned
+        for outcome in shard_results:
+            if isinstance(outcome, PrioritizationJob):
+                await prioritization_jobs.release_archive(outcome)
+
+    prioritization_data = [records[cve] for cve in cves_to_process if cve in records] + unattributed
+    if max_records is not None:
+        prioritization_data = prioritization_data[:max_records]
+    details = {
+        "process_ids": process_ids,
+        "shards": len(shards),
+        "cves_from_cache": len(cves_to_process) - len(pending),
+        "result_count": record_total,
+        "returned_count": len(prioritization_data),
+        "truncated": len(prioritization_data) < record_total,
+    }
+
+    if errors and not process_ids and shards:
+        return summary("error", "; ".join(errors), **details)
+
+    await report("success", f"Prioritization complete, {record_total} results")
+
+    if errors:
+        return summary("partial", f"{len(errors)} of {len(shards)} shards failed",
+                       errors=errors, data=prioritization_data, **details)
+
+    return summary("success", "Vulnerability prioritization completed successfully!",
+                   data=prioritization_data, **details)
+
+
+# Threat-intel news feed, indexed by the CVEs it mentions for correlate_cves
+THREATINTEL_NEWS_URL = os.environ.get("THREATINTEL_NEWS_URL", "https://threatintel-internal.transilienceapi.com/get_threat_intel")
+CVE_XREF_REFRESH_SECONDS = int(os.environ.get("CVE_XREF_REFRESH_SECONDS", "900"))
+CVE_XREF_MAX_NEWS_PER_CVE = int(os.environ.get("CVE_XREF_MAX_NEWS_PER_CVE", "10"))
+
+CVE_PATTERN = re.compile(r'CVE-\d{4}-\d{4,}', re.IGNORECASE)
+NEWS_CVE_FIELDS = ('cve_id', 'cve_ids', 'vulnerabilities_targeted')
+NEWS_ACTOR_FIELDS = ('primary_threat_actor', 'threat_actor_group')
+# Fields of a news item kept in the cross-reference
+NEWS_XREF_FIELDS = ('threat_article_title', 'threat_article_url', 'date_published', 'threat_severity',
+                    'primary_threat_actor', 'threat_actor_group', 'threat_name')
+
+
+def _news_actors(item: dict) -> list[str]:
+    actors = []
+    for field in NEWS_ACTOR_FIELDS:
+        value = item.get(field)
+        values = value if isinstance(value, list) else re.split(r'[,;]', str(value or ""))
+        actors.extend(str(v).strip().strip('[]\'"') for v in values)
+    return [a for a in actors if a and a.lower() not in ('none', 'null', 'n/a', 'unknown')]
+
 
-@app.function(image=image, min_containers=1)
+class CveCrossReference:
+    """Inverted index from CVE ID to the threat-news items and actors that mention it.
+
+    Refreshing re-reads the news feed but only re-indexes items whose content
+    changed (and drops items that left the feed). correlate() joins the
+    postings with the KEV index and the CVE advisory cache at query time, so
+    each source refreshes on its own schedule without a full rebuild.
+    """
+
+    def __init__(self, refresh_seconds: int):
+        self.refresh_seconds = refresh_seconds
+        self._items = {}
+        self._by_cve = {}
+        self._loaded = False
+        self._next_refresh = 0.0
+        self._refresh_lock = None
+        self._refresh_task = None
+        self.last_refresh = {}
+
+    def _index(self, items: list) -> tuple[dict, dict, dict]:
+        """Index a feed snapshot into copies of the postings, for refresh() to swap in.
+
+        Runs on the tool executor, so it never mutates the dicts news_for()
+        reads on the event loop. Returns (items, by_cve, stats).
+        """
+        indexed = dict(self._items)
+        by_cve = {cve: set(keys) for cve, keys in self._by_cve.items()}
+        seen = set()
+        added = updated = 0
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            data = json.dumps(item, sort_keys=True, default=str)
+            row_hash = hashlib.sha1(data.encode()).hexdigest()
+            key = item.get('threat_article_url') or item.get('source_article_link') or row_hash
+            seen.add(key)
+
+            existing = indexed.get(key)
+            if existing is not None and existing["hash"] == row_hash:
+                continue
+            if existing is not None:
+                self._remove(indexed, by_cve, key)
+                updated += 1
+            else:
+                added += 1
+
+            cves = {cve.upper() for field in NEWS_CVE_FIELDS for cve in CVE_PATTERN.findall(str(item.get(field) or ""))}
+            if not cves:
+                # Not CVE-related; remember the hash so it is skipped next time
+                indexed[key] = {"hash": row_hash, "cves": cves}
+                continue
+            summary = {field: item[field] for field in NEWS_XREF_FIELDS if item.get(field)}
+            indexed[key] = {"hash": row_hash, "cves": cves, "summary": summary, "actors": _news_actors(item)}
+            for cve in cves:
+                by_cve.setdefault(cve, set()).add(key)
+
+        removed = [key for key in indexed if key not in seen]
+        for key in removed:
+            self._remove(indexed, by_cve, key)
+
+        return indexed, by_cve, {"added": added, "updated": updated, "removed": len(removed),
+                                 "cves_indexed": len(by_cve), "refreshed_at": time.time()}
+
+    @staticmethod
+    def _remove(indexed: dict, by_cve: dict, key: str):
+        entry = indexed.pop(key)
+        for cve in entry["cves"]:
+            postings = by_cve.get(cve)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del by_cve[cve]
+
+    async def refresh(self, refetch: bool = False) -> dict:
+        """Re-index the news feed, reusing a copy in news_feed_cache unless refetch is set."""
+        if self._refresh_lock is None:
+            self._refresh_lock = asyncio.Lock()
+        async with self._refresh_lock:
+            items = None if refetch else await news_feed_cache.get(THREATINTEL_NEWS_URL)
+            if items is None:
+                session = await _get_vuln_api_session()
+                async with session.post(THREATINTEL_NEWS_URL, json={"type": "threatintel"},
+                                        headers={"Content-Type": "application/json"}) as response:
+                    response.raise_for_status()
+                    body = await response.read()
+                # Parse and index off the event loop; the feed runs to megabytes
+                items = await run_blocking(json.loads, body)
+                news_feed_cache.put(THREATINTEL_NEWS_URL, items)
+
+            self._items, self._by_cve, self.last_refresh = await run_blocking(
+                self._index, items if isinstance(items, list) else [])
+            self._loaded = True
+            self._next_refresh = time.monotonic() + self.refresh_seconds
+            log.info(f"cve-xref news refreshed: {self.last_refresh}")
+            return self.last_refresh
+
+    async def ensure_fresh(self):
+        """Load inline on first use, afterwards refresh in the background when due."""
+        if self._loaded and time.monotonic() < self._next_refresh:
+            return
+        if not self._loaded:
+            await self.refresh()
+        elif self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._background_refresh())
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            self._next_refresh = time.monotonic() + KEV_RETRY_SECONDS
+            log.warning(f"cve-xref news refresh failed, serving previous index: {e}")
+
+    def news_for(self, cve_id: str) -> tuple[list[dict], list[str]]:
+        """News items (newest first) and distinct actors linked to a CVE."""
+        entries = [self._items[key] for key in self._by_cve.get(cve_id, ())]
+        entries.sort(key=lambda e: str(e["summary"].get('date_published', '')), reverse=True)
+        actors = list(dict.fromkeys(actor for e in entries for actor in e["actors"]))
+        return [e["summary"] for e in entries[:CVE_XREF_MAX_NEWS_PER_CVE]], actors
+
+    def cves(self) -> list[str]:
+        return list(self._by_cve)
+
+
+# Raw news feed, shared through the disk tier so replicas and the prefetcher fetch it once
+news_feed_cache = TieredCache("news_feed", 1, CVE_XREF_REFRESH_SECONDS, disk=cache_disk)
+cve_xref = CveCrossReference(CVE_XREF_REFRESH_SECONDS)
+
+
+@vuln_mcp.tool(description="Correlate CVEs across CISA KEV, threat intel news, threat actors and advisories")
+@compact_response
+async def correlate_cves(cve_ids: list[str] = None, days_ago: int = 30, require_threat_actor: bool = False,
+                         require_kev: bool = False, fetch_advisories: bool = False, limit: int = 100) -> dict:
+    """
+    Join CISA KEV entries, threat intel news, threat actors and CVE advisories per CVE in one call.
+
+    Args:
+        cve_ids: CVEs to correlate; if omitted, the KEV entries added in the last `days_ago` days
+        days_ago: KEV window used when cve_ids is omitted (default: 30)
+        require_threat_actor: Only return CVEs linked to at least one threat actor in the news
+        require_kev: Only return CVEs that are in the KEV catalog
+        fetch_advisories: Fetch advisories missing from the cache (otherwise only cached ones are attached)
+        limit: Maximum number of CVEs to return (default: 100)
+    """
+    log.debug(f"correlate_cves(cve_ids={len(cve_ids) if cve_ids else None}, days_ago={days_ago}, "
+              f"require_threat_actor={require_threat_actor}, require_kev={require_kev}, "
+              f"fetch_advisories={fetch_advisories}, limit={limit})")
+
+    try:
+        cutoff_date = None if cve_ids else _kev_cutoff(days_ago)
+    except ValueError as e:
+        return {"success": False, "error": f"Invalid days_ago: {e}"}
+
+    try:
+        (catalog, kev_stale), _ = await asyncio.gather(kev_store.get(), cve_xref.ensure_fresh())
+    except Exception as e:
+        return {"success": False, "error": f"Failed to load correlation sources: {str(e) or type(e).__name__}"}
+
+    if cve_ids:
+        candidates = list(dict.fromkeys(_normalize_cve_id(c) for c in cve_ids if c and c.strip()))
+    else:
+        candidates = [entry['cveID'] for entry in catalog.added_since(cutoff_date)]
+
+    results = []
+    for cve in candidates:
+        kev_entry = catalog.get(cve)
+        news, actors = cve_xref.news_for(cve)
+        if (require_kev and kev_entry is None) or (require_threat_actor and not actors):
+            continue
+        results.append({"cve_id": cve, "in_kev": kev_entry is not None, "kev": kev_entry,
+                        "threat_actors": actors, "news_count": len(news), "news": news})
+        if len(results) >= limit:
+            break
+
+    # Attach advisories: cached ones always, missing ones only on request
+    api_key = os.environ.get("vuln_api_key")
+    if fetch_advisories and api_key:
+        session = await _get_vuln_api_session()
+        semaphore = asyncio.Semaphore(CVE_BATCH_MAX_CONCURRENCY)
+
+        async def advisory(cve):
+            async with semaphore:
+                return await _fetch_cve_info(session, cve, api_key)
+
+        advisories = await asyncio.gather(*(advisory(r["cve_id"]) for r in results))
+    else:
+        cached = await cve_cache.get_many([r["cve_id"] for r in results], allow_stale=True)
+        advisories = [cached.get(r["cve_id"]) for r in results]
+    for result, advisory in zip(results, advisories):
+        result["advisory"] = advisory["data"] if advisory and advisory.get("success") else None
+
+    return {
+        "success": True,
+        "data": {
+            "catalogVersion": catalog.catalog_version,
+            "kev_stale": kev_stale,
+            "news_refreshed_at": cve_xref.last_refresh.get("refreshed_at"),
+            "candidates": len(candidates),
+            "count": len(results),
+            "results": results
+        }
+    }
+
+
+async def prefetch() -> dict:
+    """Refresh the KEV catalog and the news feed ahead of the tools that read them."""
+    started = time.perf_counter()
+    outcomes = await run_prefetch_steps([
+        ("kev", "kev", kev_store.refresh),
+        ("news_feed", "news_feed", functools.partial(cve_xref.refresh, refetch=True)),
+    ])
+    if cache_disk is not None:
+        await cache_disk.flush()
+    log_prefetch_outcomes(outcomes, started)
+    return outcomes
+
+
+if PREFETCH_MODE == "cron" and PREFETCH_INTERVAL_SECONDS > 0:
+    @app.function(image=image, schedule=modal.Period(seconds=PREFETCH_INTERVAL_SECONDS),
+                  volumes={CACHE_DIR: cache_volume})
+    async def prefetch_vuln():
+        """Scheduled prefetch; the servers pick the results up from the cache volume."""
+        await prefetch()
+        await cache_volume.commit.aio()
+
+
+# Concurrent MCP requests one container aims to serve before Modal scales
+# out, and the most it will ever accept; tools are async, so a warm container
+# serves many sessions at once
+MODAL_TARGET_INPUTS = int(os.environ.get("MODAL_TARGET_INPUTS", "64"))
+MODAL_MAX_INPUTS = int(os.environ.get("MODAL_MAX_INPUTS", "128"))
+
+
+# Snapshot the container after imports so new containers restore the loaded
+# modules instead of importing them again; the cache volume, when configured,
+# carries the disk cache tier across replicas and restarts
+@app.function(image=image, min_containers=1, enable_memory_snapshot=True,
+              volumes={CACHE_DIR: cache_volume} if cache_volume is not None else {})
+@modal.concurrent(max_inputs=MODAL_MAX_INPUTS, target_inputs=MODAL_TARGET_INPUTS)
 @asgi_app(label="mcp-vuln-auth", custom_domains=["vulnmcp.transilienceapi.com"])
-def vulnmcp_transilienceapi_com() -> FastAPI:
-    """Entrypoint for Modal to serve the FastAPI + MCP ASGI app."""
+def vulnmcp_transilienceapi_com() -> Starlette:
+    """Entrypoint for Modal to serve the authenticated MCP ASGI app."""
     # Load valid API keys from environment
     VALID_KEYS = json.loads(os.environ.get("MCP_VALID_KEYS", '["changeme"]'))
 
     # Create MCP app first
+    # SSE responses (json_response=False) so progress notifications reach the
+    # client while long tools such as prioritize_vulnerabilities are running
     mcp_app = vuln_mcp.http_app(
         path="/mcp",
         stateless_http=True,
-        json_response=True,
+        json_response=False,
         transport="streamable-http"
     )
 
-    # Pass MCP app's lifespan to FastAPI
-    fast_api_app = FastAPI(
-        title="mcp-vuln-auth",
-        lifespan=mcp_app.lifespan
-    )
+    # Pass MCP app's lifespan to the outer app, with the prefetch loop when it
+    # runs in-process; Starlette is already loaded by fastmcp, so wrapping it
+    # costs nothing at cold start
+    web_app = Starlette(lifespan=with_prefetch_loop(mcp_app.lifespan, prefetch))
 
-    # Add authentication middleware
-    @fast_api_app.middleware("http")
-    async def auth_middleware(request: Request, call_next):
-        # Check Authorization header
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"error": "Missing Authorization header"}
-            )
-
-        # Validate Bearer token
-        try:
-            scheme, token = auth_header.split()
-            if scheme.lower() != "bearer":
-                raise ValueError("Invalid authentication scheme")
-            # Use timing-attack resistant comparison
-            if not any(secrets.compare_digest(token, valid_key) for valid_key in VALID_KEYS):
-                raise ValueError("Invalid token")
-        except (ValueError, AttributeError):
-            return JSONResponse(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                content={"error": "Invalid Authorization header"}
-            )
-
-        # Token is valid, proceed
-        response = await call_next(request)
-        return response
+    # Authenticate and rate-limit every request before it reaches the MCP app
+    web_app.add_middleware(AuthMiddleware, valid_keys=VALID_KEYS)
+
+    # Prometheus scrape endpoint, behind the same bearer auth as the MCP app
+    async def metrics_endpoint(request):
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    web_app.add_route("/metrics", metrics_endpoint)
 
     # Mount the MCP app
-    fast_api_app.mount("/vuln", mcp_app)
+    web_app.mount("/vuln", mcp_app)
 
-    return fast_api_app
+    return web_app
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# The server modules live one directory up and are imported as top-level modules,
+# next to the mcp_common package under shared/backend
+_here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_here, ".."))
+sys.path.insert(0, os.path.normpath(os.path.join(_here, "..", "..", "..", "..", "..", "..", "shared", "backend")))
+
+# Keep the servers' disk cache tier and SQLite stores out of /tmp's shared defaults
+_workdir = tempfile.mkdtemp(prefix="mcp-tests-")
+os.environ.setdefault("CACHE_DIR", os.path.join(_workdir, "cache"))
+os.environ.setdefault("NEWS_DB_PATH", os.path.join(_workdir, "news.sqlite3"))
+os.environ.setdefault("SEARCH_DB_PATH", os.path.join(_workdir, "search.sqlite3"))
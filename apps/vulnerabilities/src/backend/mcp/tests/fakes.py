@@ -0,0 +1,22 @@
+"""Stand-ins for the upstream HTTP clients the servers use."""
+import json
+
+
+class FakeResponse:
+    """An aiohttp response as the vuln server uses it: an async context manager with json() and text()."""
+
+    def __init__(self, status: int, body):
+        self.status = status
+        self._body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self._body
+
+    async def text(self):
+        return json.dumps(self._body)
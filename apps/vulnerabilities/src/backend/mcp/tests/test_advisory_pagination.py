@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+import modal_mcp_auth_threatintel as threatintel
+
+PAGES = ["aaaa", "bbbbbb", "", "cc", "dddd"]
+
+
+@pytest.fixture
+def advisory(monkeypatch):
+    """An advisory whose pages are PAGES, recording which pages were extracted."""
+    extracted = []
+
+    async def get_pdf(report_id, headers):
+        return "digest", b"%PDF"
+
+    async def metadata(digest, pdf_content):
+        return {"page_count": len(PAGES)}
+
+    async def pages(digest, pdf_content, page_indexes):
+        extracted.append(list(page_indexes))
+        return [PAGES[i] for i in page_indexes]
+
+    monkeypatch.setenv("threatintel_api_key", "test")
+    monkeypatch.setattr(threatintel, "_get_advisory_pdf", get_pdf)
+    monkeypatch.setattr(threatintel, "_advisory_metadata", metadata)
+    monkeypatch.setattr(threatintel, "_advisory_pages", pages)
+    return extracted
+
+
+def read(**kwargs):
+    tool = threatintel.get_threat_report_advisory
+    result = asyncio.run(getattr(tool, "fn", tool)(report_id="R1", **kwargs))
+    return json.loads(result.content[0].text)
+
+
+def read_all(max_chars, **kwargs):
+    texts, cursors = [], []
+    page = read(max_chars=max_chars, **kwargs)
+    while True:
+        texts.append(page["text"])
+        if not page["next_cursor"]:
+            return texts, cursors
+        cursors.append(page["next_cursor"])
+        page = read(max_chars=max_chars, cursor=page["next_cursor"], **kwargs)
+
+
+def test_whole_advisory_fits_in_one_call(advisory):
+    page = read()
+    assert page["text"] == "".join(PAGES)
+    assert page["next_cursor"] is None
+    assert (page["page_count"], page["start_page"], page["end_page"]) == (5, 1, 5)
+
+
+def test_cursor_splits_pages_without_losing_or_repeating_text(advisory):
+    texts, cursors = read_all(max_chars=3)
+    assert "".join(texts) == "".join(PAGES)
+    assert all(len(text) <= 3 for text in texts)
+    assert cursors[:3] == ["1:3", "2:2", "2:5"]
+
+
+def test_budget_ending_on_a_page_boundary_resumes_at_the_next_page(advisory):
+    page = read(max_chars=4)
+    assert page["text"] == "aaaa" and page["next_cursor"] == "2:0"
+
+
+def test_page_range_only_extracts_the_requested_pages(advisory):
+    page = read(start_page=2, end_page=4)
+    assert page["text"] == "bbbbbbcc"
+    assert (page["start_page"], page["end_page"], page["next_cursor"]) == (2, 4, None)
+    assert advisory == [[1, 2, 3]]
+
+    texts, _ = read_all(max_chars=4, start_page=2, end_page=4)
+    assert "".join(texts) == "bbbbbbcc"
+
+
+def test_end_page_is_clamped_to_the_page_count(advisory):
+    page = read(start_page=5, end_page=99)
+    assert page["text"] == "dddd" and page["end_page"] == 5
+
+
+def test_invalid_cursor_is_reported(advisory):
+    assert read(cursor="nonsense") == {"error": "Invalid cursor: nonsense"}
+    assert advisory == []
@@ -0,0 +1,90 @@
+import asyncio
+
+import httpx
+import pytest
+
+from mcp_common import auth
+from mcp_common.auth import AuthMiddleware
+
+
+class Clock:
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        monkeypatch.setattr(auth.time, "monotonic", lambda: self.now)
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def get(app, *tokens):
+    """GET / once per token (None sends no Authorization header), returning the responses."""
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.get("/", headers={"Authorization": f"Bearer {t}"} if t else {})
+                    for t in tokens]
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    return Clock(monkeypatch)
+
+
+def test_rejects_missing_and_unknown_tokens(clock):
+    app = AuthMiddleware(ok_app, valid_keys=["good"])
+    missing, wrong, good = get(app, None, "bad", "good")
+    assert missing.status_code == 401 and missing.json() == {"error": "Missing Authorization header"}
+    assert wrong.status_code == 401 and wrong.json() == {"error": "Invalid Authorization header"}
+    assert good.status_code == 200 and good.text == "ok"
+
+
+def test_burst_then_429_with_retry_after_until_tokens_refill(clock):
+    app = AuthMiddleware(ok_app, valid_keys=["a", "b"], rate=0.5, burst=2)
+    first, second, limited = get(app, "a", "a", "a")
+    assert first.status_code == second.status_code == 200
+    assert limited.status_code == 429
+    assert limited.json() == {"error": "Too many requests for this API key"}
+    assert limited.headers["Retry-After"] == "2"
+
+    # Buckets are per key
+    assert get(app, "b")[0].status_code == 200
+
+    clock.now += 2
+    assert [r.status_code for r in get(app, "a", "a")] == [200, 429]
+
+
+def test_zero_rate_disables_the_bucket(clock):
+    app = AuthMiddleware(ok_app, valid_keys=["a"], rate=0, burst=1)
+    assert {r.status_code for r in get(app, *["a"] * 5)} == {200}
+
+
+def test_in_flight_cap_holds_a_slot_until_the_response_ends(clock):
+    release = None
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await ok_app(scope, receive, send)
+
+    app = AuthMiddleware(slow_app, valid_keys=["a"], rate=0, max_in_flight=1)
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"Authorization": "Bearer a"}
+            held = asyncio.create_task(client.get("/", headers=headers))
+            while not app._in_flight:
+                await asyncio.sleep(0)
+            rejected = await client.get("/", headers=headers)
+            release.set()
+            return (await held), rejected, (await client.get("/", headers=headers))
+
+    held, rejected, after = asyncio.run(main())
+    assert held.status_code == 200
+    assert rejected.status_code == 429 and rejected.headers["Retry-After"] == "1"
+    assert after.status_code == 200
+    assert app._in_flight == {}
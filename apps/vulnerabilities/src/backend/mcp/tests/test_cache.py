@@ -0,0 +1,130 @@
+import asyncio
+import os
+
+import pytest
+
+from mcp_common import cache
+from mcp_common.cache import DiskStore, TieredCache
+
+
+class Clock:
+    def __init__(self, monkeypatch):
+        self.now = 1_000_000.0
+        monkeypatch.setattr(cache.time, "time", lambda: self.now)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    return Clock(monkeypatch)
+
+
+def test_entry_is_fresh_then_stale_then_gone(clock):
+    tier = TieredCache("test", max_entries=10, ttl=60, stale_seconds=30)
+    tier.put("k", "v")
+
+    assert asyncio.run(tier.lookup("k")) == ("v", True)
+    clock.now += 60
+    assert asyncio.run(tier.lookup("k")) == ("v", False)
+    assert asyncio.run(tier.get("k")) is None
+    assert asyncio.run(tier.get("k", allow_stale=True)) == "v"
+    clock.now += 30
+    assert asyncio.run(tier.lookup("k")) is None
+
+    stats = tier.stats()
+    assert stats["stale_hits"] == 3 and stats["expirations"] == 1 and stats["size"] == 0
+
+
+def test_lru_bound_evicts_least_recently_used(clock):
+    tier = TieredCache("test", max_entries=2, ttl=60)
+    tier.put("a", 1)
+    tier.put("b", 2)
+    asyncio.run(tier.get("a"))
+    tier.put("c", 3)
+
+    assert asyncio.run(tier.get_many(["a", "b", "c"])) == {"a": 1, "c": 3}
+    assert tier.stats()["evictions"] == 1
+
+
+def test_disk_tier_serves_another_replica_with_the_original_age(clock, tmp_path):
+    disk = DiskStore(str(tmp_path), max_bytes=1 << 20)
+    TieredCache("test", max_entries=10, ttl=60, stale_seconds=30, disk=disk).put("k", {"n": 1})
+
+    # A second process sees the entry through the shared directory
+    replica = TieredCache("test", max_entries=10, ttl=60, stale_seconds=30, disk=disk)
+    clock.now += 45
+    assert replica.lookup_blocking("k") == ({"n": 1}, True)
+    assert replica.stats()["l2_hits"] == 1
+
+    clock.now += 30
+    late = TieredCache("test", max_entries=10, ttl=60, stale_seconds=30, disk=disk)
+    assert late.lookup_blocking("k") == ({"n": 1}, False)
+    clock.now += 15
+    assert disk.read("test", "k") is None
+    assert not os.path.exists(disk._path("test", "k"))
+
+
+def test_disk_tier_discards_unreadable_entries(clock, tmp_path):
+    disk = DiskStore(str(tmp_path), max_bytes=1 << 20)
+    disk.write("test", "k", clock.now + 60, clock.now + 60, "v")
+    path = disk._path("test", "k")
+    with open(path, "wb") as f:
+        f.write(b"truncated")
+
+    assert disk.read("test", "k") is None
+    assert disk.errors == 1 and not os.path.exists(path)
+
+
+def test_disk_tier_evicts_least_recently_used_past_budget(clock, tmp_path):
+    disk = DiskStore(str(tmp_path), max_bytes=3000)
+    for i in range(3):
+        disk.write("test", i, clock.now + 60, clock.now + 60, "x" * 900)
+        os.utime(disk._path("test", i), (i, i))
+    disk.read("test", 0)
+    disk.write("test", 3, clock.now + 60, clock.now + 60, "x" * 900)
+
+    assert disk.evictions >= 1
+    assert disk.read("test", 1) is None
+    assert disk.read("test", 0) is not None and disk.read("test", 3) is not None
+    assert disk.stats()["bytes"] <= 3000 * 0.9
+
+
+def test_write_behind_from_the_event_loop_lands_after_flush(clock, tmp_path):
+    disk = DiskStore(str(tmp_path), max_bytes=1 << 20)
+    tier = TieredCache("test", max_entries=10, ttl=60, disk=disk)
+
+    async def main():
+        tier.put("k", "v")
+        await disk.flush()
+
+    asyncio.run(main())
+    assert disk.read("test", "k")[2] == "v"
+
+
+def test_revalidate_runs_one_refresh_per_key(clock):
+    tier = TieredCache("test", max_entries=10, ttl=60, stale_seconds=30)
+    tier.put("k", "old")
+    clock.now += 61
+    calls = []
+
+    async def refresh():
+        calls.append(1)
+        await asyncio.sleep(0)
+        tier.put("k", "new")
+
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def main():
+        tier.revalidate("k", refresh)
+        tier.revalidate("k", refresh)
+        await asyncio.sleep(0.01)
+        assert await tier.get("k") == "new"
+
+        clock.now += 61
+        tier.revalidate("k", failing)
+        await asyncio.sleep(0.01)
+        assert await tier.get("k", allow_stale=True) == "new"
+        assert tier._refreshing == {}
+
+    asyncio.run(main())
+    assert calls == [1]
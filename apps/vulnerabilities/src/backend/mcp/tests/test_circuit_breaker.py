@@ -0,0 +1,130 @@
+import asyncio
+
+import httpx
+import pytest
+
+import modal_mcp_auth_threatintel as threatintel
+from modal_mcp_auth_threatintel import CircuitBreaker, UpstreamClient, UpstreamUnavailable
+
+
+class Clock:
+    def __init__(self, monkeypatch):
+        self.now = 1000.0
+        monkeypatch.setattr(threatintel.time, "monotonic", lambda: self.now)
+
+
+def test_opens_after_threshold_and_half_opens_after_reset(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = CircuitBreaker(threshold=3, reset_seconds=30)
+
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow(), "only one trial call at a time"
+
+
+def test_trial_success_closes_and_failure_reopens(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = CircuitBreaker(threshold=1, reset_seconds=30)
+    breaker.record_failure()
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def test_end_trial_frees_the_slot_without_a_verdict(monkeypatch):
+    clock = Clock(monkeypatch)
+    breaker = CircuitBreaker(threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock.now += 30
+
+    assert breaker.allow()
+    breaker.end_trial()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def run_with_transport(handler, coro_fn):
+    async def main():
+        client = UpstreamClient()
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        client._client_loop = asyncio.get_running_loop()
+        try:
+            return await coro_fn(client)
+        finally:
+            await client._client.aclose()
+
+    return asyncio.run(main())
+
+
+def open_breaker(client: UpstreamClient, host: str) -> CircuitBreaker:
+    breaker = client.breakers.setdefault(host, CircuitBreaker(1, 0))
+    breaker.record_failure()
+    return breaker
+
+
+def test_unexpected_error_in_trial_counts_as_failure_and_frees_the_slot(monkeypatch):
+    monkeypatch.setattr(threatintel, "UPSTREAM_RETRIES", 0)
+
+    def handler(request):
+        raise httpx.DecodingError("bad gzip", request=request)
+
+    async def scenario(client):
+        breaker = open_breaker(client, "api.test")
+        with pytest.raises(httpx.DecodingError):
+            await client.get("https://api.test/threats")
+        assert breaker.failures == 2
+        assert breaker.allow(), "the trial slot was released"
+
+    run_with_transport(handler, scenario)
+
+
+def test_cancelled_trial_frees_the_slot(monkeypatch):
+    monkeypatch.setattr(threatintel, "UPSTREAM_RETRIES", 0)
+    started = asyncio.Event()
+
+    async def handler(request):
+        started.set()
+        await asyncio.sleep(60)
+
+    async def scenario(client):
+        breaker = open_breaker(client, "api.test")
+        task = asyncio.create_task(client.get("https://api.test/threats"))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert breaker.state == "half_open"
+        assert breaker.allow()
+
+    run_with_transport(handler, scenario)
+
+
+def test_open_circuit_fails_fast(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={})
+
+    async def scenario(client):
+        client.breakers["api.test"] = CircuitBreaker(1, 3600)
+        client.breakers["api.test"].record_failure()
+        with pytest.raises(UpstreamUnavailable):
+            await client.get("https://api.test/threats")
+
+    run_with_transport(handler, scenario)
+    assert calls == []
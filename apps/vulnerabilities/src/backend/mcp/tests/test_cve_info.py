@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+import modal_mcp_auth_vuln as vuln
+from fakes import FakeResponse
+
+
+class CaseStrictSession:
+    """Answers only the canonical spelling of a known CVE, like a case-sensitive API route."""
+
+    def __init__(self, known):
+        self.known = set(known)
+        self.paths = []
+
+    def get(self, url, headers=None):
+        cve_id = url.rsplit("/", 1)[-1]
+        self.paths.append(cve_id)
+        if cve_id in self.known:
+            return FakeResponse(200, {"id": cve_id})
+        return FakeResponse(404, {"detail": "CVE not found"})
+
+
+def call(tool, session, monkeypatch, **kwargs):
+    async def get_session():
+        return session
+
+    monkeypatch.setattr(vuln, "_get_vuln_api_session", get_session)
+    monkeypatch.setenv("vuln_api_key", "test")
+    result = asyncio.run(getattr(tool, "fn", tool)(**kwargs))
+    return json.loads(result.content[0].text)
+
+
+def test_lowercase_id_is_requested_and_cached_in_canonical_form(monkeypatch):
+    session = CaseStrictSession({"CVE-2020-10001"})
+
+    first = call(vuln.query_cve_info, session, monkeypatch, cve_id=" cve-2020-10001 ")
+    second = call(vuln.query_cve_info, session, monkeypatch, cve_id="CVE-2020-10001")
+
+    assert session.paths == ["CVE-2020-10001"]
+    assert first["success"] and first["cve_id"] == "CVE-2020-10001"
+    assert second["success"] and second["cached"] is True
+
+
+def test_batch_dedupes_spellings_and_requests_canonical_ids(monkeypatch):
+    session = CaseStrictSession({"CVE-2021-20001", "CVE-2021-20002"})
+
+    result = call(vuln.query_cve_info_batch, session, monkeypatch,
+                  cve_ids=["cve-2021-20001", "CVE-2021-20001", "Cve-2021-20002", " "])
+
+    assert sorted(session.paths) == ["CVE-2021-20001", "CVE-2021-20002"]
+    assert result["unique"] == 2 and result["succeeded"] == 2
+    assert [r["cve_id"] for r in result["results"]] == ["CVE-2021-20001", "CVE-2021-20002"]
@@ -0,0 +1,85 @@
+import pytest
+
+from modal_mcp_auth_threatintel import classify_indicator, extract_indicators
+
+SHA256 = "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08"
+
+
+@pytest.mark.parametrize("value, expected", [
+    # Defanged forms
+    ("evil[.]example[.]com", ("domain", "evil.example.com")),
+    ("evil(.)example{.}com", ("domain", "evil.example.com")),
+    ("evil[dot]example[dot]com", ("domain", "evil.example.com")),
+    ("hxxps://evil[.]example[.]com/payload", ("url", "https://evil.example.com/payload")),
+    ("hxxp[://]evil.example.com", ("url", "http://evil.example.com/")),
+    ("fxp://files.example.com/drop.bin", ("url", "ftp://files.example.com/drop.bin")),
+    ("admin[at]evil[.]example[.]com", ("email", "admin@evil.example.com")),
+    ("192.168.10[.]5", ("ipv4", "192.168.10.5")),
+    ("[2001:db8::1]", ("ipv6", "2001:db8::1")),
+    # Uppercase
+    ("EVIL.EXAMPLE.COM", ("domain", "evil.example.com")),
+    ("HXXPS://EVIL[.]EXAMPLE[.]COM/Path?Q=1", ("url", "https://evil.example.com/Path?Q=1")),
+    ("Admin@Evil.Example.COM", ("email", "admin@evil.example.com")),
+    (SHA256.upper(), ("sha256", SHA256)),
+    ("2001:DB8::1", ("ipv6", "2001:db8::1")),
+    # Trailing punctuation and root dots
+    ("evil.example.com.", ("domain", "evil.example.com")),
+    ("evil[.]example[.]com[.]", ("domain", "evil.example.com")),
+    ("admin@evil.example.com.", ("email", "admin@evil.example.com")),
+    ("203.0.113.7.", ("ipv4", "203.0.113.7")),
+    ("https://evil.example.com/a).", ("url", "https://evil.example.com/a")),
+    ("https://evil.example.com/a?b=1;", ("url", "https://evil.example.com/a?b=1")),
+    ("  evil.example.com \n", ("domain", "evil.example.com")),
+])
+def test_classify_indicator(value, expected):
+    assert classify_indicator(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "   ", "[.]", "report.pdf", "0.0.0.0", "not an indicator", "999.1.1.1"])
+def test_classify_indicator_rejects_non_indicators(value):
+    assert classify_indicator(value) is None
+
+
+def test_extract_indicators_normalizes_like_classify_indicator():
+    content = (
+        "<p>C2: hxxps://Evil[.]Example[.]com/gate.php?id=1.</p>"
+        "<p>Fallback EVIL2.example.org, contact ops[at]evil2[.]example[.]org;</p>"
+        f"<td>{SHA256.upper()}</td><td>198.51.100[.]23.</td>"
+        "<p>Dropped invoice.pdf &amp; 2001:DB8::7f (see report).</p>"
+    )
+    found = {(record["type"], record["value"]) for record in extract_indicators(content)}
+
+    assert found == {
+        ("url", "https://evil.example.com/gate.php?id=1"),
+        ("domain", "evil.example.com"),
+        ("domain", "evil2.example.org"),
+        ("email", "ops@evil2.example.org"),
+        ("sha256", SHA256),
+        ("ipv4", "198.51.100.23"),
+        ("ipv6", "2001:db8::7f"),
+    }
+    for kind, value in found:
+        assert classify_indicator(value) == (kind, value)
+
+
+def test_extract_indicators_deduplicates_across_forms():
+    content = "evil[.]example[.]com EVIL.EXAMPLE.COM evil.example.com."
+    assert extract_indicators(content) == [{"type": "domain", "value": "evil.example.com"}]
+
+
+def test_extract_indicators_empty():
+    assert extract_indicators("") == []
+    assert extract_indicators(None) == []
+
+
+def test_email_local_part_is_not_a_domain():
+    content = "Mail first.last@example.com or j.doe[at]corp[.]example[.]org; see mail.example.net."
+    found = {(record["type"], record["value"]) for record in extract_indicators(content)}
+
+    assert found == {
+        ("email", "first.last@example.com"),
+        ("email", "j.doe@corp.example.org"),
+        ("domain", "example.com"),
+        ("domain", "corp.example.org"),
+        ("domain", "mail.example.net"),
+    }
@@ -0,0 +1,65 @@
+import io
+import json
+
+import pytest
+
+from modal_mcp_auth_vuln import _iter_json_array
+
+
+def parse(text: str, chunk_size: int):
+    return list(_iter_json_array(io.StringIO(text), chunk_size=chunk_size))
+
+
+RECORDS = [
+    {"cve_id": "CVE-2024-0001", "score": 9.8, "tags": ["rce", "kev"]},
+    {"cve_id": "CVE-2024-0002", "note": "quote \" backslash \\ bracket ] brace } comma ,", "score": -3.5},
+    {"cve_id": "CVE-2024-0003", "nested": [[1, 2], [], [[3]]], "unicode": "café ☃"},
+    12345,
+    "a string with [brackets], {braces} and \\\"escapes\\\"",
+    None,
+    True,
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 64 * 1024])
+def test_matches_json_loads_at_any_chunk_size(chunk_size):
+    assert parse(json.dumps(RECORDS), chunk_size) == RECORDS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 5])
+def test_numbers_cut_at_the_chunk_edge(chunk_size):
+    text = "[123456, -3.5e10, 0.25, 7]"
+    assert parse(text, chunk_size) == [123456, -3.5e10, 0.25, 7]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 64])
+def test_whitespace_between_elements(chunk_size):
+    text = ' \n\t[ 1 ,\n  "two" ,\r\n [3] \n] \n'
+    assert parse(text, chunk_size) == [1, "two", [3]]
+
+
+@pytest.mark.parametrize("text", ["[]", "[ ]", " [\n] "])
+def test_empty_array(text):
+    assert parse(text, 1) == []
+
+
+def test_escaped_strings_split_mid_escape():
+    value = ["\\", "\"", "\\\"", "é\n\t", "]", "[,"]
+    text = json.dumps(value, ensure_ascii=True)
+    for chunk_size in range(1, 8):
+        assert parse(text, chunk_size) == value
+
+
+def test_nested_arrays_are_yielded_whole():
+    assert parse("[[1, [2, [3]]], [], [[]]]", 2) == [[1, [2, [3]]], [], [[]]]
+
+
+@pytest.mark.parametrize("text", ['{"a": [1, 2]}', '"scalar"', "42"])
+def test_non_array_document_is_one_value(text):
+    assert parse(text, 2) == [json.loads(text)]
+
+
+@pytest.mark.parametrize("text", ["", "   ", "[1, 2", "[1 2]", '[{"a": 1]'])
+def test_malformed_documents_raise(text):
+    with pytest.raises(json.JSONDecodeError):
+        parse(text, 3)
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from modal_mcp_auth_vuln import KevIndex
+
+
+def kev(cve, added, vendor="Acme", product="Widget", ransomware="Unknown"):
+    return {"cveID": cve, "dateAdded": added, "vendorProject": vendor, "product": product,
+            "knownRansomwareCampaignUse": ransomware}
+
+
+CATALOG = {
+    "catalogVersion": "2024.03.05",
+    "dateReleased": "2024-03-05T12:00:00Z",
+    "vulnerabilities": [
+        kev("CVE-2024-0003", "2024-03-03", vendor="Globex", product="Gateway", ransomware="Known"),
+        kev("CVE-2024-0001", "2024-03-01"),
+        kev("CVE-2024-0004", "2024-03-04", product="Gadget", ransomware="Known"),
+        kev("CVE-2024-0002", "2024-03-02"),
+        kev("CVE-2023-9999", "not a date"),
+    ],
+}
+
+
+def ids(records):
+    return [r["cveID"] for r in records]
+
+
+def test_get_is_case_and_whitespace_insensitive():
+    index = KevIndex(CATALOG)
+    assert len(index) == 5
+    assert index.catalog_version == "2024.03.05"
+    assert index.get(" cve-2024-0003 ")["vendorProject"] == "Globex"
+    assert index.get("CVE-2000-0000") is None
+
+
+def test_added_since_is_newest_first_and_inclusive():
+    index = KevIndex(CATALOG)
+    assert ids(index.added_since(datetime(2024, 3, 2))) == ["CVE-2024-0004", "CVE-2024-0003", "CVE-2024-0002"]
+    assert index.added_since(datetime(2024, 3, 5)) == []
+    # An unparseable dateAdded sorts as the oldest entry rather than failing the build
+    assert ids(index.added_since(datetime.min))[-1] == "CVE-2023-9999"
+
+
+def test_search_combines_filters_and_caps_at_limit():
+    index = KevIndex(CATALOG)
+
+    entries, total = index.search(vendor="ACME")
+    assert ids(entries) == ["CVE-2024-0004", "CVE-2024-0002", "CVE-2024-0001", "CVE-2023-9999"]
+    assert total == 4
+
+    entries, total = index.search(vendor="acme", ransomware_use="known")
+    assert ids(entries) == ["CVE-2024-0004"] and total == 1
+
+    entries, total = index.search(product="widget", limit=2)
+    assert ids(entries) == ["CVE-2024-0002", "CVE-2024-0001"] and total == 3
+
+    entries, total = index.search(vendor="acme", cutoff=datetime(2024, 3, 2))
+    assert ids(entries) == ["CVE-2024-0004", "CVE-2024-0002"] and total == 2
+
+    assert index.search(vendor="initech") == ([], 0)
+
+
+def test_search_without_filters_lists_the_catalog():
+    index = KevIndex(CATALOG)
+    entries, total = index.search(limit=1)
+    assert ids(entries) == ["CVE-2024-0004"] and total == 5
+    entries, total = index.search(cutoff=datetime(2024, 3, 3))
+    assert ids(entries) == ["CVE-2024-0004", "CVE-2024-0003"] and total == 2
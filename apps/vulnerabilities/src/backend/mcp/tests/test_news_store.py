@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+import modal_mcp_auth_threatintel as threatintel
+
+ITEMS = [
+    {"threat_article_url": "https://news.test/a", "threat_article_title": "Alpha ransomware hits hospitals",
+     "date_published": "2024-03-01", "threat_severity": "High", "primary_threat_actor": "Alpha Group",
+     "cve_ids": "CVE-2024-1111, cve-2024-2222"},
+    {"source_link": "https://feed.test/b", "threat_article_title": "Beta botnet grows",
+     "date_published": "2024-03-02", "threat_severity": "low"},
+    {"threat_article_title": "Gamma phishing kit with no link at all", "date_published": "2024-03-03"},
+]
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """A fresh NewsStore and SearchIndex, fed from a feed the test controls."""
+    feed = {"items": ITEMS}
+
+    async def cached_feed(url):
+        return feed["items"]
+
+    monkeypatch.setattr(threatintel.news_feed_cache, "get", cached_feed)
+    monkeypatch.setattr(threatintel, "search_index", threatintel.SearchIndex(str(tmp_path / "search.sqlite3")))
+    monkeypatch.setattr(threatintel, "news_store", threatintel.NewsStore(str(tmp_path / "news.sqlite3"), 3600))
+    return feed, threatintel.news_store, threatintel.search_index
+
+
+def search_doc_ids(index) -> set:
+    with index._lock:
+        return {row[0] for row in index._db().execute("SELECT doc_id FROM search_docs WHERE source = 'news'")}
+
+
+def test_sync_stores_items_and_answers_filters(stores):
+    _, store, index = stores
+    stats = asyncio.run(store.sync())
+
+    assert (stats["added"], stats["updated"], stats["removed"], stats["total"]) == (3, 0, 0, 3)
+    items, total = store.query()
+    assert total == 3 and [i["date_published"] for i in items] == ["2024-03-03", "2024-03-02", "2024-03-01"]
+    assert store.query(severity="HIGH")[1] == 1
+    assert store.query(threat_actor="alpha group")[1] == 1
+    assert store.query(cve_id="cve-2024-2222")[0][0]["threat_article_url"] == "https://news.test/a"
+    assert search_doc_ids(index) == {key for key, _ in store.documents()}
+
+
+def test_resync_only_rewrites_changed_items(stores):
+    feed, store, _ = stores
+    asyncio.run(store.sync())
+    feed["items"] = [{**ITEMS[0], "threat_severity": "critical"}] + ITEMS[1:]
+
+    stats = asyncio.run(store.sync(refetch=False))
+    assert (stats["added"], stats["updated"], stats["removed"]) == (0, 1, 0)
+    assert store.query(severity="critical")[1] == 1
+
+
+def test_withdrawn_items_leave_the_store_and_the_search_index(stores):
+    feed, store, index = stores
+    asyncio.run(store.sync())
+    feed["items"] = ITEMS[:1]
+
+    stats = asyncio.run(store.sync())
+    assert (stats["removed"], stats["total"]) == (2, 1)
+    assert store.query(cve_id="CVE-2024-1111")[1] == 1
+    assert search_doc_ids(index) == {"https://news.test/a"}
+    assert index.search("botnet", ["news"]) == []
+
+
+def test_empty_feed_deletes_nothing(stores):
+    feed, store, _ = stores
+    asyncio.run(store.sync())
+    feed["items"] = []
+
+    assert asyncio.run(store.sync())["total"] == 3
+
+
+def test_search_backfill_uses_the_store_ids(stores):
+    feed, store, index = stores
+    # Items stored before the search index existed
+    store.last_sync, _, _ = store._upsert(ITEMS)
+    store._synced_at = threatintel.time.monotonic()
+
+    tool = threatintel.search_threat_intel
+    result = json.loads(asyncio.run(getattr(tool, "fn", tool)(query="botnet")).content[0].text)
+    assert [hit["id"] for hit in result["results"]] == ["https://feed.test/b"]
+    assert search_doc_ids(index) == {key for key, _ in store.documents()}
+
+    # Deletions from a later sync reach every backfilled document
+    feed["items"] = ITEMS[:1]
+    asyncio.run(store.sync())
+    assert search_doc_ids(index) == {"https://news.test/a"}
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import tempfile
+import zipfile
+
+import modal_mcp_auth_vuln as vuln
+
+RECORDS = [{"cve_id": f"CVE-2024-{i:04d}", "priority": i % 4} for i in range(50)]
+
+
+def make_archive(records=RECORDS) -> vuln.PrioritizationArchive:
+    spool = tempfile.SpooledTemporaryFile(max_size=1024)
+    with zipfile.ZipFile(spool, "w") as archive:
+        archive.writestr("result.json", json.dumps(records))
+    spool.seek(0, 2)
+    return vuln.PrioritizationArchive(spool)
+
+
+def test_page_reads_a_slice_and_counts_records():
+    archive = make_archive()
+    assert archive.page(10, 15) == RECORDS[10:15]
+    assert archive.record_count == 50
+    assert archive.page(48, 60) == RECORDS[48:]
+
+
+def test_close_waits_for_the_last_reader():
+    archive = make_archive()
+    assert archive.acquire()
+    archive.close()
+    assert not archive.acquire()
+    assert archive.page(0, 3) == RECORDS[:3]
+    archive.release()
+    assert archive._spool.closed
+
+
+def test_release_during_a_page_read_does_not_close_it_under_the_reader(monkeypatch):
+    downloads = []
+
+    async def download(process_id):
+        downloads.append(process_id)
+        return make_archive()
+
+    monkeypatch.setattr(vuln, "_download_prioritization_archive", download)
+
+    async def main():
+        tracker = vuln.PrioritizationJobTracker()
+        job = vuln.PrioritizationJob("job-1")
+        job.state = "completed"
+        await tracker.fetch_archive(job)
+
+        async with tracker.reading_archive(job) as archive:
+            await tracker.release_archive(job)
+            page = await vuln.run_blocking(archive.page, 0, 5)
+            assert not archive._spool.closed
+        assert archive._spool.closed
+
+        # A later read downloads the released archive again
+        async with tracker.reading_archive(job) as again:
+            assert again is not archive
+            assert await vuln.run_blocking(again.page, 45, 50) == RECORDS[45:]
+        return page
+
+    assert asyncio.run(main()) == RECORDS[:5]
+    assert downloads == ["job-1", "job-1"]
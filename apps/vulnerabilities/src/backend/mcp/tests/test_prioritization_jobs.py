@@ -0,0 +1,66 @@
+import asyncio
+
+import modal_mcp_auth_vuln as vuln
+from fakes import FakeResponse
+
+
+class StatusSession:
+    """Serves one canned /process/<id> status body."""
+
+    def __init__(self, body):
+        self.body = body
+        self.polls = 0
+
+    def get(self, url, headers=None):
+        self.polls += 1
+        return FakeResponse(200, self.body)
+
+
+def run_job(monkeypatch, session, max_wait: float = 5, deadline: float = 10):
+    async def get_session():
+        return session
+
+    monkeypatch.setattr(vuln, "_get_vuln_api_session", get_session)
+    monkeypatch.setenv("vuln_api_key", "test")
+    monkeypatch.setattr(vuln, "PRIORITIZATION_POLL_MIN_SECONDS", 0.01)
+    monkeypatch.setattr(vuln, "PRIORITIZATION_POLL_MAX_SECONDS", 0.05)
+    monkeypatch.setattr(vuln, "PRIORITIZATION_MAX_WAIT_SECONDS", max_wait)
+
+    async def main():
+        tracker = vuln.PrioritizationJobTracker()
+        job = tracker.track("job-1", ["CVE-2024-0001"])
+        async with asyncio.timeout(deadline):
+            while not job.finished:
+                await tracker.wait_for_update(job, timeout=0.05)
+        return tracker, job
+
+    return asyncio.run(main())
+
+
+def test_completed_status_finishes_the_job(monkeypatch):
+    _, job = run_job(monkeypatch, StatusSession({"status": "Completed", "current_step": "done"}))
+    assert job.state == "completed"
+
+
+def test_null_status_keeps_polling_until_the_deadline(monkeypatch):
+    session = StatusSession({"status": None})
+    _, job = run_job(monkeypatch, session, max_wait=0.3)
+    assert job.state == "timeout"
+    assert job.status == "unknown"
+    assert session.polls > 1
+
+
+def test_unexpected_body_fails_only_that_job(monkeypatch):
+    _, job = run_job(monkeypatch, StatusSession(["not", "a", "dict"]))
+    assert job.state == "failed"
+    assert "AttributeError" in job.error
+
+
+def test_waiter_restarts_a_dead_poller_and_enforces_the_deadline(monkeypatch):
+    async def crash(self):
+        raise RuntimeError("poller bug")
+
+    monkeypatch.setattr(vuln.PrioritizationJobTracker, "_poll_loop", crash)
+    tracker, job = run_job(monkeypatch, StatusSession({"status": "running"}), max_wait=0.2)
+    assert job.state == "timeout"
+    assert isinstance(tracker._poller.exception(), RuntimeError)
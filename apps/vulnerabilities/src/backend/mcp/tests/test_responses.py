@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import pytest
+
+from mcp_common import compact_response, fit_response
+from mcp_common import responses
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    monkeypatch.setattr(responses, "RESPONSE_MAX_BYTES", 10000)
+    return 10000
+
+
+def test_small_payload_is_untouched(budget):
+    encoded, note = fit_response({"success": True, "data": [1, 2, 3]})
+    assert note is None
+    assert json.loads(encoded) == {"success": True, "data": [1, 2, 3]}
+
+
+def test_oversized_string_is_cut_instead_of_dropping_list_items(budget):
+    indicators = [{"type": "sha256", "value": f"{i:064x}"} for i in range(20)]
+    encoded, note = fit_response({"advisory": "x" * 20000, "indicators": indicators})
+    payload = json.loads(encoded)
+
+    assert len(encoded) <= budget
+    assert payload["indicators"] == indicators
+    assert 0 < len(payload["advisory"]) < 20000
+    assert payload["response_truncated"] == note
+    assert note["within_budget"] is True
+    assert note["fields"] == [{"path": "advisory", "kind": "string", "total": 20000,
+                               "returned": len(payload["advisory"])}]
+
+
+def test_list_with_the_largest_encoding_is_trimmed_from_its_end(budget):
+    many_short = [{"id": i} for i in range(300)]
+    few_long = [{"id": i, "text": "y" * 300} for i in range(100)]
+    encoded, note = fit_response({"ids": many_short, "records": few_long})
+    payload = json.loads(encoded)
+
+    assert len(encoded) <= budget
+    assert payload["ids"] == many_short
+    assert payload["records"] == few_long[:len(payload["records"])]
+    assert [f["path"] for f in note["fields"]] == ["records"]
+
+
+def test_several_large_parts_share_the_cut(budget):
+    encoded, note = fit_response({"a": "a" * 9000, "b": "b" * 9000, "c": "c" * 9000})
+    payload = json.loads(encoded)
+
+    assert len(encoded) <= budget
+    assert all(payload[key] for key in "abc")
+
+
+def test_payload_that_cannot_be_cut_is_reported_over_budget(budget):
+    payload = {f"key{i}": "v" * 200 for i in range(100)}
+    encoded, note = fit_response(payload)
+
+    assert len(encoded) > budget
+    assert note["within_budget"] is False
+    assert json.loads(encoded)["response_truncated"] == note
+
+
+def test_top_level_list_keeps_its_shape(budget):
+    rows = [{"id": i, "text": "y" * 300} for i in range(200)]
+    encoded, note = fit_response(rows)
+    payload = json.loads(encoded)
+
+    assert len(encoded) <= budget
+    assert isinstance(payload, list) and payload == rows[:len(payload)]
+    assert note["fields"][0]["path"] == "results"
+
+
+def test_compact_response_reports_truncation_in_meta(budget):
+    @compact_response
+    async def list_tool() -> list:
+        return [{"id": i, "text": "y" * 300} for i in range(200)]
+
+    result = asyncio.run(list_tool())
+    assert isinstance(json.loads(result.content[0].text), list)
+    assert result.meta["response_truncated"]["within_budget"] is True
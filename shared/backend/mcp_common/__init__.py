@@ -0,0 +1,38 @@
+"""Infrastructure shared by the Modal-hosted MCP servers.
+
+Logging and metrics (observability), the bounded tool executor and
+single-flight coalescing (concurrency), compact tool responses (responses),
+the two-tier cache (cache), scheduled prefetching (prefetch) and bearer
+auth with per-key admission control (auth). Each server adds the package
+to its image with `image.add_local_python_source("mcp_common")`.
+"""
+from .auth import AuthMiddleware
+from .cache import DiskStore, TieredCache
+from .concurrency import SingleFlight, get_tool_executor, run_blocking
+from .observability import Metrics, cache_metrics, get_logger, metrics, observe_upstream
+from .prefetch import (PREFETCH_INTERVAL_SECONDS, PREFETCH_MODE, log_prefetch_outcomes, run_prefetch_steps,
+                       with_prefetch_loop)
+from .responses import compact_response, dumps, encode_response, fit_response
+
+__all__ = [
+    "AuthMiddleware",
+    "DiskStore",
+    "Metrics",
+    "PREFETCH_INTERVAL_SECONDS",
+    "PREFETCH_MODE",
+    "SingleFlight",
+    "TieredCache",
+    "cache_metrics",
+    "compact_response",
+    "dumps",
+    "encode_response",
+    "fit_response",
+    "get_logger",
+    "get_tool_executor",
+    "log_prefetch_outcomes",
+    "metrics",
+    "observe_upstream",
+    "run_blocking",
+    "run_prefetch_steps",
+    "with_prefetch_loop",
+]
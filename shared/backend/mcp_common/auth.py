@@ -0,0 +1,119 @@
+"""Bearer-token authentication with per-key rate limits for the MCP ASGI apps."""
+import hashlib
+import hmac
+import math
+import os
+import secrets
+import time
+
+from starlette import status
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+
+from .observability import metrics
+
+# Requests per second each API key may sustain once its burst is spent (0 disables)
+AUTH_RATE_PER_SECOND = float(os.environ.get("AUTH_RATE_PER_SECOND", "10"))
+# Requests each API key may send back to back before the rate limit applies
+AUTH_BURST = float(os.environ.get("AUTH_BURST", "40"))
+# Requests each API key may have running in this container at once (0 disables)
+AUTH_MAX_IN_FLIGHT = int(os.environ.get("AUTH_MAX_IN_FLIGHT", "16"))
+
+
+class AuthMiddleware:
+    """Pure ASGI bearer-token auth with per-key admission control.
+
+    Valid keys are held as HMAC-SHA256 digests under a per-process secret,
+    so a token is checked with one digest and one set lookup however many
+    keys are configured, and the lookup timing reveals nothing about the
+    stored keys. Each key gets its own token bucket and in-flight cap;
+    requests over either limit are answered with 429 and Retry-After
+    without reaching the MCP app.
+    """
+
+    def __init__(self, app, valid_keys, rate: float = AUTH_RATE_PER_SECOND,
+                 burst: float = AUTH_BURST, max_in_flight: int = AUTH_MAX_IN_FLIGHT):
+        self.app = app
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_in_flight = max_in_flight
+        self._secret = secrets.token_bytes(32)
+        self._digests = {self._digest(key) for key in valid_keys}
+        # digest -> (tokens, monotonic time of last update)
+        self._buckets = {}
+        self._in_flight = {}
+
+    def _digest(self, token: str) -> bytes:
+        return hmac.new(self._secret, token.encode(), hashlib.sha256).digest()
+
+    def _admit(self, digest: bytes) -> float | None:
+        """Take a request slot for a key.
+
+        Returns None when the request is admitted, otherwise the number of
+        seconds the caller should wait before retrying.
+        """
+        if self.max_in_flight > 0 and self._in_flight.get(digest, 0) >= self.max_in_flight:
+            return 1.0
+        if self.rate <= 0:
+            return None
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(digest, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[digest] = (tokens, now)
+            return (1 - tokens) / self.rate
+        self._buckets[digest] = (tokens - 1, now)
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Check Authorization header
+        auth_header = Headers(scope=scope).get("authorization")
+        if not auth_header:
+            metrics.inc("mcp_http_requests_rejected_total", (("reason", "unauthorized"),))
+            response = JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={"error": "Missing Authorization header"}
+            )
+            await response(scope, receive, send)
+            return
+
+        # Validate Bearer token
+        parts = auth_header.split()
+        digest = self._digest(parts[1]) if len(parts) == 2 and parts[0].lower() == "bearer" else None
+        if digest not in self._digests:
+            metrics.inc("mcp_http_requests_rejected_total", (("reason", "unauthorized"),))
+            response = JSONResponse(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                content={"error": "Invalid Authorization header"}
+            )
+            await response(scope, receive, send)
+            return
+
+        retry_after = self._admit(digest)
+        if retry_after is not None:
+            metrics.inc("mcp_http_requests_rejected_total", (("reason", "rate_limited"),))
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={"error": "Too many requests for this API key"},
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+            await response(scope, receive, send)
+            return
+
+        # Token is valid and admitted, proceed; streamed responses hold their
+        # slot until the last chunk is sent
+        self._in_flight[digest] = self._in_flight.get(digest, 0) + 1
+        metrics.inc("mcp_http_requests_in_flight")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            metrics.inc("mcp_http_requests_in_flight", amount=-1)
+            remaining = self._in_flight[digest] - 1
+            if remaining:
+                self._in_flight[digest] = remaining
+            else:
+                del self._in_flight[digest]
@@ -0,0 +1,326 @@
+"""Two-tier caching: a bounded in-process LRU in front of a shared on-disk store."""
+import asyncio
+import functools
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from .concurrency import get_tool_executor, run_blocking
+from .observability import log
+
+
+class DiskStore:
+    """Second cache tier: one pickle file per entry under a directory.
+
+    Entries are written to a temp file and renamed into place, so a reader in
+    this or another replica never sees a partial entry and the newest write
+    of a key wins. Reads touch the file's mtime; once the directory grows
+    past max_bytes the least recently used files are removed until it is
+    back under 90% of the budget. With a Modal Volume mounted at the root
+    the tier is shared by every replica and survives restarts, and reload
+    periodically picks up what other containers have committed. Entries are
+    unpickled, so the directory must only be writable by this app.
+    """
+
+    def __init__(self, root: str, max_bytes: int, reload=None, reload_seconds: float = 60):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._reload = reload
+        self._reload_seconds = reload_seconds
+        self._next_reload = 0.0
+        self._lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        self._bytes = None
+        self._pending = set()
+        self.evictions = 0
+        self.errors = 0
+
+    def _path(self, namespace: str, key) -> str:
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.root, namespace, digest[:2], digest)
+
+    def _files(self) -> list[tuple[float, int, str]]:
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+                files.append((info.st_mtime, info.st_size, path))
+        return files
+
+    def _maybe_reload(self):
+        if self._reload is None or time.monotonic() < self._next_reload:
+            return
+        with self._lock:
+            if time.monotonic() < self._next_reload:
+                return
+            self._next_reload = time.monotonic() + self._reload_seconds
+        try:
+            self._reload()
+        except Exception as e:
+            log.debug(f"cache volume reload skipped: {e}")
+
+    def read(self, namespace: str, key):
+        """(expires_at, stale_until, value) for key, or None if absent, unreadable or past its stale window."""
+        self._maybe_reload()
+        path = self._path(namespace, key)
+        try:
+            with open(path, "rb") as f:
+                stored_key, expires_at, stale_until, value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Truncated by a crashed writer or written by an incompatible version
+            self.errors += 1
+            log.warning(f"discarding unreadable {namespace} cache entry: {e}")
+            self._remove(path)
+            return None
+
+        if stored_key != key:
+            return None
+        if time.time() >= stale_until:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return expires_at, stale_until, value
+
+    def write(self, namespace: str, key, expires_at: float, stale_until: float, value):
+        path = self._path(namespace, key)
+        temp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            data = pickle.dumps((key, expires_at, stale_until, value), protocol=pickle.HIGHEST_PROTOCOL)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp, "wb") as f:
+                f.write(data)
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            os.replace(temp, path)
+        except Exception as e:
+            self.errors += 1
+            log.warning(f"could not write {namespace} cache entry: {e}")
+            self._remove(temp)
+            return
+
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(size for _, size, _ in self._files())
+            else:
+                self._bytes += len(data) - previous
+            over = self._bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def write_behind(self, namespace: str, key, expires_at: float, stale_until: float, value):
+        """write() on the tool executor when called from the event loop, inline from a worker thread."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.write(namespace, key, expires_at, stale_until, value)
+            return
+        future = loop.run_in_executor(get_tool_executor(), self.write, namespace, key,
+                                      expires_at, stale_until, value)
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+    async def flush(self):
+        """Wait until every write_behind() issued so far has landed."""
+        while self._pending:
+            await asyncio.gather(*list(self._pending))
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _evict(self):
+        # One sweep at a time; writers that find it running carry on
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            files = sorted(self._files())
+            total = sum(size for _, size, _ in files)
+            target = self.max_bytes * 0.9
+            for _, size, path in files:
+                if total <= target:
+                    break
+                if self._remove(path):
+                    total -= size
+                    self.evictions += 1
+            with self._lock:
+                self._bytes = total
+        finally:
+            self._evict_lock.release()
+
+    def stats(self) -> dict:
+        return {
+            "root": self.root,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+        }
+
+
+class TieredCache:
+    """Two-tier cache: a bounded in-process LRU (L1) in front of the shared DiskStore (L2).
+
+    Each cache is one endpoint's policy: the default TTL, how long past
+    expiry an entry may still be served while it is refreshed
+    (stale-while-revalidate), and the L1 entry bound. Expiry is wall-clock
+    time, so an entry written by one replica keeps its age in another.
+    put() updates L1 at once and writes L2 behind the caller on the tool
+    executor; L2 hits are promoted into L1.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl: float, stale_seconds: float = 0,
+                 disk: DiskStore = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_seconds = stale_seconds
+        self.disk = disk
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = {}
+        self.hits = 0
+        self.l2_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _memory_lookup(self, key, now: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, stale_until, value = entry
+            if now >= stale_until:
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value, now < expires_at
+
+    def _memory_store(self, key, expires_at: float, stale_until: float, value):
+        with self._lock:
+            self._entries[key] = (expires_at, stale_until, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _count(self, hit, from_disk: bool = False):
+        if hit is None:
+            self.misses += 1
+            return
+        self.hits += 1
+        if from_disk:
+            self.l2_hits += 1
+        if not hit[1]:
+            self.stale_hits += 1
+
+    def lookup_blocking(self, key):
+        """(value, fresh) from L1 or L2, or None. Reads the disk inline, so call it off the event loop."""
+        now = time.time()
+        hit = self._memory_lookup(key, now)
+        from_disk = False
+        if hit is None and self.disk is not None:
+            entry = self.disk.read(self.name, key)
+            if entry is not None:
+                self._memory_store(key, *entry)
+                hit, from_disk = (entry[2], now < entry[0]), True
+        self._count(hit, from_disk)
+        return hit
+
+    async def lookup(self, key):
+        """(value, fresh) for key, or None. Stale values are only kept for stale_seconds past expiry."""
+        hit = self._memory_lookup(key, time.time())
+        if hit is None and self.disk is not None:
+            return await run_blocking(self.lookup_blocking, key)
+        self._count(hit)
+        return hit
+
+    async def get(self, key, allow_stale: bool = False):
+        """The cached value for key, or None when it is missing or (unless allow_stale) expired."""
+        hit = await self.lookup(key)
+        if hit is None or not (hit[1] or allow_stale):
+            return None
+        return hit[0]
+
+    async def get_many(self, keys, allow_stale: bool = False) -> dict:
+        """{key: value} for the keys that are cached, reading every L1 miss from disk in one executor hop."""
+        now = time.time()
+        found, missing = {}, []
+        for key in keys:
+            hit = self._memory_lookup(key, now)
+            if hit is None and self.disk is not None:
+                missing.append(key)
+                continue
+            self._count(hit)
+            if hit is not None and (hit[1] or allow_stale):
+                found[key] = hit[0]
+        if missing:
+            hits = await run_blocking(lambda: [self.lookup_blocking(key) for key in missing])
+            for key, hit in zip(missing, hits):
+                if hit is not None and (hit[1] or allow_stale):
+                    found[key] = hit[0]
+        return found
+
+    def put(self, key, value, ttl: float = None):
+        """Cache value for ttl seconds (default: the cache's TTL) in L1, and in L2 behind the caller."""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        stale_until = expires_at + self.stale_seconds
+        self._memory_store(key, expires_at, stale_until, value)
+        if self.disk is not None:
+            self.disk.write_behind(self.name, key, expires_at, stale_until, value)
+
+    def revalidate(self, key, refresh):
+        """Run refresh() in the background to replace a stale entry, once per key at a time.
+
+        refresh is a coroutine function that fetches the value and puts it
+        back into this cache; its failures are logged and the stale entry
+        keeps being served until it ages out.
+        """
+        task = self._refreshing.get(key)
+        if task is not None and not task.done():
+            return
+        task = asyncio.get_running_loop().create_task(refresh())
+        self._refreshing[key] = task
+        task.add_done_callback(functools.partial(self._refreshed, key))
+
+    def _refreshed(self, key, task):
+        if self._refreshing.get(key) is task:
+            del self._refreshing[key]
+        if not task.cancelled() and task.exception() is not None:
+            log.warning(f"{self.name} cache refresh failed: {task.exception()}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "stale_seconds": self.stale_seconds,
+                "hits": self.hits,
+                "l2_hits": self.l2_hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
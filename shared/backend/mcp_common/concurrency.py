@@ -0,0 +1,81 @@
+"""The bounded tool executor and single-flight call coalescing."""
+import asyncio
+import functools
+import os
+
+from .observability import log, metrics
+
+
+# Threads for blocking parsing and CPU work, so tools never stall the event loop
+TOOL_EXECUTOR_WORKERS = int(os.environ.get("TOOL_EXECUTOR_WORKERS", "8"))
+
+_tool_executor = None
+
+
+def get_tool_executor():
+    """Bounded thread pool shared by every tool, created on first use so it stays out of the snapshot."""
+    global _tool_executor
+    if _tool_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _tool_executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_WORKERS, thread_name_prefix="mcp-tool")
+    return _tool_executor
+
+
+async def run_blocking(fn, *args):
+    """Run fn(*args) on the tool executor and await its result."""
+    metrics.inc("mcp_executor_tasks_in_flight")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_tool_executor(), fn, *args)
+    finally:
+        metrics.inc("mcp_executor_tasks_in_flight", amount=-1)
+
+
+metrics.describe("mcp_executor_tasks_in_flight", "gauge",
+                 "Blocking steps running or queued on the bounded tool executor")
+
+
+class SingleFlight:
+    """Collapses concurrent calls that share a key into one.
+
+    The first caller for a key starts the call as a task; callers that
+    arrive while it is running await that task instead of starting their
+    own, and all of them get its result or exception. The task is shielded,
+    so a caller that gives up does not cancel it for the others. Waiters are
+    counted per flight in mcp_singleflight_waiters_total and logged per key
+    when the call finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._labels = (("flight", name),)
+        # key -> [task, waiters]
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """Return await fn(), sharing one in-flight call among concurrent callers with the same key."""
+        call = self._calls.get(key)
+        if call is None:
+            call = [asyncio.get_running_loop().create_task(fn()), 0]
+            self._calls[key] = call
+            call[0].add_done_callback(functools.partial(self._done, key, call))
+            metrics.inc("mcp_singleflight_calls_total", self._labels)
+        else:
+            call[1] += 1
+            metrics.inc("mcp_singleflight_waiters_total", self._labels)
+        return await asyncio.shield(call[0])
+
+    def _done(self, key, call, task):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved; every caller has already been handed it
+            task.exception()
+        if call[1]:
+            log.info(f"{self.name}: {call[1]} coalesced waiter(s) on {str(key)[:200]}",
+                     extra={"fields": {"event": "coalesced", "flight": self.name,
+                                       "key": str(key)[:200], "waiters": call[1]}})
+
+
+metrics.describe("mcp_singleflight_calls_total", "counter", "Calls started by a single-flight group")
+metrics.describe("mcp_singleflight_waiters_total", "counter",
+                 "Calls that joined an identical in-flight call instead of starting their own")
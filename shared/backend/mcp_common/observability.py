@@ -0,0 +1,187 @@
+"""Structured JSON logging and the in-process Prometheus metrics registry."""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+from bisect import bisect_left
+from urllib.parse import urlsplit
+
+# Structured log level, and the share of routine per-call lines that are kept
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "0.1"))
+
+
+class _JsonLogFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any extra `fields`."""
+
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname.lower(),
+                 "logger": record.name, "msg": record.getMessage()}
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _SampleFilter(logging.Filter):
+    """Keep LOG_SAMPLE_RATE of the records logged with extra={"sampled": True}."""
+
+    def filter(self, record):
+        return not getattr(record, "sampled", False) or random.random() < LOG_SAMPLE_RATE
+
+
+def get_logger(name: str) -> logging.Logger:
+    """A logger writing sampled JSON lines to stdout, configured on first use."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(_JsonLogFormatter())
+        handler.addFilter(_SampleFilter())
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
+    return logger
+
+
+log = get_logger("mcp_common")
+
+# Upper bounds, in seconds, of the latency histogram buckets
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metrics:
+    """In-process Prometheus registry of counters, gauges and histograms.
+
+    Series are keyed by name and a tuple of (label, value) pairs and kept in
+    plain dicts under one lock, so recording is a dict update on the hot
+    path. Values owned by other objects, such as cache counters, are read by
+    collectors registered with collect() only when /metrics is scraped.
+    """
+
+    def __init__(self, buckets: tuple = METRICS_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._meta = {}
+        self._values = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name: str, labels: tuple = (), amount: float = 1.0):
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name: str, value: float, labels: tuple = ()):
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            # Per-bucket counts (the last one is +Inf), then sum and count
+            counts = series.get(labels)
+            if counts is None:
+                counts = series[labels] = [0] * (len(self.buckets) + 3)
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def collect(self, fn):
+        """Register fn() -> iterable of (name, labels, value), called at scrape time."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        """All series in the Prometheus text exposition format."""
+        with self._lock:
+            values = {name: dict(series) for name, series in self._values.items()}
+            histograms = {name: {labels: list(counts) for labels, counts in series.items()}
+                          for name, series in self._histograms.items()}
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    values.setdefault(name, {})[labels] = value
+            except Exception as e:
+                log.warning(f"metrics collector {collector.__name__} failed: {e}")
+
+        lines = []
+        for name in sorted(set(values) | set(histograms)):
+            kind, help_text = self._meta.get(name, ("untyped", ""))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in values.get(name, {}).items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for labels, counts in histograms.get(name, {}).items():
+                cumulative = 0
+                for bound, count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {counts[-2]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {counts[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.describe("mcp_tool_duration_seconds", "histogram", "Tool call latency by tool and outcome")
+metrics.describe("mcp_tool_calls_in_flight", "gauge", "Tool calls currently running")
+metrics.describe("mcp_http_requests_in_flight", "gauge", "Authenticated HTTP requests currently being served")
+metrics.describe("mcp_http_requests_rejected_total", "counter", "HTTP requests refused by AuthMiddleware")
+metrics.describe("mcp_upstream_request_duration_seconds", "histogram", "Upstream API call latency by endpoint and status")
+metrics.describe("mcp_cache_hits_total", "counter", "Cache lookups that found a live entry in either tier")
+metrics.describe("mcp_cache_l2_hits_total", "counter", "Cache hits served from the disk tier")
+metrics.describe("mcp_cache_stale_hits_total", "counter", "Cache hits on an expired entry served while it is refreshed")
+metrics.describe("mcp_cache_misses_total", "counter", "Cache lookups that found nothing or an expired entry")
+metrics.describe("mcp_cache_evictions_total", "counter", "Entries evicted from memory to stay within max_entries")
+metrics.describe("mcp_cache_entries", "gauge", "Entries currently held in memory")
+metrics.describe("mcp_cache_disk_bytes", "gauge", "Bytes held by the disk cache tier")
+metrics.describe("mcp_cache_disk_evictions_total", "counter", "Disk tier entries removed to stay within its size budget")
+metrics.describe("mcp_cache_disk_errors_total", "counter", "Disk tier entries that could not be read or written")
+
+
+def endpoint_label(url, literal_segments=frozenset()) -> tuple[str, str]:
+    """(host, path template) for an upstream URL, with ID path segments collapsed to {id}.
+
+    Segments in literal_segments are kept as-is.
+    """
+    parts = urlsplit(str(url))
+    segments = [segment for segment in parts.path.split("/") if segment]
+    template = [segments[0]] if segments else []
+    template += [segment if segment in literal_segments else "{id}" for segment in segments[1:]]
+    return parts.hostname or "", "/" + "/".join(template)
+
+
+def observe_upstream(method: str, url, status, seconds: float, literal_segments=frozenset()):
+    """Record one upstream call in mcp_upstream_request_duration_seconds."""
+    host, endpoint = endpoint_label(url, literal_segments)
+    metrics.observe("mcp_upstream_request_duration_seconds", seconds,
+                    (("host", host), ("method", method), ("endpoint", endpoint), ("status", str(status))))
+
+
+def cache_metrics(caches: dict, disk=None):
+    """Collector rows for {name: TieredCache} and the DiskStore behind them."""
+    for name, cache in caches.items():
+        stats = cache.stats()
+        labels = (("cache", name),)
+        yield "mcp_cache_hits_total", labels, stats["hits"]
+        yield "mcp_cache_l2_hits_total", labels, stats["l2_hits"]
+        yield "mcp_cache_stale_hits_total", labels, stats["stale_hits"]
+        yield "mcp_cache_misses_total", labels, stats["misses"]
+        yield "mcp_cache_evictions_total", labels, stats["evictions"]
+        yield "mcp_cache_entries", labels, stats["size"]
+    if disk is not None:
+        stats = disk.stats()
+        if stats["bytes"] is not None:
+            yield "mcp_cache_disk_bytes", (), stats["bytes"]
+        yield "mcp_cache_disk_evictions_total", (), stats["evictions"]
+        yield "mcp_cache_disk_errors_total", (), stats["errors"]
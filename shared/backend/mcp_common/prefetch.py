@@ -0,0 +1,87 @@
+"""Running an app's prefetch() in bounded steps, on a schedule or inside the server process."""
+import asyncio
+import contextlib
+import os
+import random
+import time
+
+from .observability import log, metrics
+
+# Seconds between prefetch cycles (0 disables prefetching)
+PREFETCH_INTERVAL_SECONDS = int(os.environ.get("PREFETCH_INTERVAL_SECONDS", "600"))
+# "cron" runs prefetch as a scheduled Modal function that publishes through the
+# cache volume, "loop" as a task in every server process; without a cache
+# volume only the loop can reach the servers' caches
+PREFETCH_MODE = os.environ.get("PREFETCH_MODE", "cron") if os.environ.get("CACHE_VOLUME") else "loop"
+# Prefetch steps running at once, so a cycle is a trickle of upstream calls rather than a burst
+PREFETCH_CONCURRENCY = int(os.environ.get("PREFETCH_CONCURRENCY", "2"))
+
+metrics.describe("mcp_prefetch_duration_seconds", "histogram", "Prefetch step latency by step and outcome")
+
+
+async def run_prefetch_steps(steps: list) -> dict:
+    """Run (name, step, fn) prefetch steps, at most PREFETCH_CONCURRENCY at a time.
+
+    A failed step is logged but does not stop the others. Returns {name: "ok" | "error"}.
+    """
+    semaphore = asyncio.Semaphore(max(1, PREFETCH_CONCURRENCY))
+    outcomes = {}
+
+    async def run(name, step, fn):
+        async with semaphore:
+            started, outcome = time.perf_counter(), "error"
+            try:
+                await fn()
+                outcome = "ok"
+            except Exception as e:
+                log.warning(f"prefetch {name} failed: {str(e) or type(e).__name__}")
+            metrics.observe("mcp_prefetch_duration_seconds", time.perf_counter() - started,
+                            (("step", step), ("outcome", outcome)))
+            outcomes[name] = outcome
+
+    await asyncio.gather(*(run(*step) for step in steps))
+    return outcomes
+
+
+def log_prefetch_outcomes(outcomes: dict, started: float):
+    """Log one summary line for a prefetch cycle that began at perf_counter() time started."""
+    failed = [name for name, outcome in outcomes.items() if outcome != "ok"]
+    log.info(f"prefetch finished in {time.perf_counter() - started:.1f}s: "
+             f"{len(outcomes) - len(failed)} of {len(outcomes)} steps ok" + (f", failed: {failed}" if failed else ""))
+
+
+async def prefetch_loop(prefetch):
+    """Await prefetch() every PREFETCH_INTERVAL_SECONDS, jittered so replicas started together drift apart."""
+    await asyncio.sleep(random.uniform(0, min(30, PREFETCH_INTERVAL_SECONDS / 10)))
+    while True:
+        try:
+            await prefetch()
+        except Exception as e:
+            log.warning(f"prefetch cycle failed: {str(e) or type(e).__name__}")
+        await asyncio.sleep(PREFETCH_INTERVAL_SECONDS * random.uniform(0.9, 1.1))
+
+
+def with_prefetch_loop(lifespan, prefetch, on_shutdown=None):
+    """Wrap an ASGI lifespan so prefetch_loop(prefetch) runs while the app is up, in "loop" mode.
+
+    on_shutdown, when given, is a coroutine function awaited as the app
+    stops, such as one that saves state not yet written behind.
+    """
+    @contextlib.asynccontextmanager
+    async def wrapped(app):
+        async with lifespan(app) as state:
+            task = None
+            if PREFETCH_MODE == "loop" and PREFETCH_INTERVAL_SECONDS > 0:
+                task = asyncio.get_running_loop().create_task(prefetch_loop(prefetch))
+            try:
+                yield state
+            finally:
+                if task is not None:
+                    task.cancel()
+                if on_shutdown is not None:
+                    try:
+                        await on_shutdown()
+                    except Exception as e:
+                        log.warning(f"shutdown hook {on_shutdown.__name__} failed: {e}")
+
+    return wrapped
@@ -0,0 +1,235 @@
+"""Compact JSON encoding of tool responses and the compact_response tool decorator."""
+import functools
+import inspect
+import json
+import logging
+import os
+import time
+from datetime import date, datetime
+
+from fastmcp.tools import ToolResult
+from mcp.types import TextContent
+
+from .concurrency import SingleFlight, run_blocking
+from .observability import log, metrics
+
+try:
+    import orjson
+except ImportError:  # responses fall back to the json module
+    orjson = None
+
+# Largest tool response, in bytes of encoded JSON, before its biggest list is trimmed (0 disables)
+RESPONSE_MAX_BYTES = int(os.environ.get("RESPONSE_MAX_BYTES", "1048576"))
+# Also attach the payload as MCP structuredContent for clients that read it
+RESPONSE_STRUCTURED_CONTENT = os.environ.get("RESPONSE_STRUCTURED_CONTENT", "false").lower() == "true"
+
+
+def _json_default(value):
+    """Encode the non-JSON types tools hand back: datetimes, dates and sets."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+
+def dumps(value) -> bytes:
+    """Compact JSON, via orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=_json_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+# Bytes kept free for the response_truncated note when fitting a payload to the budget
+_NOTE_HEADROOM = 512
+# Strings shorter than this (IDs, names, dates) are never cut
+_MIN_CUT_STRING_BYTES = 256
+# Upper bound on cuts per response, since each cut removes at most half a part
+_MAX_CUTS = 64
+
+
+def _parts(value, path=(), depth=0):
+    """(path, value, encoded size) of every list and string in value and its nested dict values."""
+    if isinstance(value, (list, str)):
+        yield path, value, len(dumps(value))
+    elif isinstance(value, dict) and depth < 3:
+        for key, child in value.items():
+            yield from _parts(child, path + (key,), depth + 1)
+
+
+def _replace_at(value, path, new):
+    if not path:
+        return new
+    copy = dict(value)
+    copy[path[0]] = _replace_at(value[path[0]], path[1:], new)
+    return copy
+
+
+def _trim_list(items: list, room: int) -> list:
+    """The longest prefix of items whose encoding fits in room bytes."""
+    used, keep = 2, 0
+    for item in items:
+        used += len(dumps(item)) + 1
+        if used > room:
+            break
+        keep += 1
+    return items[:keep]
+
+
+def _trim_string(text: str, size: int, room: int) -> str:
+    """text cut so that its encoding (size bytes now) fits in room bytes."""
+    keep = int(len(text) * max(0, room - 2) / max(1, size - 2))
+    while keep and len(dumps(text[:keep])) > room:
+        keep = int(keep * 0.9)
+    return text[:keep]
+
+
+def fit_response(payload) -> tuple[bytes, dict | None]:
+    """Encode a tool payload within RESPONSE_MAX_BYTES; returns (encoded, truncation note or None).
+
+    Whichever list or string has the largest encoding is cut, from its end,
+    to what the budget leaves for it but by at most half at a time, so an
+    oversized string is shortened before a list of small items loses them,
+    and several large parts share the cut. This repeats until the payload
+    fits or nothing is left worth cutting. The note lists each cut field
+    with what was returned and what there was, and within_budget says
+    whether the payload fits. A dict payload also carries the note under
+    response_truncated; a list payload keeps its shape and the note only
+    travels in the result metadata.
+    """
+    encoded = dumps(payload)
+    if RESPONSE_MAX_BYTES <= 0 or len(encoded) <= RESPONSE_MAX_BYTES:
+        return encoded, None
+
+    budget = RESPONSE_MAX_BYTES - (_NOTE_HEADROOM if isinstance(payload, dict) else 0)
+    fields = {}
+    trimmed = payload
+    for _ in range(_MAX_CUTS):
+        if len(encoded) <= budget:
+            break
+        for path, value, size in sorted(_parts(trimmed), key=lambda part: part[2], reverse=True):
+            if isinstance(value, str) and size < _MIN_CUT_STRING_BYTES:
+                continue
+            room = max(budget - (len(encoded) - size), size // 2)
+            cut = _trim_list(value, room) if isinstance(value, list) else _trim_string(value, size, room)
+            if len(cut) == len(value):
+                continue
+            field = fields.setdefault(path, {"path": ".".join(map(str, path)) or "results",
+                                             "kind": "list" if isinstance(value, list) else "string",
+                                             "total": len(value)})
+            field["returned"] = len(cut)
+            trimmed = _replace_at(trimmed, path, cut)
+            encoded = dumps(trimmed)
+            break
+        else:
+            break
+
+    note = {"max_bytes": RESPONSE_MAX_BYTES, "within_budget": len(encoded) <= budget,
+            "fields": list(fields.values())}
+    if isinstance(trimmed, dict):
+        trimmed = {**trimmed, "response_truncated": note}
+        encoded = dumps(trimmed)
+    cuts = ", ".join(f"{f['path']} {f['returned']}/{f['total']}" for f in note["fields"]) or "nothing to cut"
+    log.info(f"trimmed response to fit {RESPONSE_MAX_BYTES} bytes: {cuts}, now {len(encoded)} bytes"
+             + ("" if note["within_budget"] else ", still over budget"))
+    return encoded, note
+
+
+def encode_response(payload) -> bytes:
+    """Encode a tool payload within RESPONSE_MAX_BYTES; see fit_response()."""
+    return fit_response(payload)[0]
+
+
+def _outcome(payload) -> str:
+    """"error" for payloads that report a failure, otherwise "ok"."""
+    if isinstance(payload, dict) and (payload.get("success") is False or "error" in payload
+                                      or payload.get("status") in ("error", "failed")):
+        return "error"
+    return "ok"
+
+
+def _flight_key(signature: inspect.Signature, args, kwargs):
+    """Canonical JSON of a tool call's arguments with defaults applied.
+
+    None when an argument is not plain JSON data (such as an MCP Context),
+    since such a call cannot be shared.
+    """
+    try:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return json.dumps(bound.arguments, sort_keys=True, separators=(",", ":"))
+    except TypeError:
+        return None
+
+
+def compact_response(fn=None, *, coalesce: bool = True):
+    """Serve a tool's return value as one compact JSON text block, and time the call.
+
+    The payload is encoded once by dumps instead of being validated against
+    an output schema and serialized again for both content and
+    structuredContent. Every call is recorded in mcp_tool_duration_seconds and
+    logged as a sampled tool_call line; failed calls are always logged.
+    Synchronous tools are run on the tool executor so they cannot block the
+    event loop the other sessions share.
+
+    A payload over RESPONSE_MAX_BYTES is cut down by fit_response(); the
+    result's _meta.response_truncated always describes the cut, and a dict
+    payload repeats it under response_truncated. A list payload is returned
+    as a (shorter) list, never wrapped.
+
+    Concurrent calls with identical arguments share one execution and one
+    encoded result. Pass coalesce=False for tools with side effects, which
+    must run once per call.
+    """
+    if fn is None:
+        return functools.partial(compact_response, coalesce=coalesce)
+
+    tool = fn.__name__
+    labels = (("tool", tool),)
+    signature = inspect.signature(fn)
+    flight = SingleFlight(tool) if coalesce else None
+
+    def respond(payload) -> ToolResult:
+        encoded, note = fit_response(payload)
+        structured = json.loads(encoded) if RESPONSE_STRUCTURED_CONTENT else None
+        return ToolResult(content=[TextContent(type="text", text=encoded.decode())],
+                          structured_content=structured if isinstance(structured, dict) else None,
+                          meta={"response_truncated": note} if note is not None else None)
+
+    def record(started: float, outcome: str):
+        elapsed = time.perf_counter() - started
+        metrics.inc("mcp_tool_calls_in_flight", labels, -1)
+        metrics.observe("mcp_tool_duration_seconds", elapsed, labels + (("outcome", outcome),))
+        log.log(logging.INFO if outcome == "ok" else logging.WARNING,
+                f"{tool} {outcome} in {elapsed * 1000:.1f} ms",
+                extra={"fields": {"event": "tool_call", "tool": tool, "outcome": outcome,
+                                  "duration_ms": round(elapsed * 1000, 1)},
+                       "sampled": outcome == "ok"})
+
+    if inspect.iscoroutinefunction(fn):
+        call = fn
+    else:
+        async def call(*args, **kwargs):
+            return await run_blocking(functools.partial(fn, *args, **kwargs))
+
+    async def run(*args, **kwargs) -> tuple[str, ToolResult]:
+        payload = await call(*args, **kwargs)
+        return _outcome(payload), respond(payload)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        metrics.inc("mcp_tool_calls_in_flight", labels)
+        started, outcome = time.perf_counter(), "exception"
+        try:
+            key = _flight_key(signature, args, kwargs) if flight is not None else None
+            if key is None:
+                outcome, result = await run(*args, **kwargs)
+            else:
+                outcome, result = await flight.do(key, functools.partial(run, *args, **kwargs))
+            return result
+        finally:
+            record(started, outcome)
+
+    wrapper.__annotations__ = {**fn.__annotations__, "return": ToolResult}
+    wrapper.__signature__ = signature.replace(return_annotation=ToolResult)
+    return wrapper